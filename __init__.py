@@ -11,6 +11,10 @@ from .detection_operator import DetectWithFlorence2
 from .ocr_operator import OCRWithFlorence2
 from .grounding_operator import CaptionToPhraseGroundingWithFlorence2
 from .segmentation_operator import ReferringExpressionSegmentationWithFlorence2
+from .multitask_operator import RunFlorence2Tasks
+from .cache_operator import ClearFlorence2FeatureCache
+from .export_operator import ExportFlorence2Onnx
+from .warm_operator import WarmFlorence2
 
 def register(plugin):
     """Register operators with the plugin."""
@@ -20,4 +24,12 @@ def register(plugin):
     plugin.register(DetectWithFlorence2)
     plugin.register(CaptionToPhraseGroundingWithFlorence2)
     plugin.register(ReferringExpressionSegmentationWithFlorence2)
+
+    # Register multi-task operator
+    plugin.register(RunFlorence2Tasks)
+
+    # Register maintenance operators
+    plugin.register(ClearFlorence2FeatureCache)
+    plugin.register(ExportFlorence2Onnx)
+    plugin.register(WarmFlorence2)
     
\ No newline at end of file
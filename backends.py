@@ -0,0 +1,619 @@
+import os
+import abc
+import json
+import shutil
+import logging
+import tempfile
+import threading
+import contextlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Available execution backends
+BACKENDS = ("torch", "onnx")
+DEFAULT_BACKEND = "torch"
+
+# Location of exported ONNX graphs, overridable via an environment variable
+DEFAULT_ONNX_DIR = os.environ.get(
+    "FLORENCE2_ONNX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "fiftyone_florence2", "onnx"),
+)
+
+DEFAULT_OPSET = 17
+
+# Files making up an exported model
+_VISION_ENCODER_FILE = "vision_encoder.onnx"
+_TEXT_ENCODER_FILE = "text_encoder.onnx"
+_DECODER_FILE = "decoder.onnx"
+_DECODER_WITH_PAST_FILE = "decoder_with_past.onnx"
+_CONFIG_FILE = "config.json"
+
+# Generation settings of the language model that the ONNX decoding loop applies
+_GENERATION_CONFIG_KEYS = (
+    "decoder_start_token_id",
+    "bos_token_id",
+    "eos_token_id",
+    "pad_token_id",
+    "forced_bos_token_id",
+    "forced_eos_token_id",
+    "no_repeat_ngram_size",
+)
+
+
+class Florence2Backend(abc.ABC):
+    """Base class of the engines running the compute-heavy parts of Florence-2.
+
+    A backend runs the vision encoder and the text encoder/decoder. Everything
+    else, i.e. preprocessing, prompt embedding and post-processing, stays in
+    :class:`florence2.Florence2` and is shared by all backends.
+    """
+
+    #: The name of the backend
+    name = None
+
+    @abc.abstractmethod
+    def encode_images(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Run the vision encoder.
+
+        Args:
+            pixel_values: Preprocessed images with shape (batch, 3, height, width)
+
+        Returns:
+            torch.Tensor: Image features with shape (batch, image_tokens, hidden_size)
+        """
+
+    @abc.abstractmethod
+    def generate(
+        self,
+        inputs_embeds: torch.Tensor,
+        attention_mask: torch.Tensor,
+        **generation_kwargs
+    ) -> torch.Tensor:
+        """Run the text encoder and decode the output tokens.
+
+        Args:
+            inputs_embeds: Image features followed by prompt embeddings, with shape
+                (batch, tokens, hidden_size)
+            attention_mask: Attention mask of ``inputs_embeds``, with shape
+                (batch, tokens)
+            **generation_kwargs: Decoding settings such as ``num_beams`` and
+                ``max_new_tokens``
+
+        Returns:
+            torch.Tensor: Generated token IDs with shape (batch, length), starting
+            with the decoder start token
+        """
+
+
+class TorchBackend(Florence2Backend):
+    """The reference backend, running the model eagerly in PyTorch.
+
+    Args:
+        model: A Florence-2 model
+    """
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+
+    def encode_images(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.model._encode_image(pixel_values)
+
+    def generate(
+        self,
+        inputs_embeds: torch.Tensor,
+        attention_mask: torch.Tensor,
+        **generation_kwargs
+    ) -> torch.Tensor:
+        return self.model.language_model.generate(
+            input_ids=None,
+            inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            do_sample=False,
+            **generation_kwargs,
+        )
+
+
+class _VisionEncoder(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model._encode_image(pixel_values)
+
+
+class _TextEncoder(torch.nn.Module):
+    def __init__(self, language_model):
+        super().__init__()
+        self.encoder = language_model.get_encoder()
+
+    def forward(self, inputs_embeds, attention_mask):
+        return self.encoder(
+            inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            return_dict=True,
+        ).last_hidden_state
+
+
+class _Decoder(torch.nn.Module):
+    """One decoding step, with the KV cache flattened into separate tensors.
+
+    Each decoder layer contributes four cache tensors: the self-attention keys and
+    values, which grow by one token per step, and the cross-attention keys and
+    values, which are computed on the first step and reused afterwards.
+    """
+
+    def __init__(self, language_model, with_past):
+        super().__init__()
+        self.decoder = language_model.get_decoder()
+        self.lm_head = language_model.lm_head
+        self.final_logits_bias = getattr(language_model, "final_logits_bias", None)
+        self.with_past = with_past
+
+    def forward(self, input_ids, encoder_hidden_states, encoder_attention_mask, *past):
+        past_key_values = None
+        if self.with_past:
+            past_key_values = tuple(
+                tuple(past[idx:idx + 4]) for idx in range(0, len(past), 4)
+            )
+
+        outputs = self.decoder(
+            input_ids=input_ids,
+            encoder_hidden_states=encoder_hidden_states,
+            encoder_attention_mask=encoder_attention_mask,
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+
+        logits = self.lm_head(outputs.last_hidden_state)
+        if self.final_logits_bias is not None:
+            logits = logits + self.final_logits_bias
+
+        presents = outputs.past_key_values
+        if hasattr(presents, "to_legacy_cache"):
+            presents = presents.to_legacy_cache()
+
+        return (logits,) + tuple(t for layer in presents for t in layer)
+
+
+def _run_session(session, inputs: Dict[str, np.ndarray]) -> List[np.ndarray]:
+    # Exported graphs drop inputs they don't use, e.g. the encoder states once the
+    # cross-attention cache exists
+    input_names = {i.name for i in session.get_inputs()}
+    return session.run(None, {k: v for k, v in inputs.items() if k in input_names})
+
+
+def _cache_names(prefix: str, num_layers: int) -> List[str]:
+    return [f"{prefix}_{idx}" for idx in range(4 * num_layers)]
+
+
+def _cache_axes(names: List[str], self_attn_axis: str) -> Dict[str, Dict[int, str]]:
+    # Self-attention caches grow with the output, cross-attention ones match the input
+    return {
+        name: {0: "batch", 2: self_attn_axis if idx % 4 < 2 else "encoder_tokens"}
+        for idx, name in enumerate(names)
+    }
+
+
+def get_export_dir(model_path: str, export_dir: Optional[str] = None) -> str:
+    """Get the directory holding the ONNX export of a checkpoint.
+
+    Args:
+        model_path: Model path or HuggingFace repo name
+        export_dir: Optional root directory of exports. Defaults to
+            ``FLORENCE2_ONNX_DIR`` or ``~/.cache/fiftyone_florence2/onnx``
+
+    Returns:
+        str: The export directory of the checkpoint
+    """
+    root = os.path.expanduser(export_dir or DEFAULT_ONNX_DIR)
+    return os.path.join(root, model_path.strip("/").replace("/", "--"))
+
+
+def is_exported(model_path: str, export_dir: Optional[str] = None) -> bool:
+    """Check whether a checkpoint has been exported to ONNX."""
+    return os.path.isfile(os.path.join(get_export_dir(model_path, export_dir), _CONFIG_FILE))
+
+
+@contextlib.contextmanager
+def _export_lock(output_dir: str):
+    """Hold an exclusive lock on an export directory, across threads and processes."""
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    with open(output_dir + ".lock", "a") as f:
+        try:
+            import fcntl
+        except ImportError:
+            # No file locks on Windows, where exports are still written atomically
+            yield
+            return
+
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@torch.no_grad()
+def export_onnx(
+    model,
+    model_path: str,
+    export_dir: Optional[str] = None,
+    image_size: Tuple[int, int] = (768, 768),
+    opset: int = DEFAULT_OPSET,
+    overwrite: bool = True,
+) -> str:
+    """Export a Florence-2 model to ONNX.
+
+    Four graphs are exported: the vision encoder, the text encoder, the first
+    decoding step and the following decoding steps, which reuse the KV cache.
+
+    The graphs are written to a temporary directory that is then moved into
+    place, so an export directory is either complete or missing. Exports of the
+    same checkpoint hold a lock on its export directory, so concurrent runs, e.g.
+    shard workers, wait for each other rather than writing the same files.
+
+    Args:
+        model: A Florence-2 model loaded in float32 on the CPU, which is where the
+            ONNX backend runs
+        model_path: Model path or HuggingFace repo name of the model
+        export_dir: Optional root directory of exports. Defaults to
+            ``FLORENCE2_ONNX_DIR`` or ``~/.cache/fiftyone_florence2/onnx``
+        image_size: The (width, height) of the preprocessed images
+        opset: ONNX opset version
+        overwrite: Whether to replace an existing export. If False, an existing
+            export, e.g. one that a concurrent run just finished, is kept
+
+    Returns:
+        str: The directory containing the exported graphs
+
+    Raises:
+        ValueError: If the model is not a float32 model on the CPU
+    """
+    param = next(model.parameters())
+    if param.device.type != "cpu" or param.dtype != torch.float32:
+        raise ValueError(
+            f"Only float32 models on the CPU can be exported, not {param.dtype} "
+            f"on {param.device}"
+        )
+
+    output_dir = get_export_dir(model_path, export_dir)
+    with _export_lock(output_dir):
+        if not overwrite and is_exported(model_path, export_dir):
+            return output_dir
+
+        _export_to(model, model_path, output_dir, image_size, opset)
+
+    return output_dir
+
+
+def _export_to(model, model_path, output_dir, image_size, opset):
+    """Export the graphs of a model into place, replacing any previous export."""
+    logger.info("Exporting %s to ONNX in %s", model_path, output_dir)
+
+    tmp_dir = tempfile.mkdtemp(
+        prefix=os.path.basename(output_dir) + ".", suffix=".tmp", dir=os.path.dirname(output_dir)
+    )
+    old_dir = None
+    try:
+        _export_graphs(model, model_path, tmp_dir, image_size, opset)
+
+        # Move any previous export aside first, as directories can only replace
+        # empty ones
+        if os.path.isdir(output_dir):
+            old_dir = tmp_dir + ".old"
+            os.replace(output_dir, old_dir)
+        os.replace(tmp_dir, output_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _export_graphs(model, model_path, output_dir, image_size, opset):
+    """Write the ONNX graphs and config of a model to a directory."""
+    language_model = model.language_model
+    num_layers = language_model.config.decoder_layers
+
+    # Vision encoder
+    width, height = image_size
+    pixel_values = torch.zeros((1, 3, height, width))
+    torch.onnx.export(
+        _VisionEncoder(model),
+        (pixel_values,),
+        os.path.join(output_dir, _VISION_ENCODER_FILE),
+        input_names=["pixel_values"],
+        output_names=["image_features"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "image_features": {0: "batch"}},
+        opset_version=opset,
+    )
+
+    # Text encoder, run on dummy image features followed by a short prompt
+    image_features = model._encode_image(pixel_values)
+    prompt_embeds = language_model.get_input_embeddings()(torch.tensor([[0, 100, 2]]))
+    inputs_embeds = torch.cat([image_features, prompt_embeds], dim=1)
+    attention_mask = torch.ones(inputs_embeds.shape[:2], dtype=torch.long)
+    torch.onnx.export(
+        _TextEncoder(language_model),
+        (inputs_embeds, attention_mask),
+        os.path.join(output_dir, _TEXT_ENCODER_FILE),
+        input_names=["inputs_embeds", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "inputs_embeds": {0: "batch", 1: "encoder_tokens"},
+            "attention_mask": {0: "batch", 1: "encoder_tokens"},
+            "last_hidden_state": {0: "batch", 1: "encoder_tokens"},
+        },
+        opset_version=opset,
+    )
+
+    # First decoding step, which creates the KV cache
+    encoder_hidden_states = _TextEncoder(language_model)(inputs_embeds, attention_mask)
+    start_token_id = language_model.config.decoder_start_token_id
+    input_ids = torch.full((1, 1), start_token_id, dtype=torch.long)
+    decoder_inputs = (input_ids, encoder_hidden_states, attention_mask)
+    decoder_input_names = ["input_ids", "encoder_hidden_states", "encoder_attention_mask"]
+    decoder_axes = {
+        "input_ids": {0: "batch", 1: "tokens"},
+        "encoder_hidden_states": {0: "batch", 1: "encoder_tokens"},
+        "encoder_attention_mask": {0: "batch", 1: "encoder_tokens"},
+        "logits": {0: "batch", 1: "tokens"},
+    }
+    present_names = _cache_names("present", num_layers)
+
+    torch.onnx.export(
+        _Decoder(language_model, with_past=False),
+        decoder_inputs,
+        os.path.join(output_dir, _DECODER_FILE),
+        input_names=decoder_input_names,
+        output_names=["logits"] + present_names,
+        dynamic_axes={**decoder_axes, **_cache_axes(present_names, "tokens")},
+        opset_version=opset,
+    )
+
+    # Following decoding steps, which extend the KV cache by one token
+    past = _Decoder(language_model, with_past=False)(*decoder_inputs)[1:]
+    past_names = _cache_names("past", num_layers)
+
+    torch.onnx.export(
+        _Decoder(language_model, with_past=True),
+        decoder_inputs + tuple(past),
+        os.path.join(output_dir, _DECODER_WITH_PAST_FILE),
+        input_names=decoder_input_names + past_names,
+        output_names=["logits"] + present_names,
+        dynamic_axes={
+            **decoder_axes,
+            **_cache_axes(past_names, "past_tokens"),
+            **_cache_axes(present_names, "past_tokens_plus_one"),
+        },
+        opset_version=opset,
+    )
+
+    generation_config = language_model.generation_config
+    config = {
+        "model_path": model_path,
+        "num_layers": num_layers,
+        "image_size": list(image_size),
+        "generation_config": {
+            key: getattr(generation_config, key, None)
+            for key in _GENERATION_CONFIG_KEYS
+        },
+    }
+    with open(os.path.join(output_dir, _CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=4)
+
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _load_sessions(output_dir: str) -> Dict[str, Any]:
+    """Load the onnxruntime sessions of an export, sharing them within the process."""
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise ImportError(
+            "The ONNX backend requires onnxruntime; install it with "
+            "`pip install onnxruntime`"
+        )
+
+    with _SESSIONS_LOCK:
+        if output_dir not in _SESSIONS:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            _SESSIONS[output_dir] = {
+                name: ort.InferenceSession(
+                    os.path.join(output_dir, filename),
+                    sess_options=options,
+                    providers=["CPUExecutionProvider"],
+                )
+                for name, filename in (
+                    ("vision_encoder", _VISION_ENCODER_FILE),
+                    ("text_encoder", _TEXT_ENCODER_FILE),
+                    ("decoder", _DECODER_FILE),
+                    ("decoder_with_past", _DECODER_WITH_PAST_FILE),
+                )
+            }
+
+        return _SESSIONS[output_dir]
+
+
+class OnnxBackend(Florence2Backend):
+    """A backend running exported ONNX graphs with onnxruntime on the CPU.
+
+    The checkpoint is exported with :func:`export_onnx` the first time it is used,
+    and concurrent processes wait for that export rather than writing their own.
+    Output tokens are decoded greedily, applying the language model's forced
+    BOS/EOS tokens and n-gram repetition ban like ``generate()`` does, so outputs
+    match the torch backend with ``num_beams=1``. Beam search is not supported, and
+    settings requesting it fall back to greedy decoding.
+
+    Args:
+        model: A Florence-2 model, used to export the graphs if needed
+        model_path: Model path or HuggingFace repo name of the model
+        export_dir: Optional root directory of exports
+        image_size: The (width, height) of the preprocessed images
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model,
+        model_path: str,
+        export_dir: Optional[str] = None,
+        image_size: Tuple[int, int] = (768, 768),
+    ):
+        self.output_dir = get_export_dir(model_path, export_dir)
+        if not is_exported(model_path, export_dir):
+            export_onnx(
+                model, model_path, export_dir=export_dir, image_size=image_size, overwrite=False
+            )
+
+        with open(os.path.join(self.output_dir, _CONFIG_FILE)) as f:
+            self.config = json.load(f)
+
+        self.sessions = _load_sessions(self.output_dir)
+        self._warned_beams = False
+
+    def encode_images(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        (image_features,) = _run_session(
+            self.sessions["vision_encoder"],
+            {"pixel_values": pixel_values.float().cpu().numpy()},
+        )
+        return torch.from_numpy(image_features)
+
+    @staticmethod
+    def _banned_ngram_tokens(ngrams, tokens, ngram_size):
+        # Tokens that would repeat an n-gram already present in each row
+        banned = []
+        for row, row_tokens in enumerate(tokens):
+            prefix = tuple(row_tokens[len(row_tokens) - ngram_size + 1:])
+            banned.append(ngrams[row].get(prefix, ()))
+
+        return banned
+
+    @staticmethod
+    def _update_ngrams(ngrams, tokens, ngram_size):
+        for row, row_tokens in enumerate(tokens):
+            if len(row_tokens) >= ngram_size:
+                ngram = tuple(row_tokens[-ngram_size:])
+                ngrams[row][ngram[:-1]].add(ngram[-1])
+
+    def generate(
+        self,
+        inputs_embeds: torch.Tensor,
+        attention_mask: torch.Tensor,
+        **generation_kwargs
+    ) -> torch.Tensor:
+        if generation_kwargs.get("num_beams", 1) > 1 and not self._warned_beams:
+            logger.warning("The ONNX backend decodes greedily; ignoring num_beams")
+            self._warned_beams = True
+
+        max_new_tokens = generation_kwargs.get("max_new_tokens", 1024)
+        config = self.config["generation_config"]
+        eos_token_id = config["eos_token_id"]
+        pad_token_id = config["pad_token_id"]
+        ngram_size = config.get("no_repeat_ngram_size") or 0
+
+        attention_mask = attention_mask.cpu().numpy().astype(np.int64)
+        (encoder_hidden_states,) = _run_session(
+            self.sessions["text_encoder"],
+            {
+                "inputs_embeds": inputs_embeds.float().cpu().numpy(),
+                "attention_mask": attention_mask,
+            },
+        )
+
+        batch_size = encoder_hidden_states.shape[0]
+        tokens = np.full((batch_size, 1), config["decoder_start_token_id"], dtype=np.int64)
+        finished = np.zeros(batch_size, dtype=bool)
+        ngrams = [defaultdict(set) for _ in range(batch_size)]
+
+        inputs = {
+            "input_ids": tokens,
+            "encoder_hidden_states": encoder_hidden_states,
+            "encoder_attention_mask": attention_mask,
+        }
+        outputs = _run_session(self.sessions["decoder"], inputs)
+
+        for step in range(max_new_tokens):
+            logits = outputs[0][:, -1, :]
+
+            # Same logits processing as generate() with the model's generation config
+            if step == 0 and config.get("forced_bos_token_id") is not None:
+                forced = np.full_like(logits, -np.inf)
+                forced[:, config["forced_bos_token_id"]] = 0
+                logits = forced
+            elif step == max_new_tokens - 1 and config.get("forced_eos_token_id") is not None:
+                forced = np.full_like(logits, -np.inf)
+                forced[:, config["forced_eos_token_id"]] = 0
+                logits = forced
+            elif ngram_size > 0 and tokens.shape[1] >= ngram_size - 1:
+                banned = self._banned_ngram_tokens(ngrams, tokens.tolist(), ngram_size)
+                for row, row_banned in enumerate(banned):
+                    logits[row, list(row_banned)] = -np.inf
+
+            next_tokens = np.where(finished, pad_token_id, logits.argmax(axis=-1))
+            tokens = np.concatenate([tokens, next_tokens[:, None]], axis=1)
+
+            if ngram_size > 0:
+                self._update_ngrams(ngrams, tokens.tolist(), ngram_size)
+
+            finished |= next_tokens == eos_token_id
+            if finished.all():
+                break
+
+            inputs = {
+                "input_ids": next_tokens[:, None].astype(np.int64),
+                "encoder_hidden_states": encoder_hidden_states,
+                "encoder_attention_mask": attention_mask,
+            }
+            for idx, past in enumerate(outputs[1:]):
+                inputs[f"past_{idx}"] = past
+
+            outputs = _run_session(self.sessions["decoder_with_past"], inputs)
+
+        return torch.from_numpy(tokens)
+
+
+def get_backend(
+    name: str,
+    model,
+    model_path: str,
+    export_dir: Optional[str] = None,
+    image_size: Tuple[int, int] = (768, 768),
+) -> Florence2Backend:
+    """Create a backend for a loaded Florence-2 model.
+
+    Args:
+        name: Name of the backend, one of :data:`BACKENDS`
+        model: A Florence-2 model
+        model_path: Model path or HuggingFace repo name of the model
+        export_dir: Optional root directory of ONNX exports
+        image_size: The (width, height) of the preprocessed images
+
+    Returns:
+        Florence2Backend: The backend
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if name == "torch":
+        return TorchBackend(model)
+
+    if name == "onnx":
+        return OnnxBackend(
+            model, model_path, export_dir=export_dir, image_size=image_size
+        )
+
+    raise ValueError(f"Invalid backend: {name}. Must be one of {list(BACKENDS)}")
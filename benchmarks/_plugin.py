@@ -0,0 +1,29 @@
+import os
+import sys
+import types
+import importlib
+
+# Name under which the benchmarks import this plugin's modules
+PLUGIN_PACKAGE = "fiftyone_florence2_plugin"
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_plugin_module(name: str):
+    """Import one of the plugin's modules, e.g. ``"florence2"``.
+
+    The plugin directory is registered as a package first, so that its relative
+    imports work no matter what the directory is called.
+
+    Args:
+        name: Name of the module within the plugin
+
+    Returns:
+        module: The imported module
+    """
+    if PLUGIN_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGIN_PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PLUGIN_PACKAGE] = package
+
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.{name}")
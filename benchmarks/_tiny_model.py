@@ -0,0 +1,77 @@
+import os
+
+# Shapes of the tiny model. The vision tower keeps the DaViT layout of four
+# stages, with a single block each, and the language model keeps the BART
+# layout, with a single encoder and decoder layer
+TINY_VISION_CONFIG = {
+    "dim_embed": [16, 32, 64, 128],
+    "num_heads": [1, 2, 4, 8],
+    "num_groups": [1, 2, 4, 8],
+    "depths": [1, 1, 1, 1],
+}
+TINY_TEXT_CONFIG = {
+    "d_model": 64,
+    "encoder_layers": 1,
+    "decoder_layers": 1,
+    "encoder_attention_heads": 2,
+    "decoder_attention_heads": 2,
+    "encoder_ffn_dim": 128,
+    "decoder_ffn_dim": 128,
+}
+
+# Tiny checkpoints are stored in a subdirectory per source checkpoint
+TINY_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "fiftyone_florence2", "tiny")
+
+
+def make_tiny_checkpoint(source_model_path: str, output_dir: str = None, seed: int = 51) -> str:
+    """Create a tiny, randomly initialized Florence-2 checkpoint.
+
+    The configuration, modeling code and processor of ``source_model_path`` are
+    reused with much smaller layers, so the checkpoint exercises the same code
+    paths as the real model while loading instantly and running fast on CPU. Only
+    the small config, code and tokenizer files of the source checkpoint are
+    needed, not its weights, so once they are in the HuggingFace cache the tiny
+    checkpoint can be created offline, e.g. with ``HF_HUB_OFFLINE=1``.
+
+    The checkpoint is saved with its modeling code, and is only created once per
+    ``output_dir``.
+
+    Args:
+        source_model_path: HuggingFace repo name or local path of a Florence-2
+            checkpoint
+        output_dir: Directory in which to save the tiny checkpoint. Defaults to a
+            subdirectory of :data:`TINY_ROOT` named after the source checkpoint
+        seed: Random seed of the weights
+
+    Returns:
+        str: The path of the tiny checkpoint, usable as a ``model_path``
+    """
+    if output_dir is None:
+        output_dir = os.path.join(TINY_ROOT, source_model_path.strip("/").replace("/", "--"))
+
+    if os.path.isfile(os.path.join(output_dir, "config.json")):
+        return output_dir
+
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoProcessor
+
+    config = AutoConfig.from_pretrained(source_model_path, trust_remote_code=True)
+
+    for key, value in TINY_VISION_CONFIG.items():
+        setattr(config.vision_config, key, value)
+    for key, value in TINY_TEXT_CONFIG.items():
+        setattr(config.text_config, key, value)
+
+    # Image features are projected to the width of the language model
+    config.vision_config.projection_dim = TINY_TEXT_CONFIG["d_model"]
+    config.projection_dim = TINY_TEXT_CONFIG["d_model"]
+
+    torch.manual_seed(seed)
+    model = AutoModelForCausalLM.from_config(config, trust_remote_code=True)
+    processor = AutoProcessor.from_pretrained(source_model_path, trust_remote_code=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir)
+    processor.save_pretrained(output_dir)
+
+    return output_dir
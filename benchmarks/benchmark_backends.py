@@ -0,0 +1,116 @@
+"""Compare the latency and throughput of the Florence-2 execution backends.
+
+Runs the same images through each backend and reports the per-batch latency,
+the throughput and how often the outputs agree with the first backend. Greedy
+decoding is used by default, since the ONNX backend does not support beam
+search.
+
+Usage::
+
+    python benchmarks/benchmark_backends.py --operation caption --images /path/to/images
+    python benchmarks/benchmark_backends.py --operation detection --num-images 32 --cpu
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import import_plugin_module
+
+
+def _load_images(images_dir, num_images, size=768, seed=51):
+    from PIL import Image
+
+    if images_dir:
+        filepaths = sorted(
+            path
+            for ext in ("jpg", "jpeg", "png")
+            for path in glob.glob(os.path.join(images_dir, f"*.{ext}"))
+        )
+        return filepaths[:num_images]
+
+    # Smooth random images, so that decoding produces non-trivial outputs
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(num_images):
+        small = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+        images.append(Image.fromarray(small).resize((size, size), Image.BICUBIC))
+
+    return images
+
+
+def _benchmark(florence2, backend, images, args):
+    model = florence2.Florence2(
+        operation=args.operation,
+        model_path=args.model_path,
+        backend=backend,
+        generation_profile=args.generation_profile,
+    )
+
+    batches = [
+        images[idx:idx + args.batch_size]
+        for idx in range(0, len(images), args.batch_size)
+    ]
+
+    # Warm up, which also exports the ONNX graphs on first use
+    model.predict_all(batches[0])
+
+    outputs = []
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        outputs.extend(model.predict_all(batch))
+        latencies.append(time.perf_counter() - start)
+
+    return outputs, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--operation", default="caption")
+    parser.add_argument("--model-path", default="microsoft/Florence-2-base-ft")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--images", default=None, help="directory of images; synthetic if omitted")
+    parser.add_argument("--num-images", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--generation-profile", default="fast")
+    parser.add_argument("--cpu", action="store_true", help="hide GPUs from the torch backend")
+    args = parser.parse_args()
+
+    if args.cpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    florence2 = import_plugin_module("florence2")
+    parity = import_plugin_module("parity")
+
+    images = _load_images(args.images, args.num_images)
+    print(
+        f"{args.operation} on {len(images)} images, batch size {args.batch_size}, "
+        f"{args.generation_profile} profile\n"
+    )
+    print(f"{'backend':<10}{'mean ms/batch':>15}{'p90 ms/batch':>15}{'images/s':>12}{'agreement':>12}")
+
+    reference = None
+    for backend in args.backends:
+        outputs, latencies = _benchmark(florence2, backend, images, args)
+        if reference is None:
+            reference = outputs
+
+        agreement = np.mean(
+            [parity.compare_outputs(r, o) for r, o in zip(reference, outputs)]
+        )
+        print(
+            f"{backend:<10}"
+            f"{1000 * latencies.mean():>15.1f}"
+            f"{1000 * np.percentile(latencies, 90):>15.1f}"
+            f"{len(images) / latencies.sum():>12.2f}"
+            f"{agreement:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
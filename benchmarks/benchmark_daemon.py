@@ -0,0 +1,206 @@
+"""Measure how the inference daemon batches the requests of concurrent runs.
+
+Several clients, standing in for concurrent operator runs, each send their
+images in small batches to a daemon, which merges them into batches of up to
+``--max-batch-size`` images, waiting at most ``--max-wait-ms`` for requests to
+batch with. The benchmark reports the throughput, the p50/p95 latency of the
+clients' requests and the mean size of the batches the daemon ran, for each
+max wait in ``--max-wait-ms``. A max wait of 0 disables cross-request batching.
+
+By default the daemon runs in this process with a stub model, whose batches take
+a fixed time plus a time per image, so the benchmark runs entirely locally
+without torch or a checkpoint. It also checks that every client receives the
+results of its own images, in order, and exits with an error otherwise.
+
+With ``--real``, each daemon runs the ``--model-path`` checkpoint on synthetic
+JPEGs instead.
+
+Usage::
+
+    python benchmarks/benchmark_daemon.py
+    python benchmarks/benchmark_daemon.py --num-clients 8 --max-wait-ms 0 5 20 50
+    python benchmarks/benchmark_daemon.py --real --operation caption --cpu
+"""
+import os
+import sys
+import time
+import shutil
+import secrets
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import import_plugin_module
+
+
+class _StubModel(object):
+    """Mimics a model whose batches take a fixed time plus a time per image."""
+
+    def __init__(self, operation, batch_ms, image_ms):
+        self.operation = operation
+        self.batch_ms = batch_ms
+        self.image_ms = image_ms
+
+    def load_image(self, filepath):
+        return filepath
+
+    def predict_all(self, images, prompts=None):
+        time.sleep((self.batch_ms + self.image_ms * len(images)) / 1000)
+        if prompts is None:
+            prompts = [None] * len(images)
+
+        return [f"{self.operation}:{image}:{prompt}" for image, prompt in zip(images, prompts)]
+
+
+def _make_images(images_dir, num_images):
+    from benchmark_operations import _make_images as make_images
+
+    return make_images(images_dir, num_images, (1024, 768))
+
+
+def _run_client(daemon, address, operation, params, images, client_batch_size, latencies, errors):
+    client = daemon.DaemonClient(address)
+    try:
+        for start in range(0, len(images), client_batch_size):
+            batch = images[start:start + client_batch_size]
+            prompts = [f"prompt {image}" for image in batch]
+
+            request_start = time.perf_counter()
+            results = client.predict("stub", operation, params, batch, prompts=prompts)
+            latencies.append(time.perf_counter() - request_start)
+
+            # Stub results echo their inputs, so they must match the request's
+            if params.get("stub") and results != [
+                f"{operation}:{image}:{prompt}" for image, prompt in zip(batch, prompts)
+            ]:
+                errors.append(f"Mismatched results for {batch}")
+    except Exception as e:
+        errors.append(repr(e))
+    finally:
+        client.close()
+
+
+def _benchmark(daemon, args, max_wait_ms, images, address):
+    model_factory = None
+    params = {"stub": True}
+    if args.real:
+        params = {"generation_profile": "fast"}
+    else:
+        def model_factory(model_path, operation, params):
+            return _StubModel(operation, args.batch_ms, args.image_ms)
+
+    server = daemon.Florence2Daemon(
+        address=address,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=max_wait_ms,
+        model_factory=model_factory,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    server.ready.wait(timeout=10)
+
+    latencies, errors, clients = [], [], []
+    for idx in range(args.num_clients):
+        client_images = images
+        if not args.real:
+            client_images = [f"client{idx}/{image}" for image in images]
+
+        clients.append(
+            threading.Thread(
+                target=_run_client,
+                args=(
+                    daemon,
+                    address,
+                    args.operation if args.real else f"op{idx % args.num_models}",
+                    params,
+                    client_images,
+                    args.client_batch_size,
+                    latencies,
+                    errors,
+                ),
+            )
+        )
+
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    runtime = time.perf_counter() - start
+
+    info = server.info()
+    server.shutdown()
+    thread.join(timeout=10)
+
+    return {
+        "images_per_second": args.num_clients * len(images) / runtime,
+        "p50": np.percentile(latencies, 50) if latencies else float("nan"),
+        "p95": np.percentile(latencies, 95) if latencies else float("nan"),
+        "mean_batch_size": info["mean_batch_size"] or 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-clients", type=int, default=4)
+    parser.add_argument("--num-images", type=int, default=64, help="images per client")
+    parser.add_argument("--client-batch-size", type=int, default=2)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0, 5, 20])
+    parser.add_argument("--num-models", type=int, default=1, help="stub models clients use")
+    parser.add_argument("--batch-ms", type=float, default=20.0, help="stub time per batch")
+    parser.add_argument("--image-ms", type=float, default=2.0, help="stub time per image")
+    parser.add_argument("--real", action="store_true", help="run a real checkpoint")
+    parser.add_argument("--model-path", default="microsoft/Florence-2-base-ft")
+    parser.add_argument("--operation", default="caption")
+    parser.add_argument("--cpu", action="store_true", help="hide GPUs")
+    args = parser.parse_args()
+
+    if args.cpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    # A throwaway key and socket, so a running daemon is left alone
+    os.environ["FLORENCE2_DAEMON_AUTHKEY"] = secrets.token_hex(16)
+    daemon = import_plugin_module("daemon")
+
+    work_dir = tempfile.mkdtemp(prefix="florence2_daemon_")
+    address = os.path.join(work_dir, "daemon.sock")
+    try:
+        if args.real:
+            images = _make_images(work_dir, args.num_images)
+        else:
+            images = [f"{idx:06d}.jpg" for idx in range(args.num_images)]
+
+        print(
+            f"{args.num_clients} clients sending {args.num_images} images each in "
+            f"requests of {args.client_batch_size}, max batch size {args.max_batch_size}\n"
+        )
+        print(f"{'max wait ms':<14}{'images/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'batch size':>12}")
+
+        failed = False
+        for max_wait_ms in args.max_wait_ms:
+            result = _benchmark(daemon, args, max_wait_ms, images, address)
+            print(
+                f"{max_wait_ms:<14g}"
+                f"{result['images_per_second']:>10.1f}"
+                f"{1000 * result['p50']:>10.1f}"
+                f"{1000 * result['p95']:>10.1f}"
+                f"{result['mean_batch_size']:>12.1f}"
+            )
+            for error in result["errors"]:
+                print(f"  error: {error}")
+                failed = True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Micro-benchmarks of the conversion of Florence-2 geometry to FiftyOne labels.
+
+Compares the vectorized conversions used by the plugin with the per-element
+Python loops they replaced, on synthetic outputs with many regions, such as
+dense region captions or ``<OCR_WITH_REGION>`` on document images, and on
+synthetic segmentation contours with many vertices, with and without
+simplification.
+
+Usage::
+
+    python benchmarks/benchmark_geometry.py --num-boxes 50 200 1000
+    python benchmarks/benchmark_geometry.py --num-points 500 2000 --tolerance 0.002
+"""
+import os
+import sys
+import timeit
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import import_plugin_module
+
+WIDTH, HEIGHT = 768, 768
+
+
+def _legacy_convert_bbox(bbox, width, height):
+    # The per-box conversion used before vectorization
+    if len(bbox) == 4:
+        return [
+            bbox[0] / width,
+            bbox[1] / height,
+            (bbox[2] - bbox[0]) / width,
+            (bbox[3] - bbox[1]) / height,
+        ]
+
+    x1, y1, x2, y2, x3, y3, x4, y4 = bbox
+    x_min, x_max = min(x1, x2, x3, x4), max(x1, x2, x3, x4)
+    y_min, y_max = min(y1, y2, y3, y4), max(y1, y2, y3, y4)
+    return [x_min / width, y_min / height, (x_max - x_min) / width, (y_max - y_min) / height]
+
+
+def _legacy_convert_polyline(contour, width, height):
+    # The per-point conversion used before vectorization
+    points = []
+    for idx in range(0, len(contour) - 1, 2):
+        points.append((contour[idx] / width, contour[idx + 1] / height))
+
+    return points
+
+
+def _random_contour(num_points, rng):
+    # A noisy ellipse, like the dense outlines produced by segmentation
+    angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
+    radii = 1 + 0.05 * rng.standard_normal(num_points)
+    xs = WIDTH / 2 + 0.3 * WIDTH * radii * np.cos(angles)
+    ys = HEIGHT / 2 + 0.2 * HEIGHT * radii * np.sin(angles)
+    return np.stack([xs, ys], axis=1).round(1).ravel().tolist()
+
+
+def _random_boxes(num_boxes, num_coords, rng):
+    if num_coords == 4:
+        top_left = rng.uniform(0, WIDTH / 2, size=(num_boxes, 2))
+        size = rng.uniform(1, WIDTH / 2, size=(num_boxes, 2))
+        return np.hstack([top_left, top_left + size]).round(1).tolist()
+
+    return rng.uniform(0, WIDTH, size=(num_boxes, 8)).round(1).tolist()
+
+
+def _time(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def benchmark_bboxes(florence2, num_boxes_list, number):
+    from fiftyone.core.labels import Detection
+
+    rng = np.random.default_rng(51)
+    print(f"{'layout':<8}{'boxes':>8}{'loop ms':>12}{'vectorized ms':>16}{'speedup':>10}")
+
+    for num_coords, layout in ((4, "bbox"), (8, "quad")):
+        for num_boxes in num_boxes_list:
+            bboxes = _random_boxes(num_boxes, num_coords, rng)
+            labels = [f"region {idx}" for idx in range(num_boxes)]
+
+            def loop():
+                return [
+                    Detection(label=label, bounding_box=_legacy_convert_bbox(bbox, WIDTH, HEIGHT))
+                    for bbox, label in zip(bboxes, labels)
+                ]
+
+            def vectorized():
+                boxes = florence2._convert_bboxes(bboxes, WIDTH, HEIGHT).tolist()
+                return [
+                    Detection(label=label, bounding_box=box)
+                    for box, label in zip(boxes, labels)
+                ]
+
+            # Both implementations must agree before being compared
+            expected = [d.bounding_box for d in loop()]
+            actual = [d.bounding_box for d in vectorized()]
+            assert np.allclose(expected, actual), "vectorized boxes differ from the loop"
+
+            loop_time = _time(loop, number)
+            vectorized_time = _time(vectorized, number)
+            print(
+                f"{layout:<8}{num_boxes:>8}"
+                f"{1000 * loop_time:>12.3f}{1000 * vectorized_time:>16.3f}"
+                f"{loop_time / vectorized_time:>9.1f}x"
+            )
+
+
+def benchmark_polylines(florence2, num_points_list, tolerance, number):
+    import bson
+    from fiftyone.core.labels import Polyline, Polylines
+
+    rng = np.random.default_rng(51)
+    print(
+        f"{'points':>8}{'loop ms':>12}{'vectorized ms':>16}{'simplified ms':>16}"
+        f"{'kept':>8}{'doc KB':>10}{'simplified KB':>16}"
+    )
+
+    def _doc_size(points):
+        label = Polylines(polylines=[Polyline(points=[points], closed=True, filled=True)])
+        return len(bson.BSON.encode(label.to_dict())) / 1024
+
+    for num_points in num_points_list:
+        contour = _random_contour(num_points, rng)
+
+        def loop():
+            return _legacy_convert_polyline(contour, WIDTH, HEIGHT)
+
+        def vectorized():
+            return florence2._convert_polyline(contour, WIDTH, HEIGHT)
+
+        def simplified():
+            return florence2._convert_polyline(contour, WIDTH, HEIGHT, tolerance=tolerance)
+
+        # Both implementations must agree before being compared
+        assert np.allclose(loop(), vectorized()), "vectorized points differ from the loop"
+
+        simplified_points = simplified()
+        print(
+            f"{num_points:>8}"
+            f"{1000 * _time(loop, number):>12.3f}"
+            f"{1000 * _time(vectorized, number):>16.3f}"
+            f"{1000 * _time(simplified, number):>16.3f}"
+            f"{len(simplified_points):>8}"
+            f"{_doc_size(vectorized()):>10.1f}"
+            f"{_doc_size(simplified_points):>16.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-boxes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--num-points", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument(
+        "--tolerance", type=float, default=0.002, help="relative simplification tolerance"
+    )
+    parser.add_argument("--number", type=int, default=20, help="calls per timing")
+    args = parser.parse_args()
+
+    florence2 = import_plugin_module("florence2")
+
+    benchmark_bboxes(florence2, args.num_boxes, args.number)
+    print()
+    benchmark_polylines(florence2, args.num_points, args.tolerance, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Benchmark the five Florence-2 operations end to end on a synthetic image set.
+
+Each operation runs through the same batched pipeline as the operators, on a
+temporary dataset of synthetic JPEGs, and the benchmark reports its throughput,
+the p50/p95 latency of its batches, its peak RSS, its generated tokens/sec and
+the time recorded by the pipeline's profiler in each stage:
+
+- load: reading and resizing the image files, in the prefetch threads
+- preprocess: converting images to pixel values
+- transfer: moving pixel values to the model's device
+- encode: the vision encoder
+- embed: embedding the prompts and merging them with the image features
+- generate: the text encoder/decoder
+- batch_decode: decoding the generated tokens to text
+- post_process: parsing the text with the processor
+- convert: converting the parsed outputs to FiftyOne labels
+- write: the bulk writes to the database
+
+Loading runs in background threads, so its time overlaps the other stages.
+
+With ``--tiny``, a tiny randomly initialized model with the layout of
+``--model-path`` is used instead of its weights (see ``_tiny_model.py``), which
+runs offline on CPU once the checkpoint's config and code are cached. Its outputs
+are meaningless, but every stage runs as it does for the real model.
+
+Usage::
+
+    python benchmarks/benchmark_operations.py --num-images 64 --resolution 1024
+    HF_HUB_OFFLINE=1 python benchmarks/benchmark_operations.py --tiny --cpu
+    python benchmarks/benchmark_operations.py --operations caption detection --batch-size 4
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import import_plugin_module
+from _tiny_model import make_tiny_checkpoint
+
+OPERATIONS = ("caption", "ocr", "detection", "phrase_grounding", "segmentation")
+
+# Field holding the per-sample captions used by phrase grounding
+CAPTION_FIELD = "benchmark_caption"
+
+# Parameters of each operation. Phrase grounding reads per-sample prompts, the
+# other operations use a single prompt
+OPERATION_PARAMS = {
+    "caption": {"detail_level": "basic"},
+    "ocr": {"store_region_info": True},
+    "detection": {"detection_type": "detection"},
+    "phrase_grounding": {"caption_field": CAPTION_FIELD},
+    "segmentation": {"expression": "the object in the center"},
+}
+
+CAPTIONS = [
+    "a red car parked next to a building",
+    "two people walking a dog on the beach",
+    "a bowl of fruit on a wooden table",
+    "a cat sleeping on a sofa",
+]
+
+STAGES = (
+    "load",
+    "preprocess",
+    "transfer",
+    "encode",
+    "embed",
+    "generate",
+    "batch_decode",
+    "post_process",
+    "convert",
+    "write",
+)
+
+
+def _reset_peak_rss():
+    # Linux resets the peak RSS of a process when "5" is written to clear_refs
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # Peak of the whole process, in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _make_images(images_dir, num_images, resolution, seed=51):
+    from PIL import Image
+
+    # Smooth random images, so that JPEG decoding does realistic work
+    rng = np.random.default_rng(seed)
+    filepaths = []
+    for idx in range(num_images):
+        small = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+        image = Image.fromarray(small).resize(resolution, Image.BICUBIC)
+
+        filepath = os.path.join(images_dir, f"{idx:06d}.jpg")
+        image.save(filepath, quality=90)
+        filepaths.append(filepath)
+
+    return filepaths
+
+
+def _make_dataset(filepaths):
+    import fiftyone as fo
+
+    dataset = fo.Dataset()
+    dataset.add_samples(
+        [
+            fo.Sample(filepath=filepath, **{CAPTION_FIELD: CAPTIONS[idx % len(CAPTIONS)]})
+            for idx, filepath in enumerate(filepaths)
+        ]
+    )
+
+    return dataset
+
+
+def _benchmark(florence2, dataset, operation, args):
+    params = dict(OPERATION_PARAMS[operation])
+    params["generation_profile"] = args.generation_profile
+    if args.max_new_tokens is not None:
+        params["generation_kwargs"] = {"max_new_tokens": args.max_new_tokens}
+
+    model, prompt_field = florence2._load_task(operation, model_path=args.model_path, **params)
+
+    # Warm up, so that lazy initialization isn't timed
+    warmup = dataset.first()
+    prompts = [warmup[prompt_field]] if prompt_field is not None else None
+    model.predict_all([model.load_image(warmup.filepath)], prompts=prompts)
+
+    profiler = florence2._make_profiler(True)
+    _reset_peak_rss()
+
+    batch_ends = []
+
+    def _progress(completed, total):
+        batch_ends.append(time.perf_counter())
+
+    output_field = f"benchmark_{operation}"
+    start = time.perf_counter()
+    florence2._apply_tasks_batched(
+        dataset,
+        [(output_field, model, prompt_field)],
+        batch_size=args.batch_size,
+        skip_failures=False,
+        progress=_progress,
+        profiler=profiler,
+    )
+    runtime = time.perf_counter() - start
+
+    latencies = np.diff([start] + batch_ends)
+    summary = profiler.summary()
+    return {
+        "images_per_second": len(dataset) / runtime,
+        "p50": np.percentile(latencies, 50),
+        "p95": np.percentile(latencies, 95),
+        "peak_rss_mb": _peak_rss_mb(),
+        "tokens_per_second": (summary["tokens_per_second"] or {}).get("total") or 0.0,
+        "stages": {
+            stage: summary["stages"].get(stage, {}).get("total", 0.0) for stage in STAGES
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--model-path", default="microsoft/Florence-2-base-ft")
+    parser.add_argument("--tiny", action="store_true", help="use a tiny random model")
+    parser.add_argument("--num-images", type=int, default=32)
+    parser.add_argument(
+        "--resolution", type=int, nargs="+", default=[1024, 768], help="width [height]"
+    )
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--generation-profile", default="fast")
+    parser.add_argument("--max-new-tokens", type=int, default=None)
+    parser.add_argument("--cpu", action="store_true", help="hide GPUs")
+    args = parser.parse_args()
+
+    if args.cpu:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    if args.tiny:
+        args.model_path = make_tiny_checkpoint(args.model_path)
+
+        # Random weights rarely emit EOS, so bound the decoding length
+        if args.max_new_tokens is None:
+            args.max_new_tokens = 32
+
+    width, height = (args.resolution * 2)[:2]
+
+    florence2 = import_plugin_module("florence2")
+
+    images_dir = tempfile.mkdtemp(prefix="florence2_benchmark_")
+    dataset = None
+    try:
+        dataset = _make_dataset(_make_images(images_dir, args.num_images, (width, height)))
+
+        print(
+            f"{args.num_images} images at {width}x{height}, batch size {args.batch_size}, "
+            f"{args.generation_profile} profile, model {args.model_path}\n"
+        )
+        print(
+            f"{'operation':<18}{'images/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}"
+            f"{'tokens/s':>10}"
+            + "".join(f"{stage + ' s':>15}" for stage in STAGES)
+        )
+
+        for operation in args.operations:
+            result = _benchmark(florence2, dataset, operation, args)
+            print(
+                f"{operation:<18}"
+                f"{result['images_per_second']:>10.2f}"
+                f"{1000 * result['p50']:>10.1f}"
+                f"{1000 * result['p95']:>10.1f}"
+                f"{result['peak_rss_mb']:>10.0f}"
+                f"{result['tokens_per_second']:>10.1f}"
+                + "".join(f"{result['stages'][stage]:>15.3f}" for stage in STAGES)
+            )
+    finally:
+        if dataset is not None:
+            dataset.delete()
+
+        shutil.rmtree(images_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
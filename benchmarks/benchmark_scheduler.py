@@ -0,0 +1,123 @@
+"""Measure the latency of interactive runs while bulk runs share the model.
+
+Several bulk jobs, standing in for long captioning runs, take turns in the
+process-wide scheduler with batches of ``--bulk-batch-ms``, while interactive
+jobs, standing in for runs on a few samples selected in the App, arrive every
+``--interval-ms``. The benchmark reports the end-to-end latency of the
+interactive jobs, the share of model time each bulk job got and the bulk
+throughput, once with the interactive jobs scheduled as interactive and once as
+bulk, i.e. without priorities.
+
+Batches are simulated with sleeps, so the benchmark runs entirely locally
+without torch or a checkpoint; the scheduling is the same as for real runs.
+
+Usage::
+
+    python benchmarks/benchmark_scheduler.py
+    python benchmarks/benchmark_scheduler.py --num-bulk-jobs 2 --bulk-batch-ms 500
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import import_plugin_module
+
+
+def _run_job(scheduler, priority, name, num_batches, batch_ms, stop=None):
+    with scheduler.job(priority, name=name) as job:
+        for _ in range(num_batches):
+            if stop is not None and stop.is_set():
+                break
+
+            with job.turn():
+                time.sleep(batch_ms / 1000)
+
+        return job.stats()
+
+
+def _benchmark(scheduler_module, args, interactive_priority):
+    scheduler = scheduler_module.InferenceScheduler()
+    stop = threading.Event()
+
+    bulk_stats = [None] * args.num_bulk_jobs
+
+    def _bulk(idx):
+        bulk_stats[idx] = _run_job(
+            scheduler, "bulk", f"bulk{idx}", 10 ** 6, args.bulk_batch_ms, stop=stop
+        )
+
+    bulk_threads = [
+        threading.Thread(target=_bulk, args=(idx,)) for idx in range(args.num_bulk_jobs)
+    ]
+    start = time.perf_counter()
+    for thread in bulk_threads:
+        thread.start()
+
+    # Interactive jobs arrive one after the other while the bulk jobs run
+    latencies = []
+    for _ in range(args.num_interactive):
+        time.sleep(args.interval_ms / 1000)
+        job_start = time.perf_counter()
+        _run_job(
+            scheduler,
+            interactive_priority,
+            "interactive",
+            args.interactive_batches,
+            args.interactive_batch_ms,
+        )
+        latencies.append(time.perf_counter() - job_start)
+
+    stop.set()
+    for thread in bulk_threads:
+        thread.join()
+    runtime = time.perf_counter() - start
+
+    service = [stats["service_time"] for stats in bulk_stats]
+    return {
+        "p50": np.percentile(latencies, 50),
+        "p95": np.percentile(latencies, 95),
+        "bulk_batches_per_second": sum(stats["num_turns"] for stats in bulk_stats) / runtime,
+        "bulk_shares": [s / sum(service) for s in service],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-bulk-jobs", type=int, default=3)
+    parser.add_argument("--bulk-batch-ms", type=float, default=200.0)
+    parser.add_argument("--num-interactive", type=int, default=10)
+    parser.add_argument("--interactive-batches", type=int, default=2, help="batches per job")
+    parser.add_argument("--interactive-batch-ms", type=float, default=30.0)
+    parser.add_argument("--interval-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    scheduler = import_plugin_module("scheduler")
+
+    print(
+        f"{args.num_bulk_jobs} bulk jobs with {args.bulk_batch_ms:g} ms batches, "
+        f"{args.num_interactive} interactive jobs of {args.interactive_batches} x "
+        f"{args.interactive_batch_ms:g} ms batches\n"
+    )
+    print(
+        f"{'interactive as':<16}{'p50 ms':>10}{'p95 ms':>10}{'bulk batches/s':>16}"
+        f"  bulk shares"
+    )
+
+    for priority in ("interactive", "bulk"):
+        result = _benchmark(scheduler, args, priority)
+        print(
+            f"{priority:<16}"
+            f"{1000 * result['p50']:>10.1f}"
+            f"{1000 * result['p95']:>10.1f}"
+            f"{result['bulk_batches_per_second']:>16.2f}"
+            f"  {', '.join(f'{share:.0%}' for share in result['bulk_shares'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
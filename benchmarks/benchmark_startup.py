@@ -0,0 +1,142 @@
+"""Measure how long it takes to import the plugin and register its operators.
+
+This is the cost that the FiftyOne App server and every delegated operation
+worker pay for the plugin, whether or not a Florence-2 operator ever runs. Each
+measurement runs in a fresh interpreter, after FiftyOne itself has been
+imported, and also reports whether the heavy ML libraries were imported.
+
+With ``--compare-ref``, the plugin at a git ref, e.g. the commit before a change,
+is measured as well.
+
+Usage::
+
+    python benchmarks/benchmark_startup.py
+    python benchmarks/benchmark_startup.py --compare-ref HEAD~1 --repeat 10
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _plugin import PLUGIN_DIR, PLUGIN_PACKAGE
+
+HEAVY_MODULES = ("torch", "transformers")
+
+# Runs in a fresh interpreter with the plugin directory as its argument
+_MEASURE_SCRIPT = """
+import os, sys, json, time, importlib.util
+
+plugin_dir, package, heavy_modules = sys.argv[1], sys.argv[2], sys.argv[3].split(",")
+
+start = time.perf_counter()
+import fiftyone.operators
+fiftyone_time = time.perf_counter() - start
+
+class Plugin(object):
+    # Mimics FiftyOne's plugin context, which instantiates each operator
+    def __init__(self):
+        self.operators = []
+
+    def register(self, cls):
+        operator = cls()
+        operator.config
+        self.operators.append(operator)
+
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(
+    package,
+    os.path.join(plugin_dir, "__init__.py"),
+    submodule_search_locations=[plugin_dir],
+)
+module = importlib.util.module_from_spec(spec)
+sys.modules[package] = module
+spec.loader.exec_module(module)
+import_time = time.perf_counter() - start
+
+plugin = Plugin()
+start = time.perf_counter()
+module.register(plugin)
+register_time = time.perf_counter() - start
+
+print(json.dumps({
+    "fiftyone": fiftyone_time,
+    "import": import_time,
+    "register": register_time,
+    "num_operators": len(plugin.operators),
+    "heavy_modules": [name for name in heavy_modules if name in sys.modules],
+}))
+"""
+
+
+def _measure(plugin_dir, repeat):
+    results = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                _MEASURE_SCRIPT,
+                plugin_dir,
+                PLUGIN_PACKAGE,
+                ",".join(HEAVY_MODULES),
+            ],
+            cwd=tempfile.gettempdir(),
+            text=True,
+        )
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    return results
+
+
+def _export_ref(ref, output_dir):
+    # Extract the plugin's files at a git ref, without touching the working tree
+    archive = subprocess.run(
+        ["git", "-C", PLUGIN_DIR, "archive", "--format=tar", ref],
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+    subprocess.run(["tar", "-x", "-C", output_dir], input=archive.stdout, check=True)
+
+
+def _report(name, results):
+    plugin_times = [r["import"] + r["register"] for r in results]
+    print(
+        f"{name:<20}"
+        f"{1000 * np.median([r['fiftyone'] for r in results]):>14.0f}"
+        f"{1000 * np.median(plugin_times):>14.0f}"
+        f"{1000 * np.max(plugin_times):>12.0f}"
+        f"{results[0]['num_operators']:>11}"
+        f"  {', '.join(results[0]['heavy_modules']) or '-'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per tree")
+    parser.add_argument("--compare-ref", default=None, help="git ref to compare against")
+    args = parser.parse_args()
+
+    print(
+        f"{'plugin':<20}{'fiftyone ms':>14}{'median ms':>14}{'max ms':>12}"
+        f"{'operators':>11}  heavy modules imported"
+    )
+
+    if args.compare_ref is not None:
+        ref_dir = tempfile.mkdtemp(prefix="florence2_startup_")
+        try:
+            _export_ref(args.compare_ref, ref_dir)
+            _report(args.compare_ref, _measure(ref_dir, args.repeat))
+        finally:
+            shutil.rmtree(ref_dir, ignore_errors=True)
+
+    _report("working tree", _measure(PLUGIN_DIR, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
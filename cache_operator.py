@@ -0,0 +1,55 @@
+import os
+os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
+import fiftyone as fo
+import fiftyone.operators as foo
+from fiftyone.operators import types
+
+class ClearFlorence2FeatureCache(foo.Operator):
+    @property
+    def config(self):
+        return foo.OperatorConfig(
+            name="clear_florence2_feature_cache",
+            label="Clear Florence-2 feature cache",
+            description="Delete the cached Florence-2 image features from disk",
+            icon="/assets/santa-maria-del-fiore-svgrepo-com.svg",
+            dynamic=True,
+        )
+
+    def resolve_input(self, ctx):
+        inputs = types.Object()
+
+        # Only the configured cache can be cleared, so that no arbitrary directory
+        # can be targeted from the App
+        inputs.view(
+            "notice",
+            types.Notice(
+                label=(
+                    "All cached image features in the configured cache directory "
+                    "(FLORENCE2_FEATURE_CACHE_DIR, by default "
+                    "~/.cache/fiftyone_florence2/features) will be deleted. Later runs "
+                    "with the feature cache enabled will re-encode every image"
+                )
+            ),
+        )
+
+        return types.Property(inputs)
+
+    def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .feature_cache import clear_feature_cache
+
+        freed_bytes = clear_feature_cache()
+
+        return {"freed_mb": round(freed_bytes / 1024 ** 2, 1)}
+
+    def resolve_output(self, ctx):
+        outputs = types.Object()
+        outputs.float("freed_mb", label="Freed space (MB)")
+
+        return types.Property(outputs)
+
+    def __call__(self):
+        ctx = dict()
+        params = dict()
+
+        return foo.execute_operator(self.uri, ctx, params=params)
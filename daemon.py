@@ -0,0 +1,631 @@
+import os
+import sys
+import json
+import time
+import types
+import socket
+import logging
+import secrets
+import argparse
+import importlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Value of the ``backend`` parameter that runs operations through the daemon
+DAEMON_BACKEND = "daemon"
+
+# Directory holding the daemon's socket and authentication key
+DEFAULT_DAEMON_DIR = os.environ.get(
+    "FLORENCE2_DAEMON_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "fiftyone_florence2", "daemon"),
+)
+
+# Address of the daemon: a Unix socket path, or "localhost:<port>"
+DEFAULT_DAEMON_ADDRESS = os.environ.get(
+    "FLORENCE2_DAEMON_ADDRESS", os.path.join(DEFAULT_DAEMON_DIR, "daemon.sock")
+)
+
+# Maximum number of images the daemon runs through the model at a time
+DEFAULT_MAX_BATCH_SIZE = 16
+
+# Maximum number of milliseconds a request waits for others to batch with
+DEFAULT_MAX_WAIT_MS = 20
+
+# Hosts the daemon may listen on over TCP. Requests are pickled, so the daemon
+# must never be reachable from other machines
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+_AUTHKEY_FILE = "authkey"
+
+# Name under which the daemon imports this plugin's modules when run as a script
+_DAEMON_PACKAGE = "_florence2_daemon_plugin"
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """Parse a daemon address into a :mod:`multiprocessing.connection` family and address.
+
+    Args:
+        address: A Unix socket path, or ``"<host>:<port>"`` with a local host
+
+    Returns:
+        tuple: The ``(family, address)`` pair
+
+    Raises:
+        ValueError: If a TCP address is not local
+    """
+    if ":" in address and os.sep not in address:
+        host, port = address.rsplit(":", 1)
+        host = host.strip("[]")
+        if host not in LOCAL_HOSTS:
+            raise ValueError(
+                f"The Florence-2 daemon only listens on {LOCAL_HOSTS}, not '{host}'"
+            )
+
+        return ("AF_INET6" if ":" in host else "AF_INET"), (host, int(port))
+
+    return "AF_UNIX", os.path.expanduser(address)
+
+
+def get_authkey(create: bool = False) -> bytes:
+    """Get the key authenticating clients to the daemon.
+
+    The key is read from ``FLORENCE2_DAEMON_AUTHKEY`` if set, otherwise from a file
+    in :data:`DEFAULT_DAEMON_DIR` that only the current user can read.
+
+    Args:
+        create: Whether to create the key file if it doesn't exist
+
+    Returns:
+        bytes: The key
+
+    Raises:
+        RuntimeError: If there is no key and ``create`` is False
+    """
+    if os.environ.get("FLORENCE2_DAEMON_AUTHKEY"):
+        return os.environ["FLORENCE2_DAEMON_AUTHKEY"].encode("utf-8")
+
+    path = os.path.join(DEFAULT_DAEMON_DIR, _AUTHKEY_FILE)
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            return f.read().strip()
+
+    if not create:
+        raise RuntimeError(
+            f"No Florence-2 daemon key found at {path}. Is the daemon running?"
+        )
+
+    os.makedirs(DEFAULT_DAEMON_DIR, mode=0o700, exist_ok=True)
+    key = secrets.token_hex(32).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+
+    return key
+
+
+class _Request(object):
+    """An image waiting to be batched, with the future receiving its result."""
+
+    __slots__ = ("image", "prompt", "arrival", "future")
+
+    def __init__(self, image, prompt):
+        self.image = image
+        self.prompt = prompt
+        self.arrival = time.monotonic()
+        self.future = Future()
+
+
+class DynamicBatcher(object):
+    """Groups the requests for each model into batches, across clients.
+
+    Requests are queued per key, e.g. per checkpoint and operation. A key's queue
+    is run as soon as it holds ``max_batch_size`` requests, or once its oldest
+    request has waited ``max_wait`` seconds, whichever comes first. Ready queues
+    are run one at a time, oldest request first, by a single thread, so the
+    model is never used concurrently.
+
+    Requests of interactive runs are queued separately, don't wait for others to
+    batch with, and run before any bulk batch, so bulk work is preempted at batch
+    boundaries (see :mod:`scheduler`).
+
+    Args:
+        run_batch: Function called with a key and the lists of images and prompts
+            of a batch, returning the list of results. An exception in place of a
+            result fails only the request of that image
+        max_batch_size: Maximum number of requests per batch
+        max_wait: Maximum number of seconds a request waits for others
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Any, List[Any], List[Optional[str]]], List[Any]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT_MS / 1000,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.num_batches = 0
+        self.num_requests = 0
+        self._queues = OrderedDict()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        key,
+        images: List[Any],
+        prompts: Optional[List[Optional[str]]] = None,
+        priority: Optional[str] = None,
+    ) -> List[Future]:
+        """Queue images to be run with the model of a key.
+
+        Args:
+            key: Hashable key of the model
+            images: The images
+            prompts: Optional per-image prompts
+            priority: Optional priority class, "interactive" or "bulk" (the default)
+
+        Returns:
+            list: A future for the result of each image
+        """
+        if prompts is None:
+            prompts = [None] * len(images)
+
+        requests = [_Request(image, prompt) for image, prompt in zip(images, prompts)]
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("The Florence-2 daemon is shutting down")
+
+            interactive = priority == "interactive"
+            self._queues.setdefault((interactive, key), []).extend(requests)
+            self._cond.notify()
+
+        return [request.future for request in requests]
+
+    def stop(self) -> None:
+        """Stop batching, failing any queued requests."""
+        with self._cond:
+            self._stopped = True
+            queues, self._queues = self._queues, OrderedDict()
+            self._cond.notify()
+
+        for requests in queues.values():
+            for request in requests:
+                request.future.set_exception(RuntimeError("The Florence-2 daemon stopped"))
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                ready, wait = None, None
+                for queue_key, requests in self._queues.items():
+                    interactive, _ = queue_key
+                    waited = now - requests[0].arrival
+                    if interactive or len(requests) >= self.max_batch_size or waited >= self.max_wait:
+                        # Interactive queues first, then the oldest request
+                        rank = (not interactive, requests[0].arrival)
+                        if ready is None or rank < ready[0]:
+                            ready = (rank, queue_key)
+                    else:
+                        remaining = self.max_wait - waited
+                        wait = remaining if wait is None else min(wait, remaining)
+
+                if ready is not None:
+                    queue_key = ready[1]
+                    requests = self._queues[queue_key]
+                    batch = requests[:self.max_batch_size]
+                    del requests[:self.max_batch_size]
+                    if not requests:
+                        del self._queues[queue_key]
+
+                    return queue_key[1], batch
+
+                self._cond.wait(timeout=wait)
+
+        return None, None
+
+    def _run(self):
+        while True:
+            key, batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                results = self.run_batch(
+                    key,
+                    [request.image for request in batch],
+                    [request.prompt for request in batch],
+                )
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            self.num_batches += 1
+            self.num_requests += len(batch)
+            for request, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+
+def _load_model(model_path: str, operation: str, params: Dict[str, Any]):
+    """Create the Florence2 model of an operation, sharing loaded checkpoints."""
+    from .florence2 import _load_task
+
+    model, _ = _load_task(operation, model_path=model_path, **params)
+    return model
+
+
+class Florence2Daemon(object):
+    """A long-lived local service running Florence-2 for any number of clients.
+
+    The daemon owns the loaded checkpoints. Clients, e.g. operator runs with
+    ``backend="daemon"``, send lists of images with the checkpoint, operation and
+    parameters to run them with, and images sent by different clients for the same
+    model are batched together by a :class:`DynamicBatcher`.
+
+    Images can be sent as file paths, which the daemon decodes itself, or as
+    in-memory images. Connections are authenticated with :func:`get_authkey`, and
+    the daemon only listens on a Unix socket readable by the current user or on
+    localhost.
+
+    Args:
+        address: A Unix socket path, or ``"localhost:<port>"``
+        max_batch_size: Maximum number of images per batch
+        max_wait_ms: Maximum number of milliseconds a request waits for others to
+            batch with
+        backend: Optional execution backend of the daemon's models, one of
+            :data:`backends.BACKENDS`
+        model_factory: Optional function creating the model of a ``(model_path,
+            operation, params)`` triple. Defaults to Florence2 models. Models must
+            provide ``predict_all(images, prompts=None)`` and ``load_image(path)``
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_DAEMON_ADDRESS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        backend: Optional[str] = None,
+        model_factory: Optional[Callable[[str, str, Dict[str, Any]], Any]] = None,
+    ):
+        self.address = address
+        self.backend = backend
+        self.model_factory = model_factory or _load_model
+        self.batcher = DynamicBatcher(
+            self._run_batch, max_batch_size=max_batch_size, max_wait=max_wait_ms / 1000
+        )
+        self._models = {}
+        self._listener = None
+        self._stopped = threading.Event()
+
+        # Set once the daemon accepts connections
+        self.ready = threading.Event()
+
+    def _get_model(self, key):
+        model = self._models.get(key)
+        if model is None:
+            model_path, operation, params = key
+            params = json.loads(params)
+            if self.backend is not None:
+                params["backend"] = self.backend
+
+            model = self.model_factory(model_path, operation, params)
+            self._models[key] = model
+
+        return model
+
+    def _run_batch(self, key, images, prompts):
+        model = self._get_model(key)
+
+        # File paths are decoded by the model at its input resolution. Batches mix
+        # the requests of several clients, so an image that fails to load only
+        # fails its own request
+        results = [None] * len(images)
+        idxs, loaded = [], []
+        for idx, image in enumerate(images):
+            try:
+                loaded.append(model.load_image(image) if isinstance(image, str) else image)
+            except Exception as e:
+                results[idx] = e
+                continue
+
+            idxs.append(idx)
+
+        if not idxs:
+            return results
+
+        prompts = [prompts[idx] for idx in idxs]
+        if all(prompt is None for prompt in prompts):
+            prompts = None
+
+        for idx, result in zip(idxs, model.predict_all(loaded, prompts=prompts)):
+            results[idx] = result
+
+        return results
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the daemon's models and batching statistics."""
+        batcher = self.batcher
+        return {
+            "address": self.address,
+            "models": [list(key) for key in self._models],
+            "num_batches": batcher.num_batches,
+            "num_requests": batcher.num_requests,
+            "mean_batch_size": (
+                batcher.num_requests / batcher.num_batches if batcher.num_batches else None
+            ),
+        }
+
+    def serve_forever(self) -> None:
+        """Accept and serve clients until :meth:`shutdown` is called."""
+        family, address = parse_address(self.address)
+        if family == "AF_UNIX":
+            os.makedirs(os.path.dirname(address) or ".", mode=0o700, exist_ok=True)
+            if os.path.exists(address):
+                # Remove the socket of a previous daemon, unless it is still running
+                if _is_listening(address):
+                    raise RuntimeError(f"A Florence-2 daemon is already running at {address}")
+                os.remove(address)
+
+        self._listener = Listener(address, family=family, authkey=get_authkey(create=True))
+        if family == "AF_UNIX":
+            os.chmod(address, 0o600)
+
+        self.ready.set()
+        logger.info("Florence-2 daemon listening on %s", self.address)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    if self._stopped.is_set():
+                        break
+                    logger.warning("Rejected a Florence-2 daemon connection", exc_info=True)
+                    continue
+
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            # Closing the listener also removes its Unix socket
+            self.batcher.stop()
+            self._listener.close()
+
+    def shutdown(self) -> None:
+        """Stop accepting clients and fail any queued requests."""
+        self._stopped.set()
+        self.batcher.stop()
+
+        # Unblock accept() with a dummy connection
+        family, address = parse_address(self.address)
+        try:
+            with socket.socket(getattr(socket, family)) as sock:
+                sock.settimeout(1)
+                sock.connect(address)
+        except OSError:
+            pass
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    reply = {"ok": True, "result": self._handle(message)}
+                except Exception as e:
+                    reply = {"ok": False, "error": _format_error(e)}
+
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+                if message.get("type") == "shutdown":
+                    self.shutdown()
+                    return
+
+    def _handle(self, message):
+        kind = message.get("type")
+        if kind == "predict":
+            key = (
+                message["model_path"],
+                message["operation"],
+                json.dumps(message.get("params") or {}, sort_keys=True),
+            )
+            futures = self.batcher.submit(
+                key, message["images"], message.get("prompts"), priority=message.get("priority")
+            )
+
+            # Each image succeeds or fails on its own, e.g. if its file can't be read
+            results = []
+            for future in futures:
+                try:
+                    results.append({"ok": True, "result": future.result()})
+                except Exception as e:
+                    results.append({"ok": False, "error": _format_error(e)})
+
+            return results
+
+        if kind == "info":
+            return self.info()
+
+        if kind == "shutdown":
+            return None
+
+        raise ValueError(f"Unknown request type: {kind}")
+
+
+def _format_error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _daemon_error(error: str) -> RuntimeError:
+    return RuntimeError(f"Florence-2 daemon error: {error}")
+
+
+def _is_listening(address: str) -> bool:
+    # A stale socket file refuses connections
+    try:
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.settimeout(1)
+            sock.connect(address)
+        return True
+    except OSError:
+        return False
+
+
+class DaemonClient(object):
+    """A connection to a :class:`Florence2Daemon`.
+
+    A client can be shared by several threads; their requests are sent one at a
+    time over the same connection.
+
+    Args:
+        address: Address of the daemon. Defaults to :data:`DEFAULT_DAEMON_ADDRESS`
+        authkey: Optional authentication key. Defaults to :func:`get_authkey`
+
+    Raises:
+        RuntimeError: If the daemon cannot be reached
+    """
+
+    def __init__(self, address: Optional[str] = None, authkey: Optional[bytes] = None):
+        self.address = address or DEFAULT_DAEMON_ADDRESS
+        family, parsed = parse_address(self.address)
+
+        try:
+            self._conn = Client(parsed, family=family, authkey=authkey or get_authkey())
+        except OSError as e:
+            raise RuntimeError(
+                f"Cannot reach the Florence-2 daemon at {self.address} ({e}). Start it "
+                "with `python daemon.py` from the plugin directory"
+            ) from e
+
+        self._lock = threading.Lock()
+
+    def _call(self, message):
+        with self._lock:
+            self._conn.send(message)
+            reply = self._conn.recv()
+
+        if not reply["ok"]:
+            raise _daemon_error(reply["error"])
+
+        return reply["result"]
+
+    def predict(
+        self,
+        model_path: str,
+        operation: str,
+        params: Dict[str, Any],
+        images: List[Any],
+        prompts: Optional[List[Optional[str]]] = None,
+        priority: Optional[str] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Run images through a model of the daemon.
+
+        Args:
+            model_path: HuggingFace model identifier or local path to model weights
+            operation: The operation to run, see :data:`florence2.FLORENCE2_OPERATIONS`
+            params: The operation's parameters, which must be JSON serializable
+            images: File paths, which the daemon must be able to read, or images
+            prompts: Optional per-image captions or referring expressions
+            priority: Optional priority class of the run, "interactive" or "bulk"
+            return_exceptions: Whether to return the error of an image that failed,
+                e.g. because the daemon couldn't read its file, in place of its
+                result rather than raising it
+
+        Returns:
+            list: The result of each image
+
+        Raises:
+            RuntimeError: If the request fails, or an image fails and
+                ``return_exceptions`` is False
+        """
+        replies = self._call(
+            {
+                "type": "predict",
+                "model_path": model_path,
+                "operation": operation,
+                "params": params,
+                "images": list(images),
+                "prompts": list(prompts) if prompts is not None else None,
+                "priority": priority,
+            }
+        )
+
+        results = []
+        for reply in replies:
+            if reply["ok"]:
+                results.append(reply["result"])
+            elif return_exceptions:
+                results.append(_daemon_error(reply["error"]))
+            else:
+                raise _daemon_error(reply["error"])
+
+        return results
+
+    def info(self) -> Dict[str, Any]:
+        """Get the daemon's models and batching statistics."""
+        return self._call({"type": "info"})
+
+    def shutdown(self) -> None:
+        """Ask the daemon to stop."""
+        self._call({"type": "shutdown"})
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Florence-2 inference daemon")
+    parser.add_argument("--address", default=DEFAULT_DAEMON_ADDRESS)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--backend", default=None, help="backend of the daemon's models")
+    parser.add_argument(
+        "--warm", nargs="*", default=[], metavar="MODEL_PATH", help="checkpoints to preload"
+    )
+    args = parser.parse_args()
+
+    if args.warm:
+        from .florence2 import warm_florence2
+
+        for model_path in args.warm:
+            warm_florence2(model_path, backend=args.backend)
+
+    daemon = Florence2Daemon(
+        address=args.address,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        backend=args.backend,
+    )
+    daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    # Re-import this module as part of the plugin package, so relative imports work,
+    # keeping the plugin's modules from shadowing top-level packages
+    _plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path = [p for p in sys.path if os.path.abspath(p or ".") != _plugin_dir]
+
+    _package = types.ModuleType(_DAEMON_PACKAGE)
+    _package.__path__ = [_plugin_dir]
+    sys.modules[_DAEMON_PACKAGE] = _package
+
+    logging.basicConfig(level=logging.INFO)
+    importlib.import_module(_DAEMON_PACKAGE + ".daemon").main()
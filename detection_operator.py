@@ -5,9 +5,16 @@ import fiftyone as fo
 import fiftyone.operators as foo
 from fiftyone.operators import types
 
-from .florence2 import run_florence2_model
-
-from .utils import  _model_choice_inputs, _execution_mode, _handle_calling
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _inference_inputs,
+    _inference_params,
+    _execution_mode,
+    _handle_calling,
+    _invalidate_resolve_cache,
+)
 
 def _detection_label_field_inputs(inputs):
     inputs.str(
@@ -76,6 +83,9 @@ class DetectWithFlorence2(foo.Operator):
             description="Name of the field to store the detection results"
         )
         
+        # Inference options (batch size, feature cache, resuming, decoding, precision, backend, worker processes, profiling, priority)
+        _inference_inputs(ctx, inputs)
+        
         # Execution mode (delegation option)
         _execution_mode(ctx, inputs)
         
@@ -87,6 +97,9 @@ class DetectWithFlorence2(foo.Operator):
         return ctx.params.get("delegate", False)
     
     def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import run_florence2_model
+
         view = ctx.target_view()
         # Parameters
         model_path = ctx.params.get("model_path", "microsoft/Florence-2-base-ft")
@@ -104,9 +117,12 @@ class DetectWithFlorence2(foo.Operator):
             operation="detection",
             output_field=output_field,
             model_path=model_path,
+            **_inference_params(ctx),
             **kwargs
         )
         
+        # The run added fields and may have downloaded the checkpoint
+        _invalidate_resolve_cache(ctx)
         ctx.ops.reload_dataset()
         
     def __call__(
@@ -116,6 +132,16 @@ class DetectWithFlorence2(foo.Operator):
         detection_type="detection",
         text_prompt=None,
         output_field="florence2_detections",
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_feature_cache=False,
+        skip_existing=False,
+        skip_failures=True,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        num_workers=1,
+        profile_key=None,
+        priority=None,
         delegate=False
     ):
         kwargs = {"detection_type": detection_type}
@@ -129,5 +155,16 @@ class DetectWithFlorence2(foo.Operator):
             output_field=output_field,
             delegate=delegate,
             model_path=model_path,
+            batch_size=batch_size,
+            use_feature_cache=use_feature_cache,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            num_workers=num_workers,
+            profile=profile_key is not None,
+            profile_key=profile_key,
+            priority=priority,
             **kwargs
         )
\ No newline at end of file
@@ -0,0 +1,89 @@
+import os
+os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
+import fiftyone as fo
+import fiftyone.operators as foo
+from fiftyone.operators import types
+
+from .utils import (
+    _model_choice_inputs,
+    _execution_mode,
+)
+
+class ExportFlorence2Onnx(foo.Operator):
+    @property
+    def config(self):
+        return foo.OperatorConfig(
+            name="export_florence2_onnx",
+            label="Export Florence-2 to ONNX",
+            description="Export a Florence-2 checkpoint to ONNX for the onnxruntime backend",
+            icon="/assets/santa-maria-del-fiore-svgrepo-com.svg",
+            dynamic=True,
+        )
+
+    def resolve_input(self, ctx):
+        inputs = types.Object()
+
+        # Model choice inputs
+        _model_choice_inputs(ctx, inputs)
+
+        inputs.str(
+            "export_dir",
+            required=False,
+            label="Export directory",
+            description=(
+                "The root directory of ONNX exports. Defaults to "
+                "FLORENCE2_ONNX_DIR or ~/.cache/fiftyone_florence2/onnx"
+            ),
+        )
+
+        inputs.bool(
+            "overwrite",
+            default=False,
+            required=False,
+            label="Overwrite existing export?",
+            description="Re-export the checkpoint even if it was already exported",
+            view=types.CheckboxView(),
+        )
+
+        # Execution mode (delegation option)
+        _execution_mode(ctx, inputs)
+
+        return types.Property(inputs)
+
+    def resolve_delegation(self, ctx):
+        return ctx.params.get("delegate", False)
+
+    def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import export_florence2_onnx
+
+        export_dir = export_florence2_onnx(
+            model_path=ctx.params.get("model_path", "microsoft/Florence-2-base-ft"),
+            export_dir=ctx.params.get("export_dir", None),
+            overwrite=ctx.params.get("overwrite", False),
+        )
+
+        return {"export_dir": export_dir}
+
+    def resolve_output(self, ctx):
+        outputs = types.Object()
+        outputs.str("export_dir", label="Export directory")
+
+        return types.Property(outputs)
+
+    def __call__(
+        self,
+        model_path="microsoft/Florence-2-base-ft",
+        export_dir=None,
+        overwrite=False,
+        delegate=False
+    ):
+        ctx = dict()
+        params = dict(
+            model_path=model_path,
+            export_dir=export_dir,
+            overwrite=overwrite,
+            delegate=delegate,
+        )
+
+        return foo.execute_operator(self.uri, ctx, params=params)
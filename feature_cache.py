@@ -0,0 +1,287 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Cache location and size budget, overridable via environment variables
+DEFAULT_CACHE_DIR = os.environ.get(
+    "FLORENCE2_FEATURE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "fiftyone_florence2", "features"),
+)
+DEFAULT_MAX_SIZE_GB = float(os.environ.get("FLORENCE2_FEATURE_CACHE_MAX_GB", 10))
+
+# Key under which Florence2.load_image() stores an image's content hash
+CONTENT_HASH_INFO_KEY = "florence2_content_hash"
+
+# Names of the namespace directories created by the cache, see make_namespace()
+_NAMESPACE_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+
+# numpy cannot represent bfloat16, so other dtypes are stored as float32
+_STORAGE_DTYPES = {torch.float16: np.float16, torch.float32: np.float32}
+
+
+def hash_bytes(data: bytes) -> str:
+    """Compute the content hash used to key cached image features.
+
+    Args:
+        data: The raw bytes of an image file
+
+    Returns:
+        str: The hex digest of the content
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class FeatureCache(object):
+    """An on-disk cache of Florence-2 vision encoder outputs.
+
+    Features are stored as one ``.npy`` file per image and read back as
+    memory-mapped arrays. Files are grouped in a namespace directory per
+    checkpoint, processor config and dtype, and named by the image's content
+    hash, so renamed or copied files still hit the cache while edited files do
+    not.
+
+    When the cache grows beyond ``max_size_bytes``, the least recently used
+    files are deleted. Recency is tracked through file modification times,
+    which are refreshed on every hit. Each process keeps a running total of the
+    cache's size, which is recomputed from disk before evicting.
+
+    Args:
+        cache_dir (str, optional): Directory in which to store features
+        max_size_bytes (int, optional): Size budget of the cache
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_size_bytes: int = int(DEFAULT_MAX_SIZE_GB * 1024 ** 3),
+    ):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self._size_bytes = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_namespace(model_path: str, processor_config: str, torch_dtype) -> str:
+        """Build the namespace for features from a given checkpoint and preprocessing.
+
+        Args:
+            model_path: Model path or HuggingFace repo name
+            processor_config: Serialized image processor config
+            torch_dtype: dtype of the model producing the features
+
+        Returns:
+            str: The namespace
+        """
+        key = "\n".join([model_path, processor_config, str(torch_dtype)])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, namespace: str, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, namespace, content_hash + ".npy")
+
+    def get(self, namespace: str, content_hash: str) -> Optional[np.ndarray]:
+        """Get the cached features of an image.
+
+        Args:
+            namespace: The namespace from :meth:`make_namespace`
+            content_hash: The image's content hash
+
+        Returns:
+            np.ndarray: A copy-on-write memory-mapped array, or None on a miss
+        """
+        path = self._path(namespace, content_hash)
+
+        try:
+            features = np.load(path, mmap_mode="c")
+            # Mark as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return features
+
+    def get_many(self, namespace: str, content_hashes: List[str]) -> Dict[int, np.ndarray]:
+        """Get the cached features of several images.
+
+        Args:
+            namespace: The namespace from :meth:`make_namespace`
+            content_hashes: The images' content hashes
+
+        Returns:
+            dict: Maps the indices of the images found in the cache to their features
+        """
+        hits = {}
+        for idx, content_hash in enumerate(content_hashes):
+            features = self.get(namespace, content_hash)
+            if features is not None:
+                hits[idx] = features
+
+        return hits
+
+    def put(self, namespace: str, content_hash: str, features: torch.Tensor) -> None:
+        """Store the features of an image.
+
+        Args:
+            namespace: The namespace from :meth:`make_namespace`
+            content_hash: The image's content hash
+            features: The image's features, with shape (image_tokens, hidden_size)
+        """
+        storage_dtype = _STORAGE_DTYPES.get(features.dtype, np.float32)
+        array = features.detach().cpu().float().numpy().astype(storage_dtype, copy=False)
+
+        path = self._path(namespace, content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+
+        try:
+            replaced_size = os.path.getsize(path)
+        except OSError:
+            replaced_size = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size_bytes = self.size_bytes + os.path.getsize(path) - replaced_size
+            if self._size_bytes > self.max_size_bytes:
+                # Other processes write to the same directory, so the running
+                # total is only an estimate; check the actual size before evicting
+                self._size_bytes = None
+                if self.size_bytes > self.max_size_bytes:
+                    self._evict()
+
+    def _iter_namespace_dirs(self):
+        # Only the directories created by the cache, so that a misconfigured
+        # cache_dir never exposes unrelated files to eviction or clearing
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            if _NAMESPACE_PATTERN.match(name) and os.path.isdir(path):
+                yield path
+
+    def _iter_files(self, suffixes=(".npy",)):
+        for namespace_dir in self._iter_namespace_dirs():
+            try:
+                filenames = os.listdir(namespace_dir)
+            except OSError:
+                continue
+
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    path = os.path.join(namespace_dir, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    @property
+    def size_bytes(self) -> int:
+        """The total size of the cached features."""
+        if self._size_bytes is None:
+            self._size_bytes = sum(size for _, size, _ in self._iter_files())
+
+        return self._size_bytes
+
+    def _evict(self):
+        # Delete least recently used files until 90% of the budget is free,
+        # so that eviction does not run on every write once the cache is full
+        target = int(0.9 * self.max_size_bytes)
+        files = sorted(self._iter_files(), key=lambda f: f[2])
+        size = sum(f[1] for f in files)
+
+        num_evicted = 0
+        for path, file_size, _ in files:
+            if size <= target:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            size -= file_size
+            num_evicted += 1
+
+        self._size_bytes = size
+        logger.info("Evicted %d entries from the Florence-2 feature cache", num_evicted)
+
+    def clear(self) -> int:
+        """Delete every cached feature.
+
+        Only the files the cache created are deleted: the ``.npy`` entries (and
+        leftover temporary files) of its namespace directories, and the namespace
+        directories once they are empty. Anything else in ``cache_dir`` is kept.
+
+        Returns:
+            int: The number of bytes that were freed
+        """
+        with self._lock:
+            size = 0
+            for path, file_size, _ in list(self._iter_files(suffixes=(".npy", ".tmp"))):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+
+                size += file_size
+
+            for namespace_dir in list(self._iter_namespace_dirs()):
+                try:
+                    os.rmdir(namespace_dir)
+                except OSError:
+                    # Not empty, so it holds files the cache didn't create
+                    pass
+
+            self._size_bytes = None
+
+        return size
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_feature_cache(cache_dir: Optional[str] = None) -> FeatureCache:
+    """Get the process-wide feature cache for a directory.
+
+    Args:
+        cache_dir: Cache directory. Defaults to ``FLORENCE2_FEATURE_CACHE_DIR`` or
+            ``~/.cache/fiftyone_florence2/features``
+
+    Returns:
+        FeatureCache: The cache
+    """
+    cache_dir = os.path.abspath(os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR))
+
+    with _CACHES_LOCK:
+        if cache_dir not in _CACHES:
+            _CACHES[cache_dir] = FeatureCache(cache_dir=cache_dir)
+
+        return _CACHES[cache_dir]
+
+
+def clear_feature_cache(cache_dir: Optional[str] = None) -> int:
+    """Delete every cached Florence-2 image feature.
+
+    Args:
+        cache_dir: Cache directory. Defaults to ``FLORENCE2_FEATURE_CACHE_DIR`` or
+            ``~/.cache/fiftyone_florence2/features``
+
+    Returns:
+        int: The number of bytes that were freed
+    """
+    return get_feature_cache(cache_dir).clear()
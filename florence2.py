@@ -1,5 +1,12 @@
+import io
 import os
-from typing import List, Dict, Any, Optional, Union, Tuple
+import json
+import time
+import hashlib
+import logging
+import contextlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Optional, Union, Tuple
 
 os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
 
@@ -8,18 +15,110 @@ import torch
 from PIL import Image
 
 import fiftyone as fo
-from fiftyone import Model
-from fiftyone.core.labels import Detection, Detections, Polyline, Polylines
+import fiftyone.core.utils as fou
+from fiftyone import Model, ViewField as F
+from fiftyone.core.labels import Detection, Detections, Polyline, Polylines, Segmentation
 
-from transformers import AutoModelForCausalLM, AutoProcessor
+from .backends import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    export_onnx,
+    get_backend,
+    get_export_dir,
+    is_exported,
+)
+from .daemon import DAEMON_BACKEND, DaemonClient
+from .feature_cache import (
+    CONTENT_HASH_INFO_KEY,
+    FeatureCache,
+    get_feature_cache,
+    hash_bytes,
+)
+from .prefetch import (
+    DEFAULT_PREFETCH_DEPTH,
+    DEFAULT_PREFETCH_WORKERS,
+    prefetch_batches,
+)
+from .profiling import StageProfiler, format_summary, store_summary
+from .registry import get_model_registry
+from .scheduler import get_scheduler, resolve_priority
+from .sharding import run_sharded
+
+logger = logging.getLogger(__name__)
 
 # Constants
 DEFAULT_MODEL_PATH = "microsoft/Florence-2-base-ft"
 
+# Number of samples whose results are written to the database at a time
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+# Key under which _to_pil_image() stores the (width, height) of the image before
+# resizing, at which segmentation masks are rasterized
+SOURCE_SIZE_INFO_KEY = "florence2_source_size"
+
+# Suffix of the field recording how each sample's output was produced
+PROVENANCE_FIELD_SUFFIX = "_provenance"
+
+# Parameters that provenance hashes in resolved form, see Florence2.provenance()
+_RESOLVED_PARAMS = (
+    "detail_level",
+    "detection_type",
+    "store_region_info",
+    "generation_profile",
+    "generation_kwargs",
+    "precision",
+    "backend",
+)
+
+# Maximum number of distinct prompts whose token embeddings each model keeps
+PROMPT_CACHE_SIZE = 1024
+
+# Generation settings per task prompt. Each profile has "default" settings that
+# task-specific entries override. "quality" matches the original 3-beam,
+# 1024-token decoding for every task; "fast" decodes greedily with token budgets
+# sized to each task's typical output, which is several times cheaper on CPU
+GENERATION_PROFILES = {
+    "quality": {
+        "default": {"num_beams": 3, "max_new_tokens": 1024},
+    },
+    "fast": {
+        "default": {"num_beams": 1, "max_new_tokens": 512},
+        "<CAPTION>": {"max_new_tokens": 32},
+        "<DETAILED_CAPTION>": {"max_new_tokens": 96},
+        "<MORE_DETAILED_CAPTION>": {"max_new_tokens": 256},
+        "<OPEN_VOCABULARY_DETECTION>": {"max_new_tokens": 256},
+        "<CAPTION_TO_PHRASE_GROUNDING>": {"max_new_tokens": 256},
+        "<OCR_WITH_REGION>": {"max_new_tokens": 1024},
+        "<REFERRING_EXPRESSION_SEGMENTATION>": {"max_new_tokens": 1024},
+    },
+}
+
+DEFAULT_GENERATION_PROFILE = "quality"
+
+# Generation settings that can be set per task, and those only used by beam search
+GENERATION_KWARGS = ("num_beams", "max_new_tokens", "early_stopping", "length_penalty")
+_BEAM_SEARCH_KWARGS = ("early_stopping", "length_penalty")
+
+# Precision modes. By default models run in float16 on CUDA and float32 elsewhere.
+# "bf16" runs in bfloat16 where the hardware supports it, and "int8-dynamic"
+# quantizes the language model's Linear layers and runs on the CPU
+PRECISIONS = ("fp32", "bf16", "int8-dynamic")
+
 # Task definitions and parameter configurations
+# Label types that segmentation results can be stored as:
+#   - polylines: the predicted polygons, as Polylines
+#   - detections: one Detection per polygon, with a mask cropped to its bounding box
+#   - segmentation: a single Segmentation mask of the image, optionally stored on disk
+SEGMENTATION_OUTPUT_TYPES = ("polylines", "detections", "segmentation")
+DEFAULT_SEGMENTATION_OUTPUT_TYPE = "polylines"
+
 FLORENCE2_OPERATIONS = {
     "caption": {
-        "params": {"detail_level": ["basic", "detailed", "more_detailed"]},
+        "params": {"detail_level": ["basic", "detailed", "more_detailed"],
+                   "generation_profile": list(GENERATION_PROFILES),
+                   "generation_kwargs": dict,
+                   "precision": list(PRECISIONS),
+                   "backend": list(BACKENDS) + [DAEMON_BACKEND]},
         "task_mapping": {
             "detailed": "<DETAILED_CAPTION>",
             "more_detailed": "<MORE_DETAILED_CAPTION>",
@@ -28,13 +127,21 @@ FLORENCE2_OPERATIONS = {
         }
     },
     "ocr": {
-        "params": {"store_region_info": bool},
+        "params": {"store_region_info": bool,
+                   "generation_profile": list(GENERATION_PROFILES),
+                   "generation_kwargs": dict,
+                   "precision": list(PRECISIONS),
+                   "backend": list(BACKENDS) + [DAEMON_BACKEND]},
         "task": "<OCR>",
         "region_task": "<OCR_WITH_REGION>"
     },
     "detection": {
         "params": {"detection_type": ["detection", "dense_region_caption", "region_proposal", "open_vocabulary_detection"],
-                   "text_prompt": str},
+                   "text_prompt": str,
+                   "generation_profile": list(GENERATION_PROFILES),
+                   "generation_kwargs": dict,
+                   "precision": list(PRECISIONS),
+                   "backend": list(BACKENDS) + [DAEMON_BACKEND]},
         "task_mapping": {
             "detection": "<OD>",
             "dense_region_caption": "<DENSE_REGION_CAPTION>",
@@ -44,15 +151,48 @@ FLORENCE2_OPERATIONS = {
         }
     },
     "phrase_grounding": {
-        "params": {"caption_field": str, "caption": str},
+        "params": {"caption_field": str, "caption": str,
+                   "generation_profile": list(GENERATION_PROFILES),
+                   "generation_kwargs": dict,
+                   "precision": list(PRECISIONS),
+                   "backend": list(BACKENDS) + [DAEMON_BACKEND]},
         "task": "<CAPTION_TO_PHRASE_GROUNDING>"
     },
     "segmentation": {
-        "params": {"expression": str, "expression_field": str},
+        "params": {"expression": str, "expression_field": str, "simplify_tolerance": float,
+                   "output_type": list(SEGMENTATION_OUTPUT_TYPES), "mask_dir": str,
+                   "generation_profile": list(GENERATION_PROFILES),
+                   "generation_kwargs": dict,
+                   "precision": list(PRECISIONS),
+                   "backend": list(BACKENDS) + [DAEMON_BACKEND]},
         "task": "<REFERRING_EXPRESSION_SEGMENTATION>"
     }
 }
 
+# Image inputs accepted by Florence2.predict/predict_all
+ImageInput = Union[np.ndarray, Image.Image, str, os.PathLike]
+
+# Per-sample prompt fields of the text-conditioned operations
+PROMPT_FIELD_PARAMS = {
+    "phrase_grounding": "caption_field",
+    "segmentation": "expression_field",
+}
+
+# Parameters of the dummy task run for each operation by warm_florence2()
+WARMUP_PARAMS = {
+    "caption": {"detail_level": "basic"},
+    "ocr": {},
+    "detection": {"detection_type": "detection"},
+    "phrase_grounding": {"caption": "an object"},
+    "segmentation": {"expression": "the object"},
+}
+
+# Maximum number of tokens generated by the dummy task runs of warm_florence2()
+DEFAULT_WARMUP_TOKENS = 8
+
+# Parameters controlling how segmentation outputs are stored
+SEGMENTATION_OUTPUT_PARAMS = ("simplify_tolerance", "output_type", "mask_dir")
+
 # Utility functions
 def get_device():
     """Get the appropriate device for model inference."""
@@ -62,88 +202,228 @@ def get_device():
         return "mps"
     return "cpu"
 
-def _convert_bbox(bbox, width, height):
-    """Convert bounding box coordinates to FiftyOne format.
+def _processor_input_size(processor) -> Tuple[int, int]:
+    """Get the (width, height) to which a Florence-2 processor resizes input images."""
+    size = getattr(processor.image_processor, "size", None) or {}
+    return (size.get("width", 768), size.get("height", 768))
+
+def _bf16_supported(device: str) -> bool:
+    """Check whether a device has native bfloat16 support."""
+    if device == "cuda":
+        return torch.cuda.is_bf16_supported()
+
+    if device == "cpu":
+        # Autocast runs on any CPU, but is only faster with native bf16 instructions
+        checks = [
+            getattr(torch.cpu, name, None)
+            for name in ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+        ]
+        return any(check() for check in checks if check is not None)
+
+    return False
+
+def _to_pil_image(
+    image: ImageInput,
+    size: Optional[Tuple[int, int]] = None,
+    resample: int = Image.BICUBIC,
+) -> Image.Image:
+    """Convert an image input to an RGB PIL Image.
+    
+    When decoding a file and a target ``size`` is given, the decoder is asked to
+    downscale while decoding (PIL's ``draft()``, which JPEG supports by powers of
+    two), so that multi-megapixel images are never decoded at full resolution.
+    The size of the image before resizing is stored in the returned image's
+    ``info`` under :data:`SOURCE_SIZE_INFO_KEY`.
+    
+    Args:
+        image: A numpy array in RGB format with shape (H,W,3), a PIL Image, or a
+            path to (or file object of) an image file
+        size: Optional (width, height) to resize the image to
+        resample: PIL resampling filter used when resizing
+        
+    Returns:
+        Image.Image: The RGB image
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    elif not isinstance(image, Image.Image):
+        image = Image.open(image)
+        if size is not None:
+            # No-op for formats that do not support draft mode
+            source_size = image.size
+            image.draft("RGB", size)
+            image.info[SOURCE_SIZE_INFO_KEY] = source_size
+
+    source_size = image.info.get(SOURCE_SIZE_INFO_KEY, image.size)
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if size is not None and image.size != tuple(size):
+        image = image.resize(size, resample=resample)
+
+    image.info[SOURCE_SIZE_INFO_KEY] = source_size
+    return image
+
+def _convert_bboxes(bboxes, width, height) -> np.ndarray:
+    """Convert a list of bounding boxes to FiftyOne format in one array operation.
     
     Takes raw bounding box coordinates and converts them to normalized coordinates
     in FiftyOne's [x, y, width, height] format. Handles both standard rectangular
-    bounding boxes (4 coordinates) and quadrilateral boxes (8 coordinates).
+    bounding boxes (4 coordinates) and quadrilateral boxes (8 coordinates), whose
+    bounding rectangle is used.
 
     Args:
-        bbox: List of coordinates. Either [x1,y1,x2,y2] for rectangular boxes
-              or [x1,y1,x2,y2,x3,y3,x4,y4] for quadrilateral boxes
+        bboxes: List of boxes, all in the same layout. Either [x1,y1,x2,y2] for
+              rectangular boxes or [x1,y1,x2,y2,x3,y3,x4,y4] for quadrilateral boxes
         width: Width of the image in pixels
         height: Height of the image in pixels
 
     Returns:
-        list: Normalized coordinates in format [x, y, width, height] where:
+        np.ndarray: A (num_boxes, 4) array of normalized [x, y, width, height] boxes where:
             - x,y is the top-left corner (normalized by image dimensions)
             - width,height are the box dimensions (normalized by image dimensions)
     """
-    if len(bbox) == 4:
-        # Standard rectangular box: convert from [x1,y1,x2,y2] to [x,y,w,h]
-        # x1,y1 is top-left corner, x2,y2 is bottom-right corner
-        return [
-            bbox[0] / width,              # x coordinate (normalized)
-            bbox[1] / height,             # y coordinate (normalized) 
-            (bbox[2] - bbox[0]) / width,  # width (normalized)
-            (bbox[3] - bbox[1]) / height  # height (normalized)
-        ]
+    if len(bboxes) == 0:
+        return np.zeros((0, 4))
+
+    coords = np.asarray(bboxes, dtype=np.float64).reshape(len(bboxes), -1)
+
+    if coords.shape[1] == 4:
+        # Standard rectangular boxes: x1,y1 is the top-left corner and x2,y2 the
+        # bottom-right corner
+        top_left = coords[:, 0:2]
+        bottom_right = coords[:, 2:4]
     else:
-        # Quadrilateral box: find bounding rectangle that contains all points
-        x1, y1, x2, y2, x3, y3, x4, y4 = bbox
-        x_min = min(x1, x2, x3, x4)  # Leftmost x coordinate
-        x_max = max(x1, x2, x3, x4)  # Rightmost x coordinate
-        y_min = min(y1, y2, y3, y4)  # Topmost y coordinate
-        y_max = max(y1, y2, y3, y4)  # Bottommost y coordinate
-
-        return [
-            x_min / width,               # x coordinate (normalized)
-            y_min / height,              # y coordinate (normalized)
-            (x_max - x_min) / width,     # width (normalized)
-            (y_max - y_min) / height     # height (normalized)
-        ]
+        # Quadrilateral boxes: find the bounding rectangles containing all points
+        points = coords.reshape(len(bboxes), -1, 2)
+        top_left = points.min(axis=1)
+        bottom_right = points.max(axis=1)
+
+    # Convert to [x, y, w, h] and normalize by the image dimensions
+    scale = np.array([width, height], dtype=np.float64)
+    return np.hstack([top_left / scale, (bottom_right - top_left) / scale])
+
+def _convert_bbox(bbox, width, height):
+    """Convert a single bounding box to FiftyOne format.
+    
+    See :func:`_convert_bboxes`, which should be preferred for lists of boxes.
+
+    Args:
+        bbox: List of coordinates. Either [x1,y1,x2,y2] for rectangular boxes
+              or [x1,y1,x2,y2,x3,y3,x4,y4] for quadrilateral boxes
+        width: Width of the image in pixels
+        height: Height of the image in pixels
+
+    Returns:
+        list: Normalized coordinates in format [x, y, width, height]
+    """
+    return _convert_bboxes([bbox], width, height)[0].tolist()
+
+def _simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify a polyline with the Douglas-Peucker algorithm.
+    
+    Points are dropped as long as the simplified line stays within ``tolerance`` of
+    every original point. The first and last points are always kept.
+
+    Args:
+        points: A (num_points, 2) array of coordinates
+        tolerance: Maximum distance between the original and simplified lines, in
+            the units of ``points``
+
+    Returns:
+        np.ndarray: The (num_kept, 2) array of kept points, in their original order
+    """
+    num_points = len(points)
+    if num_points < 3 or tolerance <= 0:
+        return points
 
+    keep = np.zeros(num_points, dtype=bool)
+    keep[[0, -1]] = True
 
-def _convert_polyline(contour, width, height):
+    # Iterative rather than recursive, since dense contours can have many points
+    stack = [(0, num_points - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Distances of the intermediate points to the line through the endpoints
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        segment_length = np.hypot(segment[0], segment[1])
+        if segment_length > 0:
+            distances = np.abs(
+                segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]
+            ) / segment_length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        idx = int(np.argmax(distances))
+        if distances[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep]
+
+def _convert_polyline(contour, width, height, tolerance=None):
     """Convert polyline coordinates to FiftyOne format.
     
     Takes raw polyline coordinates and converts them to normalized coordinates
-    in FiftyOne's format.
+    in FiftyOne's format, optionally simplifying the contour.
 
     Args:
         contour: List of interleaved x,y coordinates [x1,y1,x2,y2,...]
         width: Width of the image in pixels
         height: Height of the image in pixels
+        tolerance: Optional Douglas-Peucker tolerance, as a fraction of the image
+            dimensions (e.g. 0.002 is ~1.5 pixels at 768x768). Contours that would
+            be simplified to fewer than 3 points are kept as is
 
     Returns:
-        list: List of (x,y) tuples representing normalized coordinates of the contour
+        list: List of [x, y] pairs representing normalized coordinates of the contour
     """
-    # Initialize empty list to store the normalized coordinate pairs
-    xy_points = []
-    
-    # Process the interleaved coordinates by taking them in pairs (x,y)
     # The interleaved format means all values at even indices are x-coordinates
-    # and all values at odd indices are y-coordinates
-    for i in range(0, len(contour), 2):
-        # Check if we have both x and y coordinates available
-        # This guards against malformed input where the list might have an odd length
-        if i+1 < len(contour):
-            # Extract the x-coordinate and normalize it to [0,1] range
-            # Normalization makes coordinates independent of image dimensions
-            x = contour[i] / width
-            
-            # Extract the corresponding y-coordinate and normalize it
-            y = contour[i+1] / height
-            
-            # Add the normalized (x,y) pair to our result list
-            # This maintains the original shape without adding artificial points
-            xy_points.append((x, y))
-    
-    # Return the list of normalized coordinate pairs
-    # This format is ready to be used with FiftyOne's Polyline class
+    # and all values at odd indices are y-coordinates. A trailing unpaired value
+    # in malformed input is dropped
+    coords = np.asarray(contour, dtype=np.float64)
+    num_points = len(coords) // 2
+    points = coords[:2 * num_points].reshape(num_points, 2)
+
+    # Normalize the coordinates to [0,1] by the image dimensions
+    points = points / np.array([width, height], dtype=np.float64)
+
+    if tolerance:
+        simplified = _simplify_polyline(points, tolerance)
+        if len(simplified) >= 3:
+            points = simplified
+
     # The 'closed' parameter in FiftyOne will determine if the shape is closed, not this function
-    return xy_points
+    return points.tolist()
+
+def _task_prompt(operation: str, params: Dict[str, Any]) -> str:
+    """Get the task prompt that an operation runs with the given parameters."""
+    spec = FLORENCE2_OPERATIONS[operation]
+
+    if operation == "caption":
+        return spec["task_mapping"].get(params.get("detail_level"), spec["task_mapping"][None])
+
+    if operation == "detection":
+        return spec["task_mapping"].get(params.get("detection_type"), spec["task_mapping"][None])
+
+    if operation == "ocr" and params.get("store_region_info", False):
+        return spec["region_task"]
+
+    return spec["task"]
+
+def _profile_stage(profiler: Optional[StageProfiler], name: str):
+    """Get a context timing the enclosed block as a stage of a profiler, if any."""
+    if profiler is None:
+        return contextlib.nullcontext()
+
+    return profiler.stage(name)
 
 class Florence2(Model):
     """A FiftyOne model for running the Florence-2 multimodal model on images.
@@ -160,6 +440,9 @@ class Florence2(Model):
                         'caption', 'ocr', 'detection', 'phrase_grounding', 'segmentation'
         model_path (str, optional): Model path or HuggingFace repo name.
                                    Defaults to "microsoft/Florence-2-base-ft".
+        feature_cache (FeatureCache, optional): On-disk cache of vision encoder outputs.
+                                   When provided, images loaded via :meth:`load_image`
+                                   are only encoded if their features are not cached.
         **kwargs: Operation-specific parameters:
             - caption: detail_level (str, optional) - "basic", "detailed", or "more_detailed"
             - ocr: store_region_info (bool, optional) - Whether to include region information
@@ -167,6 +450,32 @@ class Florence2(Model):
                          text_prompt (str, optional) - Text prompt for open vocabulary detection
             - phrase_grounding: caption_field (str) or caption (str) - Caption source
             - segmentation: expression_field (str) or expression (str) - Referring expression
+                            simplify_tolerance (float, optional) - Douglas-Peucker
+                            tolerance of the polygons, as a fraction of the image
+                            dimensions. Polygons are not simplified by default
+                            output_type (str, optional) - One of
+                            :data:`SEGMENTATION_OUTPUT_TYPES`. "polylines" (default)
+                            stores the polygons, "detections" rasterizes each
+                            polygon into a Detection mask cropped to its bounding
+                            box and "segmentation" rasterizes all polygons into one
+                            Segmentation mask, with pixel value ``k`` for
+                            ``object_k``. Masks are rasterized at the resolution of
+                            the image passed to the model
+                            mask_dir (str, optional) - Directory in which
+                            :func:`run_florence2_model` writes the masks of
+                            "segmentation" outputs as PNGs. By default, masks are
+                            stored in the database
+            - all operations: generation_profile (str, optional) - Name of the
+                              :data:`GENERATION_PROFILES` entry used for decoding,
+                              "quality" (default) or "fast"
+                              generation_kwargs (dict, optional) - Overrides of the
+                              profile's ``num_beams``, ``max_new_tokens``,
+                              ``early_stopping`` and ``length_penalty``
+                              precision (str, optional) - One of :data:`PRECISIONS`.
+                              By default, float16 is used on CUDA and float32 elsewhere
+                              backend (str, optional) - One of :data:`backends.BACKENDS`.
+                              "torch" (default) runs the model eagerly, "onnx" runs
+                              exported graphs with onnxruntime on the CPU
     
     Example::
         
@@ -178,6 +487,17 @@ class Florence2(Model):
         
         # Run phrase grounding on an existing caption field
         model = Florence2(operation="phrase_grounding", caption_field="my_captions")
+        
+        # Caption with greedy decoding and a tight token budget
+        model = Florence2(operation="caption", generation_profile="fast")
+        
+        # Detect objects with an int8-quantized language model on the CPU
+        model = Florence2(operation="detection", precision="int8-dynamic")
+        
+        # Record the time spent in each stage and the generated tokens
+        model.profiler = StageProfiler()
+        model.predict_all(images)
+        print(model.profiler.summary())
     """
 
 
@@ -185,6 +505,7 @@ class Florence2(Model):
         self, 
         operation: str,
         model_path: str = DEFAULT_MODEL_PATH,
+        feature_cache: Optional[FeatureCache] = None,
         **kwargs
     ):
         """Initialize the Florence-2 model.
@@ -192,6 +513,7 @@ class Florence2(Model):
         Args:
             operation: Type of operation to perform
             model_path: Model path or HuggingFace repo name
+            feature_cache: Optional on-disk cache of vision encoder outputs
             **kwargs: Operation-specific parameters
         
         Raises:
@@ -212,93 +534,456 @@ class Florence2(Model):
         if operation == "segmentation":
             if "expression_field" not in kwargs and "expression" not in kwargs:
                 raise ValueError("Either 'expression_field' or 'expression' must be provided for segmentation operation")
+            
+            output_type = kwargs.get("output_type") or DEFAULT_SEGMENTATION_OUTPUT_TYPE
+            if output_type not in SEGMENTATION_OUTPUT_TYPES:
+                raise ValueError(f"Invalid output_type: {output_type}. Must be one of {list(SEGMENTATION_OUTPUT_TYPES)}")
+        
+        # Generation settings validation
+        generation_profile = kwargs.get("generation_profile") or DEFAULT_GENERATION_PROFILE
+        if generation_profile not in GENERATION_PROFILES:
+            raise ValueError(f"Invalid generation_profile: {generation_profile}. Must be one of {list(GENERATION_PROFILES.keys())}")
+        
+        invalid_kwargs = set(kwargs.get("generation_kwargs") or {}) - set(GENERATION_KWARGS)
+        if invalid_kwargs:
+            raise ValueError(f"Invalid generation_kwargs: {sorted(invalid_kwargs)}. Must be among {list(GENERATION_KWARGS)}")
+        
+        precision = kwargs.get("precision")
+        if precision is not None and precision not in PRECISIONS:
+            raise ValueError(f"Invalid precision: {precision}. Must be one of {list(PRECISIONS)}")
+        
+        backend = kwargs.get("backend") or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid backend: {backend}. Must be one of {list(BACKENDS)}")
+        
+        if backend == "onnx" and precision not in (None, "fp32"):
+            raise ValueError(f"The onnx backend only supports fp32, not {precision}")
         
         self.params = kwargs
+        self._preprocess = True
 
-        # Set device
-        self.device = get_device()
-        print(f"Using device: {self.device}")
+        # Token embeddings of recently used prompts, see _embed_prompt()
+        self._prompt_cache = OrderedDict()
 
-        self.torch_dtype = torch.float16 if torch.cuda.is_available() else None
+        # Optional StageProfiler recording where the time of each call goes
+        self.profiler = None
 
-        # Initialize model
-        if self.torch_dtype:
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_path, 
-                trust_remote_code=True,
-                device_map=self.device,
-                torch_dtype=self.torch_dtype
-            )
+        # Set device. Dynamically quantized kernels and the ONNX backend only run on the CPU
+        self.precision = precision
+        if precision == "int8-dynamic" or backend == "onnx":
+            self.device = "cpu"
         else:
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_path, 
-                trust_remote_code=True,
-                device_map=self.device
-            )
+            self.device = get_device()
+        print(f"Using device: {self.device}")
 
-        self.processor = AutoProcessor.from_pretrained(
-            model_path, 
-            trust_remote_code=True
+        # Set the dtype of the weights, and of autocast regions if any
+        self.torch_dtype = None
+        self._autocast_dtype = None
+        if precision is None:
+            self.torch_dtype = torch.float16 if self.device == "cuda" else None
+        elif precision == "bf16":
+            if not _bf16_supported(self.device):
+                logger.warning("bf16 is not supported on %s; using fp32 instead", self.device)
+            elif self.device == "cuda":
+                self.torch_dtype = torch.bfloat16
+            else:
+                self._autocast_dtype = torch.bfloat16
+
+        # Load the model and processor, reusing any copy already loaded in this process
+        self.model, self.processor = get_model_registry().get(
+            model_path, self.device, self.torch_dtype, precision=precision
+        )
+
+        # Engine running the vision encoder and the text encoder/decoder
+        self.backend = get_backend(
+            backend, self.model, model_path, image_size=self.input_size
         )
 
+        # Cached features are only valid for the same weights, preprocessing and dtype
+        self.feature_cache = feature_cache
+        if feature_cache is not None:
+            self._feature_namespace = FeatureCache.make_namespace(
+                model_path,
+                self.processor.image_processor.to_json_string(),
+                self._autocast_dtype or self.torch_dtype,
+            )
+
+    def _stage(self, name: str):
+        """Get a context timing the enclosed block as a stage of :attr:`profiler`, if any."""
+        return _profile_stage(self.profiler, name)
+
+    def _autocast(self):
+        """Get a context running the enclosed ops in the model's autocast dtype, if any."""
+        if self._autocast_dtype is None:
+            return contextlib.nullcontext()
+
+        return torch.autocast(device_type=self.device, dtype=self._autocast_dtype)
+
     @property
     def media_type(self):
         """Get the media type supported by this model."""
         return "image"
 
+    @property
+    def ragged_batches(self):
+        """Whether batches may contain images of different sizes (they never do).
+
+        :meth:`load_image` and the processor resize every image to the same fixed
+        resolution, so the images of a batch always share a size and can be stacked
+        directly.
+        """
+        return False
+
+    @property
+    def transforms(self):
+        """Preprocessing is handled by the Florence-2 processor."""
+        return None
+
+    @property
+    def preprocess(self):
+        """Whether inputs are preprocessed by :meth:`predict_all`."""
+        return self._preprocess
+
+    @preprocess.setter
+    def preprocess(self, value):
+        self._preprocess = value
+
+    def provenance(self, prompt: Optional[str] = None) -> str:
+        """Describe how this model produces its outputs.
+        
+        The provenance identifies the checkpoint, the operation with its parameters
+        and the per-sample prompt, if any. It is stored alongside each result so that
+        resumed runs can tell which existing outputs are still up to date.
+        
+        Settings are hashed once resolved, i.e. the task prompt instead of the
+        parameters selecting it and the effective decoding settings instead of the
+        generation profile, with defaults applied and unset parameters ignored. So
+        runs with equivalent settings, e.g. from an operator, which sets every
+        option, and from the SDK, which may omit them, record the same provenance.
+        
+        Args:
+            prompt: Optional per-sample caption/expression used for the sample
+            
+        Returns:
+            str: A compact ``"<model_path>|<operation>|<hash>"`` string, where the hash
+            covers the resolved operation parameters and the prompt
+        """
+        task = _task_prompt(self.operation, self.params)
+
+        params = {
+            key: value
+            for key, value in self.params.items()
+            if value is not None and key not in _RESOLVED_PARAMS
+        }
+        if self.operation == "segmentation":
+            params["output_type"] = params.get("output_type") or DEFAULT_SEGMENTATION_OUTPUT_TYPE
+
+        config = json.dumps(
+            {
+                "task": task,
+                "generation_kwargs": self.generation_kwargs(task),
+                "precision": self.params.get("precision"),
+                "backend": self.params.get("backend") or DEFAULT_BACKEND,
+                "params": params,
+                "prompt": prompt,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha1(config.encode("utf-8")).hexdigest()[:12]
+        return f"{self.model_path}|{self.operation}|{digest}"
+
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        """The (width, height) to which the processor resizes input images."""
+        return _processor_input_size(self.processor)
+
+    def load_image(self, filepath: str) -> Image.Image:
+        """Decode an image file directly at the model's input resolution.
+        
+        This performs the expensive part of preprocessing (decoding and resizing)
+        outside of :meth:`predict_all`, so it can run in background threads. JPEGs are
+        downscaled by the decoder itself, so the full-resolution image is never
+        materialized. The processor's own resize is a no-op on the result, and since
+        all outputs are normalized by the image dimensions, predictions are unaffected.
+        
+        When a feature cache is configured, the file's content hash is stored in the
+        returned image's ``info`` so that :meth:`encode_images` can look it up.
+        
+        Args:
+            filepath: Path to the image file
+            
+        Returns:
+            Image.Image: The resized RGB image
+        """
+        resample = getattr(self.processor.image_processor, "resample", Image.BICUBIC)
+
+        if self.feature_cache is None:
+            return _to_pil_image(filepath, size=self.input_size, resample=resample)
+
+        # Read the file once, both to hash its content and to decode it
+        with open(filepath, "rb") as f:
+            data = f.read()
+
+        image = _to_pil_image(io.BytesIO(data), size=self.input_size, resample=resample)
+        image.info[CONTENT_HASH_INFO_KEY] = hash_bytes(data)
+        return image
+
+    @torch.no_grad()
+    def encode_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """Run the vision encoder on a batch of images.
+        
+        The returned features can be passed to :meth:`predict_all` via its
+        ``image_features`` argument to run several task prompts against the same
+        images without re-encoding them.
+        
+        If a feature cache is configured and the images were loaded via
+        :meth:`load_image`, only the images missing from the cache are encoded, and
+        their features are added to the cache.
+        
+        Args:
+            images: The input images
+            
+        Returns:
+            torch.Tensor: Image features with shape (batch, image_tokens, hidden_size)
+        """
+        content_hashes = [image.info.get(CONTENT_HASH_INFO_KEY) for image in images]
+        if self.feature_cache is None or None in content_hashes:
+            return self._encode_images(images)
+
+        cache = self.feature_cache
+        namespace = self._feature_namespace
+        cached = cache.get_many(namespace, content_hashes)
+
+        features = [None] * len(images)
+        for idx, array in cached.items():
+            features[idx] = torch.from_numpy(array).to(self.device, self.model.dtype)
+
+        # Only run the vision tower on cache misses
+        misses = [idx for idx in range(len(images)) if idx not in cached]
+        if misses:
+            encoded = self._encode_images([images[idx] for idx in misses])
+            for idx, image_features in zip(misses, encoded):
+                features[idx] = image_features
+                cache.put(namespace, content_hashes[idx], image_features)
+
+        return torch.stack(features)
+
+    def _encode_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """Run the vision encoder on a batch of images, bypassing the feature cache."""
+        with self._stage("preprocess"):
+            pixel_values = self.processor.image_processor(
+                images, return_tensors="pt"
+            )["pixel_values"]
+        
+        # Move inputs to device, casting them to the dtype of the weights if set
+        with self._stage("transfer"):
+            if self.torch_dtype is not None:
+                pixel_values = pixel_values.to(self.device, self.torch_dtype)
+            else:
+                pixel_values = pixel_values.to(self.device)
+
+        with self._stage("encode"), self._autocast():
+            return self.backend.encode_images(pixel_values)
+
+    def _embed_prompt(self, text: str) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Tokenize and embed a single prompt, reusing earlier results for the same text.
+        
+        Task prompts such as "<OD>" are the same for every image, so they are only
+        tokenized and embedded once per model. The least recently used prompts are
+        dropped beyond :data:`PROMPT_CACHE_SIZE` entries, which bounds the cache when
+        every sample has its own caption or expression.
+        
+        Args:
+            text: A bare task token or a task with text input
+            
+        Returns:
+            tuple: The ``input_ids`` (tokens,) and embeddings (tokens, hidden_size) of
+            the prompt, on the model's device
+        """
+        entry = self._prompt_cache.get(text)
+        if entry is not None:
+            self._prompt_cache.move_to_end(text)
+            return entry
+
+        input_ids = self.processor.tokenizer(
+            self.processor._construct_prompts([text]),
+            return_tensors="pt",
+        )["input_ids"][0].to(self.device)
+        entry = (input_ids, self.model.get_input_embeddings()(input_ids))
+
+        self._prompt_cache[text] = entry
+        if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+            self._prompt_cache.popitem(last=False)
+
+        return entry
+
+    def _embed_prompts(self, texts: List[str]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Embed a batch of prompts, padded the same way the Florence-2 processor pads them.
+        
+        Args:
+            texts: One prompt per image, either a bare task token or a task with text input
+            
+        Returns:
+            tuple: The padded prompt embeddings (batch, tokens, hidden_size) and their
+            attention mask (batch, tokens)
+        """
+        entries = [self._embed_prompt(text) for text in texts]
+
+        # A shared task prompt is broadcast over the batch without copies
+        if len(set(texts)) == 1:
+            input_ids, embeds = entries[0]
+            batch_size = len(texts)
+            attention_mask = torch.ones(
+                (batch_size, input_ids.shape[0]), dtype=torch.long, device=self.device
+            )
+            return embeds.unsqueeze(0).expand(batch_size, -1, -1), attention_mask
+
+        tokenizer = self.processor.tokenizer
+        max_len = max(input_ids.shape[0] for input_ids, _ in entries)
+        pad_embeds = self.model.get_input_embeddings()(
+            torch.tensor([tokenizer.pad_token_id], device=self.device)
+        )
+
+        batch_embeds = []
+        attention_mask = torch.zeros(
+            (len(texts), max_len), dtype=torch.long, device=self.device
+        )
+        for idx, (input_ids, embeds) in enumerate(entries):
+            num_tokens = input_ids.shape[0]
+            padding = pad_embeds.expand(max_len - num_tokens, -1)
+            if tokenizer.padding_side == "left":
+                batch_embeds.append(torch.cat([padding, embeds]))
+                attention_mask[idx, max_len - num_tokens:] = 1
+            else:
+                batch_embeds.append(torch.cat([embeds, padding]))
+                attention_mask[idx, :num_tokens] = 1
+
+        return torch.stack(batch_embeds), attention_mask
+
+    def generation_kwargs(self, task: str, **overrides) -> Dict[str, Any]:
+        """Get the decoding settings for a task prompt.
+        
+        The task's entry in the model's generation profile is applied on top of the
+        profile's defaults, followed by the model's ``generation_kwargs`` and any
+        ``overrides``. Beam search settings are dropped for greedy decoding.
+        
+        Args:
+            task: The task prompt, e.g. "<CAPTION>"
+            **overrides: Settings that take precedence over all others
+            
+        Returns:
+            dict: Keyword arguments for ``generate()``
+        """
+        profile = GENERATION_PROFILES[
+            self.params.get("generation_profile") or DEFAULT_GENERATION_PROFILE
+        ]
+
+        kwargs = dict(profile["default"])
+        kwargs.update(profile.get(task, {}))
+        kwargs.update(self.params.get("generation_kwargs") or {})
+        kwargs.update(overrides)
+
+        if kwargs.get("num_beams", 1) == 1:
+            for key in _BEAM_SEARCH_KWARGS:
+                kwargs.pop(key, None)
+
+        return kwargs
+
+    @torch.no_grad()
     def _generate_and_parse(
         self,
-        image: Image.Image,
+        images: List[Image.Image],
         task: str,
-        text_input: Optional[str] = None,
-        max_new_tokens: int = 1024,
-        num_beams: int = 3,
-    ):
-        """Generate and parse a response from the model.
+        text_input: Optional[Union[str, List[str]]] = None,
+        image_features: Optional[torch.Tensor] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Generate and parse responses from the model for a batch of images.
+        
+        All images are processed into a single ``pixel_values`` tensor and a
+        single ``input_ids`` batch, so the whole batch is handled by one
+        ``generate`` call and one ``batch_decode`` call. Prompts of different
+        lengths are padded, and the padding is masked out of the encoder's
+        attention.
         
         Args:
-            image: The input image
+            images: The input images
             task: The task prompt to use
-            text_input: Optional text input that includes the task
-            max_new_tokens: Maximum new tokens to generate
-            num_beams: Number of beams for beam search
+            text_input: Optional text input that includes the task. Either a
+                single string shared by all images or one string per image
+            image_features: Optional precomputed output of :meth:`encode_images`
+                for these images. If not provided, the images are encoded here
+            generation_kwargs: Optional overrides of the settings from
+                :meth:`generation_kwargs`
             
         Returns:
-            The parsed model output
+            A list with the parsed model output for each image
         """
         text = task
         if text_input is not None:
             text = text_input
-            
-        inputs = self.processor(text=text, images=image, return_tensors="pt")
-        
-        # Move inputs to device without dtype casting for MPS/CPU
-        for key in inputs:
-            if torch.is_tensor(inputs[key]):
-                if torch.cuda.is_available() and key == "pixel_values":
-                    inputs[key] = inputs[key].to(self.device, self.torch_dtype)
-                else:
-                    inputs[key] = inputs[key].to(self.device)
-
-        generated_ids = self.model.generate(
-            input_ids=inputs["input_ids"],
-            pixel_values=inputs["pixel_values"],
-            max_new_tokens=max_new_tokens,
-            num_beams=num_beams,
-            do_sample=False,
-        )
-        generated_text = self.processor.batch_decode(
-            generated_ids, 
-            skip_special_tokens=False
-        )[0]
-
-        parsed_answer = self.processor.post_process_generation(
-            generated_text, 
-            task=task, 
-            image_size=(image.width, image.height)
-        )
 
-        return parsed_answer
+        if isinstance(text, str):
+            texts = [text] * len(images)
+        else:
+            texts = list(text)
+
+        if image_features is None:
+            image_features = self.encode_images(images)
+
+        with self._stage("embed"):
+            prompt_embeds, prompt_attention_mask = self._embed_prompts(texts)
+
+            # Prepend the image features to the prompt embeddings, the same way
+            # Florence-2's generate() does, but keeping the prompt padding mask
+            inputs_embeds, attention_mask = self.model._merge_input_ids_with_image_features(
+                image_features.to(prompt_embeds.dtype), prompt_embeds
+            )
+            attention_mask[:, image_features.shape[1]:] = prompt_attention_mask
+
+        with self._stage("generate"), self._autocast():
+            generated_ids = self.backend.generate(
+                inputs_embeds,
+                attention_mask,
+                **self.generation_kwargs(task, **(generation_kwargs or {})),
+            )
+
+        if self.profiler is not None:
+            self.profiler.add_generated_tokens(
+                self._count_generated_tokens(generated_ids),
+                self.profiler.last_duration("generate"),
+            )
+
+        with self._stage("batch_decode"):
+            generated_texts = self.processor.batch_decode(
+                generated_ids, 
+                skip_special_tokens=False
+            )
+
+        with self._stage("post_process"):
+            return [
+                self.processor.post_process_generation(
+                    generated_text, 
+                    task=task, 
+                    image_size=(image.width, image.height)
+                )
+                for generated_text, image in zip(generated_texts, images)
+            ]
+
+    def _count_generated_tokens(self, generated_ids: torch.Tensor) -> List[int]:
+        """Count the tokens generated for each sample, excluding padding.
+        
+        Args:
+            generated_ids: The (batch, tokens) output of ``generate()``, which starts
+                with the decoder start token
+            
+        Returns:
+            list: The number of generated tokens of each sample
+        """
+        pad_token_id = self.processor.tokenizer.pad_token_id
+        num_tokens = (generated_ids != pad_token_id).sum(dim=1) - 1
+        return num_tokens.clamp(min=0).tolist()
 
     def _extract_detections(self, parsed_answer, task, image):
         """Extracts object detections from the model's parsed output and converts them to FiftyOne format.
@@ -323,16 +1008,13 @@ class Florence2(Model):
         bboxes = parsed_answer[task][bbox_key]
         labels = parsed_answer[task][label_key]
         
-        # Build list of FiftyOne Detection objects
-        dets = []
-        for i, (bbox, label) in enumerate(zip(bboxes, labels)):
+        # Convert all boxes at once, then build the FiftyOne Detection objects
+        boxes = _convert_bboxes(bboxes, image.width, image.height).tolist()
+        dets = [
             # Create Detection with either model label or fallback object_N label
-            dets.append(
-                Detection(
-                    label=label if label else f"object_{i+1}",
-                    bounding_box=_convert_bbox(bbox, image.width, image.height),
-                )
-            )
+            Detection(label=label if label else f"object_{i+1}", bounding_box=box)
+            for i, (box, label) in enumerate(zip(boxes, labels))
+        ]
             
         # Return all detections wrapped in a FiftyOne Detections object
         return Detections(detections=dets)
@@ -353,13 +1035,15 @@ class Florence2(Model):
         if not polygons:
             return None
 
+        tolerance = self.params.get("simplify_tolerance")
+
         polylines = []
 
         # Process each polygon
         for k, polygon in enumerate(polygons):
             # Process all contours for this polygon
             all_contours = [
-                _convert_polyline(contour, image.width, image.height)
+                _convert_polyline(contour, image.width, image.height, tolerance=tolerance)
                 for contour in polygon
             ]
 
@@ -375,17 +1059,65 @@ class Florence2(Model):
 
         return Polylines(polylines=polylines)
 
-    def _predict_caption(self, image: Image.Image) -> str:
-        """Generate a natural language caption describing the input image.
+    def _rasterize_polylines(self, polylines, image):
+        """Convert segmentation polygons to the mask-based output type, if requested.
+        
+        Rasterizing once at inference time spares consumers of the masks, e.g.
+        evaluation runs, from parsing the point lists and rasterizing them again on
+        every pass.
+        
+        Args:
+            polylines (Polylines): The polygons extracted by :meth:`_extract_polylines`,
+                or None
+            image (PIL.Image): The input image. Masks are rasterized at the size of
+                the source image it was resized from, if known, so that they match
+                the sample's media
+            
+        Returns:
+            The ``polylines`` unchanged for the "polylines" output type, Detections
+            with cropped instance masks for "detections", or a Segmentation for
+            "segmentation". None if no polygons were found
+        """
+        output_type = self.params.get("output_type") or DEFAULT_SEGMENTATION_OUTPUT_TYPE
+        if polylines is None or output_type == "polylines":
+            return polylines
+
+        # Polygons are in relative coordinates, so they can be filled at the source
+        # resolution rather than at the model's square input resolution
+        frame_size = tuple(image.info.get(SOURCE_SIZE_INFO_KEY, image.size))
+
+        if output_type == "detections":
+            # Each mask only covers its polygon's bounding box, at the frame's
+            # resolution; mask_size would instead set the size of each mask itself
+            return Detections(
+                detections=[
+                    polyline.to_detection(frame_size=frame_size)
+                    for polyline in polylines.polylines
+                ]
+            )
+
+        # Pixel value k marks object_k, 0 is the background
+        mask_targets = {
+            k + 1: polyline.label for k, polyline in enumerate(polylines.polylines)
+        }
+        return polylines.to_segmentation(frame_size=frame_size, mask_targets=mask_targets)
+
+    def _predict_caption(
+        self,
+        images: List[Image.Image],
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[str]:
+        """Generate natural language captions describing the input images.
         
-        This method uses the Florence-2 model to generate a descriptive caption for the image.
+        This method uses the Florence-2 model to generate a descriptive caption for each image.
         The level of detail in the caption can be controlled via the "detail_level" parameter.
 
         Args:
-            image: PIL Image object containing the image to be captioned
+            images: List of PIL Image objects containing the images to be captioned
+            image_features: Optional precomputed output of :meth:`encode_images` for the images
             
         Returns:
-            str: A natural language caption describing the contents and context of the image
+            List[str]: A natural language caption for each image describing its contents and context
             
         Note:
             The detail_level parameter can be set to:
@@ -402,14 +1134,18 @@ class Florence2(Model):
         # Look up the appropriate task for the detail level, falling back to default if not found
         task = task_mapping.get(detail_level, task_mapping[None])
             
-        # Generate the caption by running the model and parsing its output
-        parsed_answer = self._generate_and_parse(image, task)
+        # Generate the captions by running the model and parsing its output
+        parsed_answers = self._generate_and_parse(images, task, image_features=image_features)
         
-        # Extract and return just the caption text from the parsed response
-        return parsed_answer[task]
+        # Extract and return just the caption text from each parsed response
+        return [parsed_answer[task] for parsed_answer in parsed_answers]
 
-    def _predict_ocr(self, image: Image.Image) -> Union[str, Detections]:
-        """Perform Optical Character Recognition (OCR) on an input image.
+    def _predict_ocr(
+        self,
+        images: List[Image.Image],
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Union[str, Detections]]:
+        """Perform Optical Character Recognition (OCR) on a batch of images.
         
         This method uses the Florence-2 model to detect and extract text from images.
         It can operate in two modes:
@@ -417,10 +1153,12 @@ class Florence2(Model):
         2. Region-based OCR - returns text with bounding box coordinates
         
         Args:
-            image (Image.Image): PIL Image object containing the image to perform OCR on
+            images (List[Image.Image]): PIL Image objects containing the images to perform OCR on
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for the images. If not provided, the images are encoded by this call
             
         Returns:
-            Union[str, Detections]: Either:
+            List[Union[str, Detections]]: For each image, either:
                 - A string containing all detected text (when store_region_info=False)
                 - A Detections object containing text regions with bounding boxes
                   (when store_region_info=True)
@@ -435,29 +1173,39 @@ class Florence2(Model):
         if store_region_info:
             # Use region-based OCR task that includes bounding box coordinates
             task = FLORENCE2_OPERATIONS["ocr"]["region_task"]
-            parsed_answer = self._generate_and_parse(image, task)
-            # Convert the parsed output into FiftyOne Detections format
-            return self._extract_detections(parsed_answer, task, image)
+            parsed_answers = self._generate_and_parse(images, task, image_features=image_features)
+            # Convert the parsed outputs into FiftyOne Detections format
+            with self._stage("convert"):
+                return [
+                    self._extract_detections(parsed_answer, task, image)
+                    for parsed_answer, image in zip(parsed_answers, images)
+                ]
         else:
             # Use basic OCR task that returns only text
             task = FLORENCE2_OPERATIONS["ocr"]["task"]
-            parsed_answer = self._generate_and_parse(image, task)
-            # Return just the extracted text string
-            return parsed_answer[task]
+            parsed_answers = self._generate_and_parse(images, task, image_features=image_features)
+            # Return just the extracted text strings
+            return [parsed_answer[task] for parsed_answer in parsed_answers]
 
-    def _predict_detection(self, image: Image.Image) -> Detections:
-        """Detect objects in an image using the Florence2 model.
+    def _predict_detection(
+        self,
+        images: List[Image.Image],
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Detections]:
+        """Detect objects in a batch of images using the Florence2 model.
         
-        This method performs object detection on the input image. It supports two modes:
+        This method performs object detection on the input images. It supports two modes:
         1. Open vocabulary detection - Detects common objects without specific prompting
         2. Prompted detection - Detects objects matching a provided text prompt
         
         Args:
-            image (Image.Image): PIL Image object containing the image to analyze
+            images (List[Image.Image]): PIL Image objects containing the images to analyze
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for the images. If not provided, the images are encoded by this call
             
         Returns:
-            Detections: FiftyOne Detections object containing the detected objects.
-                       Each detection includes a label and bounding box coordinates.
+            List[Detections]: FiftyOne Detections object for each image containing the detected
+                       objects. Each detection includes a label and bounding box coordinates.
                        
         Note:
             The detection behavior is controlled by two parameters in self.params:
@@ -473,24 +1221,39 @@ class Florence2(Model):
         task = task_mapping.get(detection_type, task_mapping[None])  # Fall back to default if type not found
         
         # Run the model and parse its output, passing text_prompt if provided
-        parsed_answer = self._generate_and_parse(image, task, text_input=text_prompt)
+        parsed_answers = self._generate_and_parse(
+            images, task, text_input=text_prompt, image_features=image_features
+        )
         
-        # Convert the parsed model output into FiftyOne's Detections format
-        return self._extract_detections(parsed_answer, task, image)
+        # Convert the parsed model outputs into FiftyOne's Detections format
+        with self._stage("convert"):
+            return [
+                self._extract_detections(parsed_answer, task, image)
+                for parsed_answer, image in zip(parsed_answers, images)
+            ]
 
-    def _predict_phrase_grounding(self, image: Image.Image) -> Detections:
-        """Ground caption phrases in an image using the Florence2 model.
+    def _predict_phrase_grounding(
+        self,
+        images: List[Image.Image],
+        captions: Optional[List[str]] = None,
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Detections]:
+        """Ground caption phrases in a batch of images using the Florence2 model.
         
-        This method performs phrase grounding by identifying regions in the image that
+        This method performs phrase grounding by identifying regions in the images that
         correspond to specific phrases from a caption. It can use either a direct caption
         string or a caption stored in a sample field.
 
         Args:
-            image (Image.Image): PIL Image object containing the image to analyze
+            images (List[Image.Image]): PIL Image objects containing the images to analyze
+            captions (List[str], optional): Per-image captions to ground. If not provided,
+                the caption from self.params is used for every image
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for the images. If not provided, the images are encoded by this call
             
         Returns:
-            Detections: FiftyOne Detections object containing the grounded phrases.
-                       Each detection includes the phrase text as the label and 
+            List[Detections]: FiftyOne Detections object for each image containing the grounded
+                       phrases. Each detection includes the phrase text as the label and 
                        bounding box coordinates indicating the region in the image.
 
         Note:
@@ -501,36 +1264,55 @@ class Florence2(Model):
         # Get the phrase grounding task configuration
         task = FLORENCE2_OPERATIONS["phrase_grounding"]["task"]
         
-        # Determine caption input - either direct caption or field reference
-        if "caption" in self.params:
-            # Use directly provided caption string
-            caption = self.params["caption"]
-        else:
-            # Use caption from specified field (resolved by caller)
-            caption = self.params["caption_field"]
+        # Determine caption input - either per-image captions or a shared caption
+        if captions is None:
+            if "caption" in self.params:
+                # Use directly provided caption string
+                caption = self.params["caption"]
+            else:
+                # Use caption from specified field (resolved by caller)
+                caption = self.params["caption_field"]
+            captions = [caption] * len(images)
         
-        # Format the input by combining task instruction and caption
-        text_input = f"{task}\n{caption}"
+        # Format the inputs by combining task instruction and caption
+        text_inputs = [f"{task}\n{caption}" for caption in captions]
         
         # Run model inference and parse the output
-        parsed_answer = self._generate_and_parse(image, task, text_input=text_input)
+        parsed_answers = self._generate_and_parse(
+            images, task, text_input=text_inputs, image_features=image_features
+        )
         
-        # Convert parsed output to FiftyOne Detections format
-        return self._extract_detections(parsed_answer, task, image)
+        # Convert parsed outputs to FiftyOne Detections format
+        with self._stage("convert"):
+            return [
+                self._extract_detections(parsed_answer, task, image)
+                for parsed_answer, image in zip(parsed_answers, images)
+            ]
 
-    def _predict_segmentation(self, image: Image.Image) -> Optional[Polylines]:
-        """Segment an object in an image based on a referring expression.
+    def _predict_segmentation(
+        self,
+        images: List[Image.Image],
+        expressions: Optional[List[str]] = None,
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Optional[Union[Polylines, Detections, Segmentation]]]:
+        """Segment an object in a batch of images based on a referring expression.
         
         This method performs instance segmentation by generating a polygon mask around
         an object described by a natural language expression. The expression can be 
         provided directly or referenced from a sample field.
 
         Args:
-            image (Image.Image): PIL Image object containing the image to analyze
+            images (List[Image.Image]): PIL Image objects containing the images to analyze
+            expressions (List[str], optional): Per-image referring expressions. If not
+                provided, the expression from self.params is used for every image
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for the images. If not provided, the images are encoded by this call
 
         Returns:
-            Optional[Polylines]: FiftyOne Polylines object containing the segmentation
-                mask as a polygon, or None if no matching object is found in the image
+            List[Optional[Union[Polylines, Detections, Segmentation]]]: FiftyOne label for each
+                image containing the segmentation mask, as a polygon by default or as a mask
+                depending on the ``output_type`` parameter, or None if no matching object is
+                found in the image
 
         Note:
             The referring expression is controlled by parameters in self.params:
@@ -540,42 +1322,62 @@ class Florence2(Model):
         # Get the segmentation task configuration from Florence2 operations
         task = FLORENCE2_OPERATIONS["segmentation"]["task"]
         
-        # Determine the referring expression - either direct text or field reference
-        if "expression" in self.params:
-            # Use directly provided expression string
-            expression = self.params["expression"]
-        else:
-            # Use expression from specified field (resolved by caller)
-            expression = self.params["expression_field"] 
+        # Determine the referring expression - either per-image expressions or a shared one
+        if expressions is None:
+            if "expression" in self.params:
+                # Use directly provided expression string
+                expression = self.params["expression"]
+            else:
+                # Use expression from specified field (resolved by caller)
+                expression = self.params["expression_field"] 
+            expressions = [expression] * len(images)
         
-        # Format the input by combining task instruction and referring expression
-        text_input = f"{task}\nExpression: {expression}"
+        # Format the inputs by combining task instruction and referring expression
+        text_inputs = [f"{task}\nExpression: {expression}" for expression in expressions]
         
         # Run model inference and parse the output
-        parsed_answer = self._generate_and_parse(image, task, text_input=text_input)
+        parsed_answers = self._generate_and_parse(
+            images, task, text_input=text_inputs, image_features=image_features
+        )
         
-        # Convert parsed output to FiftyOne Polylines format
-        return self._extract_polylines(parsed_answer, task, image)
+        # Convert parsed outputs to FiftyOne Polylines format, then to masks if requested
+        with self._stage("convert"):
+            return [
+                self._rasterize_polylines(
+                    self._extract_polylines(parsed_answer, task, image), image
+                )
+                for parsed_answer, image in zip(parsed_answers, images)
+            ]
 
-    def _predict(self, image: Image.Image) -> Any:
-        """Process a single image with Florence2 model.
+    def _predict_all(
+        self,
+        images: List[Image.Image],
+        prompts: Optional[List[str]] = None,
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Any]:
+        """Process a batch of images with Florence2 model.
         
-        This internal method handles routing the image to the appropriate prediction
+        This internal method handles routing the images to the appropriate prediction
         method based on the operation type (caption, OCR, detection, etc.) that was 
         specified when initializing the Florence2 class.
 
         Args:
-            image (Image.Image): PIL Image object to process with the model
+            images (List[Image.Image]): PIL Image objects to process with the model
+            prompts (List[str], optional): Per-image captions (phrase_grounding) or
+                referring expressions (segmentation) to use instead of self.params
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for the images
             
         Returns:
-            Any: Operation-specific result type:
+            List[Any]: Operation-specific result for each image:
                 - str for captioning
                 - Detections for detection/phrase grounding 
-                - Polylines for segmentation
+                - Polylines, Detections or Segmentation for segmentation
                 - List[Detection] for OCR
                 
         Raises:
-            ValueError: If self.operation is not one of the supported operation types
+            ValueError: If self.operation is not one of the supported operation types,
+                or if prompts are provided for an operation that does not accept them
         """
         # Map operation names to their corresponding prediction methods
         prediction_methods = {
@@ -593,148 +1395,1241 @@ class Florence2(Model):
         if predict_method is None:
             raise ValueError(f"Unknown operation: {self.operation}")
             
-        # Call the appropriate prediction method with the image
-        return predict_method(image)
+        # Per-image prompts are only meaningful for the text-conditioned operations
+        if prompts is not None:
+            if self.operation not in PROMPT_FIELD_PARAMS:
+                raise ValueError(f"Operation '{self.operation}' does not accept per-image prompts")
 
-    def predict(self, image: np.ndarray) -> Any:
-        """Process an image array with Florence2 model.
+            if len(prompts) != len(images):
+                raise ValueError(f"Expected {len(images)} prompts but received {len(prompts)}")
+
+            return predict_method(images, prompts, image_features=image_features)
+
+        # Call the appropriate prediction method with the images
+        return predict_method(images, image_features=image_features)
+
+    def predict(self, image: ImageInput) -> Any:
+        """Process an image with Florence2 model.
         
-        This method serves as the main entry point when using FiftyOne's apply_model functionality.
-        It converts the input numpy array to a PIL Image and routes it through the internal 
-        prediction pipeline.
+        This method serves as the main entry point when using FiftyOne's apply_model functionality
+        without batching. It is equivalent to calling :meth:`predict_all` with a single image.
         
         Args:
-            image (np.ndarray): Input image as a numpy array in RGB format with shape (H,W,3)
+            image (ImageInput): Input image as a numpy array in RGB format with shape (H,W,3),
+                a PIL Image, or a path to an image file
             
         Returns:
             Any: Operation-specific result type:
                 - str for captioning operations
                 - Detections for detection/phrase grounding operations
-                - Polylines for segmentation operations 
+                - Polylines, Detections or Segmentation for segmentation operations 
                 - List[Detection] for OCR operations
+        """
+        return self.predict_all([image])[0]
+
+    def predict_all(
+        self,
+        images: List[ImageInput],
+        prompts: Optional[List[str]] = None,
+        image_features: Optional[torch.Tensor] = None,
+    ) -> List[Any]:
+        """Process a batch of images with Florence2 model.
+        
+        This method is used by FiftyOne's apply_model functionality when a batch_size is
+        provided. All images in the batch are run through a single generate call.
+        
+        Args:
+            images (List[ImageInput]): Input images as numpy arrays in RGB format with shape
+                (H,W,3), PIL Images, or paths to image files. File paths are decoded directly
+                at the model's input resolution via :meth:`load_image`
+            prompts (List[str], optional): Per-image captions (phrase_grounding) or referring
+                expressions (segmentation). When provided, these are used instead of the
+                caption/expression in self.params, which is left untouched
+            image_features (torch.Tensor, optional): Precomputed output of :meth:`encode_images`
+                for these images. Pass the same features to several models sharing a checkpoint
+                to run multiple tasks while running the vision encoder only once
+            
+        Returns:
+            List[Any]: Operation-specific result for each image, in the same order as the inputs
                 
         Note:
-            This method automatically handles conversion between numpy array and PIL Image formats.
+            PIL Images are used as-is, without any intermediate numpy copy.
             The specific return type depends on which operation was specified when initializing
             the Florence2 class.
         """
-        # Convert numpy array to PIL Image format required by Florence2
-        pil_image = Image.fromarray(image)
+        # Convert inputs to the PIL Image format required by Florence2
+        pil_images = [
+            self.load_image(image) if isinstance(image, (str, os.PathLike)) else _to_pil_image(image)
+            for image in images
+        ]
         
         # Route through internal prediction pipeline
-        return self._predict(pil_image)
+        return self._predict_all(pil_images, prompts=prompts, image_features=image_features)
 
-def run_florence2_model(
-    dataset: fo.Dataset,
+class DaemonModel(object):
+    """Runs a Florence-2 operation in the local inference daemon (see :mod:`daemon`).
+
+    This stands in for :class:`Florence2` in the batched pipeline when
+    ``backend="daemon"``: no checkpoint is loaded in this process, and each batch is
+    sent to the daemon, which batches it with the requests of other runs. Images are
+    sent as file paths and decoded by the daemon, so the daemon must be able to read
+    the dataset's media.
+
+    The daemon chooses the execution backend of its own models, and the feature
+    cache is not used. The model holds a connection to the daemon until
+    :meth:`close` is called, or until its context exits when used as a context
+    manager.
+
+    Args:
+        operation: Type of operation to perform
+        model_path: Model path or HuggingFace repo name
+        address: Optional address of the daemon. Defaults to
+            ``FLORENCE2_DAEMON_ADDRESS`` or ``~/.cache/fiftyone_florence2/daemon/daemon.sock``
+        **kwargs: Operation-specific parameters, as for :class:`Florence2`
+    """
+
+    # Parameters that only matter in this process, e.g. where masks are exported
+    LOCAL_PARAMS = ("backend", "mask_dir")
+
+    def __init__(
+        self,
+        operation: str,
+        model_path: str = DEFAULT_MODEL_PATH,
+        address: Optional[str] = None,
+        **kwargs
+    ):
+        if operation not in FLORENCE2_OPERATIONS:
+            raise ValueError(f"Invalid operation: {operation}. Must be one of {list(FLORENCE2_OPERATIONS.keys())}")
+
+        self.operation = operation
+        self.model_path = model_path
+        self.params = kwargs
+        self.profiler = None
+        self.client = DaemonClient(address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the daemon."""
+        self.client.close()
+
+    def load_image(self, filepath: str) -> str:
+        """Images are decoded by the daemon, so only their absolute path is needed."""
+        return os.path.abspath(filepath)
+
+    def encode_images(self, images: List[ImageInput]) -> None:
+        """The daemon runs the vision encoder along with the rest of the model."""
+        return None
+
+    def provenance(self, prompt: Optional[str] = None) -> str:
+        """Describe how this model produces its outputs, see :meth:`Florence2.provenance`."""
+        return Florence2.provenance(self, prompt)
+
+    def generation_kwargs(self, task: str, **overrides) -> Dict[str, Any]:
+        """Get the decoding settings for a task prompt, see :meth:`Florence2.generation_kwargs`."""
+        return Florence2.generation_kwargs(self, task, **overrides)
+
+    def predict_all(
+        self,
+        images: List[ImageInput],
+        prompts: Optional[List[str]] = None,
+        image_features: None = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Run a batch of images through the daemon.
+
+        Args:
+            images: File paths readable by the daemon, or in-memory images
+            prompts: Optional per-image captions/expressions
+            image_features: Unused; the daemon encodes images itself
+            return_exceptions: Whether to return the error of an image that failed
+                in the daemon, e.g. because its file couldn't be read, in place of
+                its result rather than raising it
+
+        Returns:
+            list: The result of each image
+        """
+        params = {
+            key: value
+            for key, value in self.params.items()
+            if key not in self.LOCAL_PARAMS and value is not None
+        }
+
+        images = [
+            os.fspath(image) if isinstance(image, os.PathLike) else image
+            for image in images
+        ]
+
+        # The daemon schedules requests by the priority of the run that sent them
+        with _profile_stage(self.profiler, "daemon"):
+            return self.client.predict(
+                self.model_path,
+                self.operation,
+                params,
+                images,
+                prompts=prompts,
+                priority=get_scheduler().current_priority(),
+                return_exceptions=return_exceptions,
+            )
+
+def _create_model(
     operation: str,
-    output_field: str,
     model_path: str = DEFAULT_MODEL_PATH,
+    feature_cache: Optional[FeatureCache] = None,
     **kwargs
-) -> None:
-    """Apply Florence2 operations to a FiftyOne dataset.
-    
-    This function processes a FiftyOne dataset using the Florence2 model, supporting
-    various vision tasks like captioning, detection, OCR, phrase grounding and segmentation.
+) -> Union[Florence2, DaemonModel]:
+    """Create the model running an operation, in this process or in the daemon."""
+    if kwargs.get("backend") == DAEMON_BACKEND:
+        return DaemonModel(operation, model_path=model_path, **kwargs)
+
+    return Florence2(operation, model_path=model_path, feature_cache=feature_cache, **kwargs)
+
+def _load_task(
+    operation: str,
+    model_path: str = DEFAULT_MODEL_PATH,
+    feature_cache: Optional[FeatureCache] = None,
+    **kwargs
+) -> Tuple[Union[Florence2, DaemonModel], Optional[str]]:
+    """Create the Florence2 model for an operation and find its per-sample prompt field.
     
     Args:
-        dataset: FiftyOne dataset containing images to process
-        operation: Type of operation to perform. Valid options are:
-            - "caption": Generate image captions
-            - "detection": Detect objects in images
-            - "ocr": Perform optical character recognition
-            - "phrase_grounding": Locate objects described by text
-            - "segmentation": Perform instance segmentation
-        output_field: Name of the field where results will be stored in the dataset
-        model_path: HuggingFace model identifier or local path to model weights.
-            Defaults to "microsoft/Florence-2-base-ft"
-        **kwargs: Additional operation-specific parameters
+        operation: Type of operation to perform
+        model_path: HuggingFace model identifier or local path to model weights
+        feature_cache: Optional on-disk cache of vision encoder outputs
+        **kwargs: Operation-specific parameters
+        
+    Returns:
+        tuple: The ``(model, prompt_field)`` pair, where ``prompt_field`` is the name of
+        the field holding per-sample captions/expressions, or None
+        
+    Raises:
+        ValueError: If a required caption/expression parameter is missing
     """
+    # Name of the field holding per-sample prompts, if any
+    prompt_field = None
+
+    # Decoding, precision and backend settings apply to every operation
+    generation_params = {
+        key: kwargs[key]
+        for key in ("generation_profile", "generation_kwargs", "precision", "backend")
+        if kwargs.get(key) is not None
+    }
+
     # Handle phrase_grounding operation
     if operation == "phrase_grounding":
         if "caption" in kwargs:
             # Handle direct caption input
-            model = Florence2(
+            model = _create_model(
                 operation=operation,
                 model_path=model_path,
-                caption=kwargs["caption"]
+                feature_cache=feature_cache,
+                caption=kwargs["caption"],
+                **generation_params
             )
-            # Apply model to entire dataset at once
-            dataset.apply_model(model, label_field=output_field)
             
         elif "caption_field" in kwargs:
             # Handle per-sample captions from field
-            model = Florence2(
+            model = _create_model(
                 operation=operation,
                 model_path=model_path,
-                caption_field=kwargs["caption_field"]
+                feature_cache=feature_cache,
+                caption_field=kwargs["caption_field"],
+                **generation_params
             )
-            
-            for sample in dataset.iter_samples(autosave=True):
-                caption = sample[kwargs["caption_field"]]
-                model.params["caption"] = caption
-                result = model.predict(np.array(Image.open(sample.filepath).convert("RGB")))
-                sample[output_field] = result
+            prompt_field = kwargs["caption_field"]
                 
         else:
             raise ValueError("Either 'caption' or 'caption_field' must be provided for phrase_grounding")
             
     # Handle segmentation operation    
     elif operation == "segmentation":
+        generation_params.update(
+            {
+                key: kwargs[key]
+                for key in SEGMENTATION_OUTPUT_PARAMS
+                if kwargs.get(key) is not None
+            }
+        )
+
         if "expression" in kwargs:
             # Handle direct expression input
-            model = Florence2(
+            model = _create_model(
                 operation=operation,
                 model_path=model_path,
-                expression=kwargs["expression"]
+                feature_cache=feature_cache,
+                expression=kwargs["expression"],
+                **generation_params
             )
-            # Apply model to entire dataset at once
-            dataset.apply_model(model, label_field=output_field)
             
         elif "expression_field" in kwargs:
             # Handle per-sample expressions from field
-            model = Florence2(
+            model = _create_model(
                 operation=operation,
                 model_path=model_path,
-                expression_field=kwargs["expression_field"]
+                feature_cache=feature_cache,
+                expression_field=kwargs["expression_field"],
+                **generation_params
             )
-            
-            for sample in dataset.iter_samples(autosave=True):
-                expression = sample[kwargs["expression_field"]]
-                model.params["expression"] = expression
-                result = model.predict(np.array(Image.open(sample.filepath).convert("RGB")))
-                sample[output_field] = result
+            prompt_field = kwargs["expression_field"]
                 
         else:
             raise ValueError("Either 'expression' or 'expression_field' must be provided for segmentation")
     
-    # Handle detection operation with its specific parameters
-    elif operation == "detection":
-        # Create model with all detection parameters
-        model = Florence2(
+    # Handle detection, OCR, caption and other operations
+    else:
+        # Create model with all operation parameters, e.g. detection_type and
+        # text_prompt for detection, or store_region_info for OCR
+        model = _create_model(
             operation=operation,
             model_path=model_path,
-            **kwargs  # This passes detection_type and text_prompt if present
+            feature_cache=feature_cache,
+            **kwargs
         )
-        # Apply model to entire dataset at once
-        dataset.apply_model(model, label_field=output_field)
+
+    return model, prompt_field
+
+class _BulkWriter(object):
+    """Accumulates results in memory and writes them with bulk ``set_values()`` calls.
+    
+    Writes happen every ``chunk_size`` samples, with one ``set_values()`` call per
+    field, so memory use is bounded by the chunk size. When used as a context
+    manager, any pending results are also written when the block exits, including
+    when it exits because of an error.
+    
+    Args:
+        samples: FiftyOne collection the results belong to
+        chunk_size: Number of samples whose results are written at a time
+        profiler: Optional profiler recording the time of the writes as the
+            "write" stage
+    """
+
+    def __init__(
+        self,
+        samples: fo.core.collections.SampleCollection,
+        chunk_size: int = DEFAULT_CHECKPOINT_INTERVAL,
+        profiler: Optional[StageProfiler] = None,
+    ):
+        # Write through the dataset so that fields excluded from the view can be set
+        self._dataset = samples._dataset
+        self.chunk_size = max(1, chunk_size)
+        self.profiler = profiler
+        self._values = {}
+        self._sample_ids = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def add(self, sample_id: str, field: str, value: Any) -> None:
+        """Queue a value to be written to a sample's field.
         
-    # Handle OCR operation with its specific parameters
-    elif operation == "ocr":
-        # Create model with all OCR parameters
-        model = Florence2(
-            operation=operation,
+        Args:
+            sample_id: ID of the sample
+            field: Name of the field
+            value: Value to write
+        """
+        self._values.setdefault(field, {})[sample_id] = value
+        self._sample_ids.add(sample_id)
+
+        if len(self._sample_ids) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending values to the database."""
+        values, self._values = self._values, {}
+        self._sample_ids = set()
+
+        with _profile_stage(self.profiler, "write"):
+            for field, field_values in values.items():
+                self._dataset.set_values(field, field_values, key_field="id")
+
+def _provenance_field(output_field: str) -> str:
+    """Get the name of the field recording the provenance of an output field."""
+    return output_field + PROVENANCE_FIELD_SUFFIX
+
+def _records_provenance(
+    samples: fo.core.collections.SampleCollection,
+    output_field: str,
+    skip_existing: bool,
+) -> bool:
+    """Whether a run records the provenance of its results in an output field.
+    
+    Provenance is only needed to resume runs, so it is recorded by resumable runs,
+    and kept up to date on datasets that already record it, so that a later
+    resumed run never trusts the provenance of overwritten results. Other datasets
+    don't get a provenance field.
+    """
+    return skip_existing or samples.has_field(_provenance_field(output_field))
+
+def _pending_sample_ids(
+    samples: fo.core.collections.SampleCollection,
+    output_field: str,
+    model: Florence2,
+    prompt_field: Optional[str] = None,
+) -> Optional[set]:
+    """Find the samples for which a task still needs to run.
+    
+    A sample needs to run if its output field is missing, or if the provenance
+    recorded alongside its output (checkpoint, task and prompt) differs from what
+    ``model`` would record now. Outputs without any recorded provenance, e.g. from
+    older runs, are kept.
+    
+    Args:
+        samples: FiftyOne collection containing the images to process
+        output_field: Name of the field where results are stored
+        model: Florence2 model for the task
+        prompt_field: Optional name of the field holding per-sample prompts
+        
+    Returns:
+        set: IDs of the samples that need to run, or None if all samples do
+    """
+    if not samples.has_field(output_field):
+        return None
+
+    ids, has_output = samples.values(["id", F(output_field).exists()])
+
+    provenance_field = _provenance_field(output_field)
+    if samples.has_field(provenance_field):
+        stored = samples.values(provenance_field)
+    else:
+        stored = [None] * len(ids)
+
+    if prompt_field is not None:
+        expected = [model.provenance(prompt) for prompt in samples.values(prompt_field)]
+    else:
+        expected = [model.provenance()] * len(ids)
+
+    return {
+        sample_id
+        for sample_id, exists, current, target in zip(ids, has_output, stored, expected)
+        if not exists or (current is not None and current != target)
+    }
+
+def _export_mask(
+    label: Any,
+    model: Florence2,
+    output_field: str,
+    sample_id: str,
+) -> None:
+    """Move the mask of a Segmentation result to disk, if the model has a mask_dir.
+    
+    Masks are written to ``<mask_dir>/<output_field>/<sample_id>.png``, and the
+    label's ``mask`` is replaced by the ``mask_path`` of the file.
+    
+    Args:
+        label: The result of the model for the sample
+        model: Florence2 model that produced the result
+        output_field: Name of the field where the result is stored
+        sample_id: ID of the sample
+    """
+    mask_dir = model.params.get("mask_dir")
+    if mask_dir is None or not isinstance(label, Segmentation) or label.mask is None:
+        return
+
+    # FiftyOne resolves mask paths as given, so store absolute ones
+    mask_dir = os.path.abspath(os.path.expanduser(mask_dir))
+    outpath = os.path.join(mask_dir, output_field, sample_id + ".png")
+    label.export_mask(outpath, update=True)
+
+@contextlib.contextmanager
+def _attach_profiler(
+    tasks: List[Tuple[str, Florence2, Optional[str]]],
+    profiler: StageProfiler,
+):
+    """Attach a profiler to the models of tasks, restoring their own afterwards."""
+    previous = [model.profiler for _, model, _ in tasks]
+    for _, model, _ in tasks:
+        model.profiler = profiler
+
+    try:
+        yield
+    finally:
+        for (_, model, _), model_profiler in zip(tasks, previous):
+            model.profiler = model_profiler
+
+def _make_profiler(profile: Union[bool, StageProfiler]) -> Optional[StageProfiler]:
+    """Get the profiler of a run from its ``profile`` argument."""
+    if isinstance(profile, StageProfiler):
+        return profile
+
+    if not profile:
+        return None
+
+    # Attribute asynchronous GPU work to the stage that launched it
+    synchronize = torch.cuda.synchronize if torch.cuda.is_available() else None
+    return StageProfiler(synchronize=synchronize)
+
+def _profile_run(profiler: Optional[StageProfiler]):
+    """Get a context timing the enclosed block as the wall time of a profiler, if any."""
+    if profiler is None:
+        return contextlib.nullcontext()
+
+    return profiler.run()
+
+def _finish_profile(
+    samples: fo.core.collections.SampleCollection,
+    profiler: Optional[StageProfiler],
+    profile_key: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Log the summary of a profiled run and store it on the dataset if requested."""
+    if profiler is None:
+        return None
+
+    summary = profiler.summary()
+    logger.info("Florence-2 run profile:\n%s", format_summary(summary))
+
+    if profile_key is not None:
+        store_summary(samples._dataset, profile_key, summary)
+
+    return summary
+
+def _single_shard_progress(
+    progress: Optional[Callable[[List[int], List[int]], None]]
+) -> Optional[Callable[[int, int], None]]:
+    """Adapt a per-shard progress function to a run in the current process."""
+    if progress is None:
+        return None
+
+    return lambda completed, total: progress([completed], [total])
+
+def _declare_output_fields(
+    samples: fo.core.collections.SampleCollection,
+    tasks: Dict[str, Dict[str, Any]],
+    skip_existing: bool = False,
+) -> None:
+    """Add the output and provenance fields of tasks to the dataset's schema.
+    
+    Args:
+        samples: FiftyOne collection the tasks will run on
+        tasks: Dict mapping output field names to task specs
+        skip_existing: Whether the run is resumable. Provenance fields are only
+            added for resumable runs (see :func:`_records_provenance`)
+    """
+    dataset = samples._dataset
+
+    for output_field, spec in tasks.items():
+        operation = spec["operation"]
+        if operation == "caption" or (
+            operation == "ocr" and not spec.get("store_region_info", False)
+        ):
+            field_kwargs = dict(ftype=fo.StringField)
+        elif operation == "segmentation":
+            output_type = spec.get("output_type") or DEFAULT_SEGMENTATION_OUTPUT_TYPE
+            label_types = {
+                "polylines": Polylines,
+                "detections": Detections,
+                "segmentation": Segmentation,
+            }
+            field_kwargs = dict(
+                ftype=fo.EmbeddedDocumentField,
+                embedded_doc_type=label_types[output_type],
+            )
+        else:
+            field_kwargs = dict(
+                ftype=fo.EmbeddedDocumentField, embedded_doc_type=Detections
+            )
+
+        if not dataset.has_sample_field(output_field):
+            dataset.add_sample_field(output_field, **field_kwargs)
+
+        provenance_field = _provenance_field(output_field)
+        if skip_existing and not dataset.has_sample_field(provenance_field):
+            dataset.add_sample_field(provenance_field, fo.StringField)
+
+def _apply_tasks_batched(
+    samples: fo.core.collections.SampleCollection,
+    tasks: List[Tuple[str, Florence2, Optional[str]]],
+    batch_size: Optional[int] = None,
+    prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    skip_existing: bool = False,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    skip_failures: bool = True,
+    progress: Optional[Callable[[int, int], None]] = None,
+    profiler: Optional[StageProfiler] = None,
+    priority: Optional[str] = None,
+) -> None:
+    """Apply one or more Florence2 tasks to a collection in batches.
+    
+    Images are decoded straight from each sample's filepath by a background thread
+    pool (see :meth:`Florence2.load_image`) while the current batch runs, so the
+    full-resolution numpy copies made by ``apply_model`` are avoided entirely.
+    
+    Each batch is decoded once and run through the vision encoder once; the resulting
+    image features are shared by every task, so only the text encoder/decoder runs
+    once per task. All tasks must therefore use models loaded from the same checkpoint.
+    
+    For tasks with a ``prompt_field``, each batch is made of (image, prompt) pairs and
+    the prompts are passed to :meth:`Florence2.predict_all` directly, so the models
+    themselves are never mutated and can safely be shared.
+    
+    With ``skip_existing=True``, or if the dataset already has the field, the task's
+    provenance is stored along with each result in a ``<output_field>_provenance``
+    field (see :func:`_records_provenance`). Results are accumulated in memory and
+    written to the database with bulk ``set_values()`` calls every
+    ``checkpoint_interval`` samples, and once more if the run fails. With
+    ``skip_existing=True`` an interrupted run can therefore be restarted and only
+    redoes the samples that were not written yet.
+    
+    Args:
+        samples: FiftyOne collection containing the images to process
+        tasks: List of ``(output_field, model, prompt_field)`` tuples, where
+            ``prompt_field`` is the optional name of the string field holding each
+            sample's caption/expression
+        batch_size: Number of samples per generate call. If None, FiftyOne's default
+            batch size is used
+        prefetch_workers: Number of background threads decoding images
+        prefetch_depth: Number of batches to decode ahead of the one being processed
+        skip_existing: Whether to only process samples whose output is missing or whose
+            provenance differs from the current task (see :func:`_pending_sample_ids`)
+        checkpoint_interval: Number of samples whose results are accumulated in memory
+            and written to the database at a time
+        skip_failures: Whether to log and skip batches that fail rather than raising
+        progress: Optional function called with the number of processed and total
+            samples after each batch
+        profiler: Optional profiler recording the time of each stage of the run,
+            including image loading ("load") and database writes ("write"), and the
+            generated tokens. It is attached to the models for the duration of the run
+        priority: Optional priority class of the run, one of
+            :data:`scheduler.PRIORITIES`. Each batch waits for its turn in the
+            process-wide :class:`scheduler.InferenceScheduler`, so interactive runs go
+            before bulk ones and concurrent bulk runs share the model fairly. If None,
+            runs on collections of at most :data:`scheduler.INTERACTIVE_MAX_SAMPLES`
+            samples are interactive, counting the samples skipped by
+            ``skip_existing``
+    """
+    if batch_size is None:
+        batch_size = fo.config.default_batch_size or 1
+
+    # Resolved from the requested collection rather than the samples left after
+    # skip_existing, so that a resumed bulk run isn't promoted to interactive
+    priority = resolve_priority(priority, len(samples))
+
+    # IDs of the samples each task still needs to run on (None means all)
+    pending = [None] * len(tasks)
+    records_provenance = [
+        _records_provenance(samples, output_field, skip_existing)
+        for output_field, _, _ in tasks
+    ]
+
+    if skip_existing:
+        pending = [
+            _pending_sample_ids(samples, output_field, model, prompt_field)
+            for output_field, model, prompt_field in tasks
+        ]
+
+        if None not in pending:
+            pending_ids = set().union(*pending)
+            logger.info(
+                "Skipping %d samples that already have results",
+                len(samples) - len(pending_ids),
+            )
+            samples = samples.select(list(pending_ids))
+
+    num_samples = len(samples)
+    if num_samples == 0:
+        return
+
+    # Any of the models can decode and encode images since they share weights
+    _, encoder, _ = tasks[0]
+
+    # Only load the fields needed for inference
+    prompt_fields = [prompt_field for _, _, prompt_field in tasks if prompt_field]
+    inference_samples = samples.select_fields(prompt_fields)
+
+    def _load_image(sample):
+        with _profile_stage(profiler, "load"):
+            return encoder.load_image(sample.filepath)
+
+    with contextlib.ExitStack() as context:
+        if profiler is not None:
+            context.enter_context(_attach_profiler(tasks, profiler))
+            context.enter_context(profiler.run())
+
+        # Batches take turns with those of the other runs of this process
+        job = context.enter_context(
+            get_scheduler().job(priority, name=", ".join(field for field, _, _ in tasks))
+        )
+
+        pb = context.enter_context(fou.ProgressBar(samples))
+        writer = context.enter_context(
+            _BulkWriter(samples, chunk_size=checkpoint_interval, profiler=profiler)
+        )
+
+        batches = prefetch_batches(
+            fou.iter_batches(inference_samples, batch_size),
+            _load_image,
+            num_workers=prefetch_workers,
+            queue_depth=prefetch_depth,
+            return_exceptions=True,
+        )
+
+        num_processed = 0
+        for sample_batch, images in batches:
+            try:
+                # Samples whose image can't be loaded are skipped like failing batches
+                loaded_samples = []
+                loaded_images = []
+                for sample, image in zip(sample_batch, images):
+                    if not isinstance(image, Exception):
+                        loaded_samples.append(sample)
+                        loaded_images.append(image)
+                    elif not skip_failures:
+                        raise image
+                    else:
+                        logger.warning("Sample: %s\nError: %s\n", sample.id, image)
+
+                images = loaded_images
+
+                # Tasks have nothing to run on if no image of the batch was loaded
+                image_features = None
+                if images:
+                    with job.turn():
+                        image_features = encoder.encode_images(images)
+
+                for (output_field, model, prompt_field), task_ids, record in zip(
+                    tasks, pending, records_provenance
+                ):
+                    # Only run the task on the samples of this batch that need it
+                    idxs = [
+                        idx for idx, sample in enumerate(loaded_samples)
+                        if task_ids is None or sample.id in task_ids
+                    ]
+                    if not idxs:
+                        continue
+
+                    task_samples = [loaded_samples[idx] for idx in idxs]
+
+                    prompts = None
+                    if prompt_field is not None:
+                        prompts = [sample[prompt_field] for sample in task_samples]
+
+                    # Images are only decoded by the daemon, so they can fail one
+                    # at a time there, like local loading failures
+                    predict_kwargs = {}
+                    if isinstance(model, DaemonModel):
+                        predict_kwargs["return_exceptions"] = True
+
+                    with job.turn():
+                        results = model.predict_all(
+                            [images[idx] for idx in idxs],
+                            prompts=prompts,
+                            image_features=(
+                                image_features[idxs] if image_features is not None else None
+                            ),
+                            **predict_kwargs
+                        )
+
+                    provenance_field = _provenance_field(output_field)
+                    for i, (sample, result) in enumerate(zip(task_samples, results)):
+                        if isinstance(result, Exception):
+                            if not skip_failures:
+                                raise result
+
+                            logger.warning("Sample: %s\nError: %s\n", sample.id, result)
+                            continue
+
+                        with _profile_stage(profiler, "write"):
+                            _export_mask(result, model, output_field, sample.id)
+
+                        writer.add(sample.id, output_field, result)
+                        if record:
+                            writer.add(
+                                sample.id,
+                                provenance_field,
+                                model.provenance(prompts[i] if prompts is not None else None),
+                            )
+
+            except Exception as e:
+                if not skip_failures:
+                    raise e
+
+                logger.warning(
+                    "Batch: %s - %s\nError: %s\n",
+                    sample_batch[0].id,
+                    sample_batch[-1].id,
+                    e,
+                )
+
+            pb.update(len(sample_batch))
+
+            if profiler is not None:
+                profiler.add_samples(len(sample_batch))
+
+            num_processed += len(sample_batch)
+            if progress is not None:
+                progress(num_processed, num_samples)
+
+def run_florence2_model(
+    dataset: fo.Dataset,
+    operation: str,
+    output_field: str,
+    model_path: str = DEFAULT_MODEL_PATH,
+    batch_size: Optional[int] = None,
+    prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    use_feature_cache: bool = False,
+    feature_cache_dir: Optional[str] = None,
+    skip_existing: bool = False,
+    skip_failures: bool = True,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    num_workers: int = 1,
+    progress: Optional[Callable[[List[int], List[int]], None]] = None,
+    profile: Union[bool, StageProfiler] = False,
+    profile_key: Optional[str] = None,
+    priority: Optional[str] = None,
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """Apply Florence2 operations to a FiftyOne dataset.
+    
+    This function processes a FiftyOne dataset using the Florence2 model, supporting
+    various vision tasks like captioning, detection, OCR, phrase grounding and segmentation.
+    
+    Args:
+        dataset: FiftyOne dataset containing images to process
+        operation: Type of operation to perform. Valid options are:
+            - "caption": Generate image captions
+            - "detection": Detect objects in images
+            - "ocr": Perform optical character recognition
+            - "phrase_grounding": Locate objects described by text
+            - "segmentation": Perform instance segmentation
+        output_field: Name of the field where results will be stored in the dataset.
+            With ``skip_existing=True``, the provenance of each result is stored in
+            ``<output_field>_provenance``
+        model_path: HuggingFace model identifier or local path to model weights.
+            Defaults to "microsoft/Florence-2-base-ft"
+        batch_size: Number of images to process per generate call. If None,
+            FiftyOne's default batch size is used
+        prefetch_workers: Number of background threads decoding images
+        prefetch_depth: Number of batches decoded ahead of the one being processed
+        use_feature_cache: Whether to cache vision encoder outputs on disk and reuse
+            them across runs on the same images, e.g. when trying new prompts
+        feature_cache_dir: Optional directory of the feature cache. Defaults to
+            ``FLORENCE2_FEATURE_CACHE_DIR`` or ``~/.cache/fiftyone_florence2/features``
+        skip_existing: Whether to only process samples whose output field is missing or
+            whose stored provenance (checkpoint, task, prompt) differs, e.g. to resume
+            an interrupted run
+        skip_failures: Whether to log and skip samples whose image fails to load and
+            batches that fail, rather than raising
+        checkpoint_interval: Number of samples whose results are accumulated in memory
+            and written to the database with bulk ``set_values()`` calls at a time.
+            An interrupted run loses at most this many results
+        num_workers: Number of processes to split the samples between. Each process
+            loads its own copy of the model and uses an equal share of the CPU cores,
+            which speeds up decoding on CPU-only machines
+        progress: Optional function called with the lists of processed and total
+            sample counts of each worker process (a single one if ``num_workers=1``)
+        profile: Whether to record the time spent in each stage of the run (image
+            loading, preprocessing, device transfer, vision encoder, prompt
+            embedding, generation, token decoding, post-processing, label conversion
+            and database writes) and the number of generated tokens per sample, or
+            a :class:`profiling.StageProfiler` to record them into. The summary is
+            logged at the end of the run
+        profile_key: Optional key under which to store the profile's summary in
+            ``dataset.info["florence2_profiles"]``. Implies ``profile=True``
+        priority: Optional priority class of the run, "interactive" or "bulk".
+            Interactive runs go before the bulk runs of the same process (or of the
+            inference daemon), which are preempted between batches, and concurrent
+            bulk runs share the model fairly. Runs in other processes, e.g.
+            delegated operations, are not scheduled against this one unless both
+            use ``backend="daemon"``; only the workers of bulk runs with
+            ``num_workers>1`` also lower their CPU priority. Defaults to
+            "interactive" for runs of at most 32 samples, e.g. on a selection in
+            the App, and "bulk" otherwise
+        **kwargs: Additional operation-specific parameters, including
+            ``generation_profile``, ``precision`` and ``backend``. With
+            ``backend="daemon"``, the images are sent to the local inference daemon
+            (see :mod:`daemon`), which batches them with those of other runs
+        
+    Returns:
+        dict: The :meth:`profiling.StageProfiler.summary` of the run if it was
+        profiled, otherwise None
+    """
+    if num_workers > 1:
+        # Run the operation as a single task so that it can be sharded
+        return run_florence2_tasks(
+            dataset,
+            {output_field: dict(operation=operation, **kwargs)},
             model_path=model_path,
-            **kwargs  # This passes store_region_info if present
+            batch_size=batch_size,
+            prefetch_workers=prefetch_workers,
+            prefetch_depth=prefetch_depth,
+            use_feature_cache=use_feature_cache,
+            feature_cache_dir=feature_cache_dir,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            checkpoint_interval=checkpoint_interval,
+            num_workers=num_workers,
+            progress=progress,
+            profile=profile,
+            profile_key=profile_key,
+            priority=priority,
+        )
+
+    feature_cache = get_feature_cache(feature_cache_dir) if use_feature_cache else None
+
+    model, prompt_field = _load_task(
+        operation, model_path=model_path, feature_cache=feature_cache, **kwargs
+    )
+
+    profiler = _make_profiler(profile or profile_key is not None)
+
+    # Apply model to the entire dataset in batches. Exiting the model's context
+    # closes its connection to the daemon, if any
+    with model:
+        _apply_tasks_batched(
+            dataset,
+            [(output_field, model, prompt_field)],
+            batch_size=batch_size,
+            prefetch_workers=prefetch_workers,
+            prefetch_depth=prefetch_depth,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            checkpoint_interval=checkpoint_interval,
+            progress=_single_shard_progress(progress),
+            profiler=profiler,
+            priority=priority,
+        )
+
+    return _finish_profile(dataset, profiler, profile_key)
+
+def run_florence2_tasks(
+    dataset: fo.Dataset,
+    tasks: Dict[str, Dict[str, Any]],
+    model_path: str = DEFAULT_MODEL_PATH,
+    batch_size: Optional[int] = None,
+    prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+    prefetch_depth: int = DEFAULT_PREFETCH_DEPTH,
+    use_feature_cache: bool = False,
+    feature_cache_dir: Optional[str] = None,
+    skip_existing: bool = False,
+    skip_failures: bool = True,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    generation_profile: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None,
+    num_workers: int = 1,
+    progress: Optional[Callable[[List[int], List[int]], None]] = None,
+    profile: Union[bool, StageProfiler] = False,
+    profile_key: Optional[str] = None,
+    priority: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Apply several Florence2 operations to a FiftyOne dataset in a single pass.
+    
+    The checkpoint is loaded once, each image is decoded once and the vision encoder
+    runs once per image. The image features are then reused for every requested task
+    prompt, with each result written to its own output field.
+    
+    Args:
+        dataset: FiftyOne dataset containing images to process
+        tasks: Dict mapping output field names to task specs. Each spec is a dict with
+            an ``"operation"`` key (see :func:`run_florence2_model`) plus that
+            operation's parameters
+        model_path: HuggingFace model identifier or local path to model weights.
+            Defaults to "microsoft/Florence-2-base-ft"
+        batch_size: Number of images to process per generate call. If None,
+            FiftyOne's default batch size is used
+        prefetch_workers: Number of background threads decoding images
+        prefetch_depth: Number of batches decoded ahead of the one being processed
+        use_feature_cache: Whether to cache vision encoder outputs on disk and reuse
+            them across runs on the same images
+        feature_cache_dir: Optional directory of the feature cache. Defaults to
+            ``FLORENCE2_FEATURE_CACHE_DIR`` or ``~/.cache/fiftyone_florence2/features``
+        skip_existing: Whether to only process samples whose output field is missing or
+            whose stored provenance (checkpoint, task, prompt) differs, e.g. to resume
+            an interrupted run
+        skip_failures: Whether to log and skip samples whose image fails to load and
+            batches that fail, rather than raising
+        checkpoint_interval: Number of samples whose results are accumulated in memory
+            and written to the database with bulk ``set_values()`` calls at a time.
+            An interrupted run loses at most this many results
+        generation_profile: Optional name of the :data:`GENERATION_PROFILES` entry used
+            by tasks whose spec does not set its own ``generation_profile``
+        precision: Optional precision mode of the model, one of :data:`PRECISIONS`.
+            All tasks share the vision encoder, so this applies to every task
+        backend: Optional execution backend, one of :data:`backends.BACKENDS`, or
+            ``"daemon"`` to send the images to the local inference daemon (see
+            :mod:`daemon`), which batches them with those of other runs. Applies to
+            every task
+        num_workers: Number of processes to split the samples between. Each process
+            loads its own copy of the model and uses an equal share of the CPU cores,
+            which speeds up decoding on CPU-only machines
+        progress: Optional function called with the lists of processed and total
+            sample counts of each worker process (a single one if ``num_workers=1``)
+        profile: Whether to record the time spent in each stage of the run (image
+            loading, preprocessing, device transfer, vision encoder, prompt
+            embedding, generation, token decoding, post-processing, label conversion
+            and database writes) and the number of generated tokens per sample, or
+            a :class:`profiling.StageProfiler` to record them into. The summary is
+            logged at the end of the run, and combines all worker processes
+        profile_key: Optional key under which to store the profile's summary in
+            ``dataset.info["florence2_profiles"]``. Implies ``profile=True``
+        priority: Optional priority class of the run, "interactive" or "bulk".
+            Interactive runs go before the bulk runs of the same process (or of the
+            inference daemon), which are preempted between batches, and concurrent
+            bulk runs share the model fairly. Runs in other processes, e.g.
+            delegated operations, are not scheduled against this one unless both
+            use ``backend="daemon"``; only the workers of bulk runs with
+            ``num_workers>1`` also lower their CPU priority. Defaults to
+            "interactive" for runs of at most 32 samples, e.g. on a selection in
+            the App, and "bulk" otherwise
+        
+    Returns:
+        dict: The :meth:`profiling.StageProfiler.summary` of the run if it was
+        profiled, otherwise None
+        
+    Raises:
+        ValueError: If no tasks are provided or a task spec has no operation
+        
+    Example::
+        
+        run_florence2_tasks(
+            dataset,
+            tasks={
+                "caption": {"operation": "caption", "detail_level": "detailed"},
+                "detections": {"operation": "detection"},
+                "ocr": {"operation": "ocr", "store_region_info": True},
+            },
+        )
+    """
+    if not tasks:
+        raise ValueError("At least one task must be provided")
+
+    for output_field, spec in tasks.items():
+        if "operation" not in spec:
+            raise ValueError(f"Task for output field '{output_field}' has no 'operation'")
+
+    if generation_profile is not None:
+        tasks = {
+            output_field: {"generation_profile": generation_profile, **spec}
+            for output_field, spec in tasks.items()
+        }
+
+    # Settings of the shared model override those of the individual tasks
+    shared_params = {
+        key: value
+        for key, value in (("precision", precision), ("backend", backend))
+        if value is not None
+    }
+    if shared_params:
+        tasks = {
+            output_field: {**spec, **shared_params}
+            for output_field, spec in tasks.items()
+        }
+
+    profiler = _make_profiler(profile or profile_key is not None)
+
+    if num_workers > 1:
+        # Workers write concurrently, so the schema must be complete beforehand
+        _declare_output_fields(dataset, tasks, skip_existing=skip_existing)
+
+        # The priority depends on the size of the whole run, not of each shard
+        priority = resolve_priority(priority, len(dataset))
+
+        with _profile_run(profiler):
+            worker_profiles = run_sharded(
+                dataset,
+                tasks,
+                num_workers,
+                progress=progress,
+                model_path=model_path,
+                batch_size=batch_size,
+                prefetch_workers=prefetch_workers,
+                prefetch_depth=prefetch_depth,
+                use_feature_cache=use_feature_cache,
+                feature_cache_dir=feature_cache_dir,
+                skip_existing=skip_existing,
+                skip_failures=skip_failures,
+                checkpoint_interval=checkpoint_interval,
+                profile=profiler is not None,
+                priority=priority,
+            )
+
+        # Stage times are summed over the workers, while the wall time is the parent's
+        if profiler is not None:
+            for worker_profile in worker_profiles:
+                profiler.merge(worker_profile)
+
+        return _finish_profile(dataset, profiler, profile_key)
+
+    feature_cache = get_feature_cache(feature_cache_dir) if use_feature_cache else None
+
+    # Exiting the models' contexts closes their connections to the daemon, if any
+    with contextlib.ExitStack() as context:
+        loaded_tasks = []
+        for output_field, spec in tasks.items():
+            params = dict(spec)
+            operation = params.pop("operation")
+
+            model, prompt_field = _load_task(
+                operation, model_path=model_path, feature_cache=feature_cache, **params
+            )
+            context.enter_context(model)
+            loaded_tasks.append((output_field, model, prompt_field))
+
+        _apply_tasks_batched(
+            dataset,
+            loaded_tasks,
+            batch_size=batch_size,
+            prefetch_workers=prefetch_workers,
+            prefetch_depth=prefetch_depth,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            checkpoint_interval=checkpoint_interval,
+            progress=_single_shard_progress(progress),
+            profiler=profiler,
+            priority=priority,
         )
-        # Apply model to entire dataset at once
-        dataset.apply_model(model, label_field=output_field)
+
+    return _finish_profile(dataset, profiler, profile_key)
+
+def export_florence2_onnx(
+    model_path: str = DEFAULT_MODEL_PATH,
+    export_dir: Optional[str] = None,
+    overwrite: bool = False,
+) -> str:
+    """Export a Florence-2 checkpoint to ONNX for use with ``backend="onnx"``.
+    
+    Exporting happens automatically the first time the ONNX backend is used, so this
+    is only needed to export ahead of time, e.g. when building a worker image.
+    
+    Args:
+        model_path: HuggingFace model identifier or local path to model weights.
+            Defaults to "microsoft/Florence-2-base-ft"
+        export_dir: Optional root directory of exports. Defaults to
+            ``FLORENCE2_ONNX_DIR`` or ``~/.cache/fiftyone_florence2/onnx``
+        overwrite: Whether to re-export a checkpoint that was already exported
         
-    # Handle caption and other operations
-    else:
-        # Generic case for other operations
-        model = Florence2(
-            operation=operation,
+    Returns:
+        str: The directory containing the exported graphs
+    """
+    if is_exported(model_path, export_dir) and not overwrite:
+        return get_export_dir(model_path, export_dir)
+
+    # Graphs are exported from float32 weights on the CPU, where they will run
+    model, processor = get_model_registry().get(model_path, "cpu", None)
+
+    return export_onnx(
+        model,
+        model_path,
+        export_dir=export_dir,
+        image_size=_processor_input_size(processor),
+        overwrite=overwrite,
+    )
+
+def warm_florence2(
+    model_path: str = DEFAULT_MODEL_PATH,
+    operations: Optional[List[str]] = None,
+    generation_profile: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None,
+    warmup_tokens: int = DEFAULT_WARMUP_TOKENS,
+) -> Dict[str, Any]:
+    """Load a checkpoint into this process and run each operation once on a dummy image.
+    
+    The checkpoint stays loaded in the process-wide model registry, and the dummy
+    runs trigger any lazy initialization (kernel selection, ONNX export and session
+    creation, autocast and cache setup), so that the next run in this process,
+    e.g. the next delegated job of a worker, doesn't pay for them. Runs only reuse
+    the warmed model if they use the same ``precision`` and ``backend``.
+    
+    Args:
+        model_path: HuggingFace model identifier or local path to model weights.
+            Defaults to "microsoft/Florence-2-base-ft"
+        operations: Operations to warm up. Defaults to all of
+            :data:`FLORENCE2_OPERATIONS`
+        generation_profile: Optional name of the :data:`GENERATION_PROFILES` entry
+            used by the dummy runs
+        precision: Optional precision mode, one of :data:`PRECISIONS`
+        backend: Optional execution backend, one of :data:`backends.BACKENDS`
+        warmup_tokens: Maximum number of tokens generated by each dummy run
+        
+    Returns:
+        dict: The ``model_path``, the ``device``, the ``load_seconds`` it took to
+        load the checkpoint (near zero if it was already loaded) and, per operation
+        in ``operations``, the ``warmup_seconds`` of its first dummy run and its
+        ``first_token_seconds``, the latency of a warm run generating a single token
+        
+    Raises:
+        ValueError: If an operation is invalid, or if ``backend`` is the daemon, which
+            is warmed by starting it with ``--warm <model_path>``
+        
+    Example::
+        
+        report = warm_florence2(operations=["caption", "detection"], precision="fp32")
+        print(report["load_seconds"], report["operations"]["caption"])
+    """
+    operations = list(operations or FLORENCE2_OPERATIONS)
+    invalid = [operation for operation in operations if operation not in FLORENCE2_OPERATIONS]
+    if invalid:
+        raise ValueError(f"Invalid operations: {invalid}. Must be among {list(FLORENCE2_OPERATIONS)}")
+
+    if backend == DAEMON_BACKEND:
+        raise ValueError(
+            "The daemon loads its own models; warm it up by starting it with "
+            "`python daemon.py --warm <model_path>`"
+        )
+
+    params = {
+        key: value
+        for key, value in (
+            ("generation_profile", generation_profile),
+            ("precision", precision),
+            ("backend", backend),
+        )
+        if value is not None
+    }
+
+    # The first model loads the checkpoint, the others reuse it from the registry
+    start = time.perf_counter()
+    models = {}
+    for operation in operations:
+        models[operation], _ = _load_task(
+            operation,
             model_path=model_path,
-            **kwargs
+            generation_kwargs={"max_new_tokens": warmup_tokens},
+            **WARMUP_PARAMS[operation],
+            **params
         )
-        dataset.apply_model(model, label_field=output_field)
\ No newline at end of file
+    load_seconds = time.perf_counter() - start
+
+    # A uniform image at the input resolution, so that no resizing is needed
+    first_model = models[operations[0]]
+    image = Image.new("RGB", first_model.input_size, (128, 128, 128))
+
+    results = {}
+    for operation, model in models.items():
+        start = time.perf_counter()
+        model.predict_all([image])
+        warmup_seconds = time.perf_counter() - start
+
+        # These models are private to this function, so their settings can change
+        model.params["generation_kwargs"] = {"max_new_tokens": 1}
+
+        start = time.perf_counter()
+        model.predict_all([image])
+        first_token_seconds = time.perf_counter() - start
+
+        results[operation] = {
+            "warmup_seconds": warmup_seconds,
+            "first_token_seconds": first_token_seconds,
+        }
+        logger.info(
+            "Warmed up %s in %.2fs; first token latency is now %.3fs",
+            operation,
+            warmup_seconds,
+            first_token_seconds,
+        )
+
+    return {
+        "model_path": model_path,
+        "device": str(first_model.device),
+        "load_seconds": load_seconds,
+        "operations": results,
+    }
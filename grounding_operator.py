@@ -5,9 +5,17 @@ import fiftyone as fo
 import fiftyone.operators as foo
 from fiftyone.operators import types
 
-from .florence2 import run_florence2_model
-
-from .utils import  _model_choice_inputs, _execution_mode, _handle_calling
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _inference_inputs,
+    _inference_params,
+    _execution_mode,
+    _handle_calling,
+    _string_field_choices,
+    _invalidate_resolve_cache,
+)
 
 def _caption_inputs(ctx, inputs):
     input_choices = ["caption_field", "caption"]
@@ -27,10 +35,8 @@ def _caption_inputs(ctx, inputs):
     input_type = ctx.params.get("caption_input", None)
 
     if input_type == "caption_field":
-        candidate_fields = list(
-            ctx.dataset.get_field_schema(ftype=fo.StringField).keys()
-        )
-        candidate_fields.remove("filepath")
+        # Cached per dataset, since wide schemas are slow to list on every form change
+        candidate_fields = _string_field_choices(ctx)
 
         field_radio_group = types.RadioGroup()
 
@@ -80,6 +86,9 @@ class CaptionToPhraseGroundingWithFlorence2(foo.Operator):
             description="Name of the field to store the grounding results"
         )
         
+        # Inference options (batch size, feature cache, resuming, decoding, precision, backend, worker processes, profiling, priority)
+        _inference_inputs(ctx, inputs)
+        
         # Execution mode (delegation option)
         _execution_mode(ctx, inputs)
         
@@ -91,6 +100,9 @@ class CaptionToPhraseGroundingWithFlorence2(foo.Operator):
         return ctx.params.get("delegate", False)
     
     def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import run_florence2_model
+
         view = ctx.target_view()
         # Parameters
         model_path = ctx.params.get("model_path", "microsoft/Florence-2-base-ft")
@@ -111,9 +123,12 @@ class CaptionToPhraseGroundingWithFlorence2(foo.Operator):
             operation="phrase_grounding",
             output_field=output_field,
             model_path=model_path,
+            **_inference_params(ctx),
             **kwargs
         )
         
+        # The run added fields and may have downloaded the checkpoint
+        _invalidate_resolve_cache(ctx)
         ctx.ops.reload_dataset()
         
     def __call__(
@@ -123,6 +138,16 @@ class CaptionToPhraseGroundingWithFlorence2(foo.Operator):
         caption=None,
         caption_field=None,
         output_field="florence2_grounding",
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_feature_cache=False,
+        skip_existing=False,
+        skip_failures=True,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        num_workers=1,
+        profile_key=None,
+        priority=None,
         delegate=False
     ):
         kwargs = {}
@@ -140,5 +165,16 @@ class CaptionToPhraseGroundingWithFlorence2(foo.Operator):
             output_field=output_field,
             delegate=delegate,
             model_path=model_path,
+            batch_size=batch_size,
+            use_feature_cache=use_feature_cache,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            num_workers=num_workers,
+            profile=profile_key is not None,
+            profile_key=profile_key,
+            priority=priority,
             **kwargs
         )
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
+import fiftyone as fo
+import fiftyone.operators as foo
+from fiftyone.operators import types
+
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _inference_inputs,
+    _inference_params,
+    _execution_mode,
+    _invalidate_resolve_cache,
+)
+
+def _caption_task_inputs(ctx, inputs):
+    detail_level_dropdown = types.RadioGroup()
+    detail_level_dropdown.add_choice("basic", label="Basic caption")
+    detail_level_dropdown.add_choice("detailed", label="Detailed caption")
+    detail_level_dropdown.add_choice("more_detailed", label="More detailed caption")
+
+    inputs.enum(
+        "detail_level",
+        values=detail_level_dropdown.values(),
+        default="basic",
+        view=detail_level_dropdown,
+        label="Caption Detail Level",
+        description="Choose the level of detail for the caption"
+    )
+
+    inputs.str(
+        "caption_output_field",
+        default="florence2_caption",
+        required=True,
+        label="Caption Output Field",
+        description="Name of the field to store the caption"
+    )
+
+def _detection_task_inputs(ctx, inputs):
+    detection_task_choices = [
+        "detection",
+        "dense_region_caption",
+        "region_proposal",
+    ]
+
+    radio_group = types.RadioGroup()
+    for choice in detection_task_choices:
+        radio_group.add_choice(choice, label=choice)
+
+    inputs.enum(
+        "detection_type",
+        radio_group.values(),
+        default="detection",
+        label="Detection type",
+        description="The type of detection to perform",
+        view=types.DropdownView(),
+    )
+
+    inputs.str(
+        "detection_output_field",
+        default="florence2_detections",
+        required=True,
+        label="Detection Output Field",
+        description="Name of the field to store the detection results"
+    )
+
+def _ocr_task_inputs(ctx, inputs):
+    inputs.bool(
+        "store_region_info",
+        default=False,
+        label="Include Region Information",
+        description="Include bounding box information for detected text",
+        view=types.CheckboxView(),
+    )
+
+    inputs.str(
+        "ocr_output_field",
+        default="florence2_ocr",
+        required=True,
+        label="OCR Output Field",
+        description="Name of the field to store the OCR results"
+    )
+
+def _task_choice_inputs(ctx, inputs):
+    task_inputs = [
+        ("run_caption", "Caption", _caption_task_inputs),
+        ("run_detection", "Detection", _detection_task_inputs),
+        ("run_ocr", "OCR", _ocr_task_inputs),
+    ]
+
+    for param, label, add_inputs in task_inputs:
+        inputs.bool(
+            param,
+            default=True,
+            label=label,
+            description=f"Run {label} on the images",
+            view=types.CheckboxView(),
+        )
+
+        if ctx.params.get(param, True):
+            add_inputs(ctx, inputs)
+
+def _get_tasks(ctx):
+    """Build the run_florence2_tasks() task specs from the operator's form."""
+    tasks = {}
+
+    if ctx.params.get("run_caption", True):
+        output_field = ctx.params.get("caption_output_field", "florence2_caption")
+        tasks[output_field] = {
+            "operation": "caption",
+            "detail_level": ctx.params.get("detail_level", "basic"),
+        }
+
+    if ctx.params.get("run_detection", True):
+        output_field = ctx.params.get("detection_output_field", "florence2_detections")
+        tasks[output_field] = {
+            "operation": "detection",
+            "detection_type": ctx.params.get("detection_type", "detection"),
+        }
+
+    if ctx.params.get("run_ocr", True):
+        output_field = ctx.params.get("ocr_output_field", "florence2_ocr")
+        tasks[output_field] = {
+            "operation": "ocr",
+            "store_region_info": ctx.params.get("store_region_info", False),
+        }
+
+    return tasks
+
+class RunFlorence2Tasks(foo.Operator):
+    @property
+    def config(self):
+        return foo.OperatorConfig(
+            name="run_florence2_tasks",
+            label="Run multiple tasks with Florence-2",
+            description="Caption, detect objects and perform OCR in a single pass using Florence-2",
+            icon="/assets/santa-maria-del-fiore-svgrepo-com.svg",
+            dynamic=True,
+        )
+
+    def resolve_input(self, ctx):
+        inputs = types.Object()
+
+        # Model choice inputs
+        _model_choice_inputs(ctx, inputs)
+
+        # Task choices and their output fields
+        _task_choice_inputs(ctx, inputs)
+
+        if not _get_tasks(ctx):
+            inputs.view(
+                "no_tasks_warning",
+                types.Warning(
+                    label="No tasks selected",
+                    description="Select at least one task to run",
+                ),
+            )
+
+        # Inference options (batch size, feature cache, resuming, decoding, precision, backend, worker processes, profiling, priority)
+        _inference_inputs(ctx, inputs)
+
+        # Execution mode (delegation option)
+        _execution_mode(ctx, inputs)
+
+        inputs.view_target(ctx)
+
+        return types.Property(inputs)
+
+    def resolve_delegation(self, ctx):
+        return ctx.params.get("delegate", False)
+
+    def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import run_florence2_tasks
+
+        view = ctx.target_view()
+        # Parameters
+        model_path = ctx.params.get("model_path", "microsoft/Florence-2-base-ft")
+
+        # Tasks are passed directly when called via the SDK
+        tasks = ctx.params.get("tasks") or _get_tasks(ctx)
+
+        # Execute model
+        run_florence2_tasks(
+            dataset=view,
+            tasks=tasks,
+            model_path=model_path,
+            **_inference_params(ctx),
+        )
+
+        # The run added fields and may have downloaded the checkpoint
+        _invalidate_resolve_cache(ctx)
+        ctx.ops.reload_dataset()
+
+    def __call__(
+        self,
+        sample_collection,
+        tasks,
+        model_path="microsoft/Florence-2-base-ft",
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_feature_cache=False,
+        skip_existing=False,
+        skip_failures=True,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        num_workers=1,
+        profile_key=None,
+        priority=None,
+        delegate=False
+    ):
+        ctx = dict(dataset=sample_collection)
+
+        params = dict(
+            tasks=tasks,
+            model_path=model_path,
+            batch_size=batch_size,
+            use_feature_cache=use_feature_cache,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            num_workers=num_workers,
+            profile=profile_key is not None,
+            profile_key=profile_key,
+            priority=priority,
+            delegate=delegate,
+        )
+        return foo.execute_operator(self.uri, ctx, params=params)
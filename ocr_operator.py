@@ -5,9 +5,16 @@ import fiftyone as fo
 import fiftyone.operators as foo
 from fiftyone.operators import types
 
-from .florence2 import run_florence2_model
-
-from .utils import  _model_choice_inputs, _execution_mode, _handle_calling
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _inference_inputs,
+    _inference_params,
+    _execution_mode,
+    _handle_calling,
+    _invalidate_resolve_cache,
+)
 
 class OCRWithFlorence2(foo.Operator):
     @property
@@ -45,6 +52,9 @@ class OCRWithFlorence2(foo.Operator):
             description="Name of the field to store the OCR results"
         )
         
+        # Inference options (batch size, feature cache, resuming, decoding, precision, backend, worker processes, profiling, priority)
+        _inference_inputs(ctx, inputs)
+        
         # Execution mode (delegation option)
         _execution_mode(ctx, inputs)
         
@@ -56,6 +66,9 @@ class OCRWithFlorence2(foo.Operator):
         return ctx.params.get("delegate", False)
     
     def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import run_florence2_model
+
         view = ctx.target_view()
         # Parameters
         model_path = ctx.params.get("model_path", "microsoft/Florence-2-base-ft")
@@ -68,9 +81,12 @@ class OCRWithFlorence2(foo.Operator):
             operation="ocr",
             output_field=output_field,
             model_path=model_path,
+            **_inference_params(ctx),
             store_region_info=store_region_info
         )
         
+        # The run added fields and may have downloaded the checkpoint
+        _invalidate_resolve_cache(ctx)
         ctx.ops.reload_dataset()
         
     def __call__(
@@ -79,6 +95,16 @@ class OCRWithFlorence2(foo.Operator):
         model_path="microsoft/Florence-2-base-ft",
         store_region_info=False,
         output_field="florence2_ocr",
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_feature_cache=False,
+        skip_existing=False,
+        skip_failures=True,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        num_workers=1,
+        profile_key=None,
+        priority=None,
         delegate=False
     ):
         return _handle_calling(
@@ -88,5 +114,16 @@ class OCRWithFlorence2(foo.Operator):
             output_field=output_field,
             delegate=delegate,
             model_path=model_path,
+            batch_size=batch_size,
+            use_feature_cache=use_feature_cache,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            num_workers=num_workers,
+            profile=profile_key is not None,
+            profile_key=profile_key,
+            priority=priority,
             store_region_info=store_region_info
         )
\ No newline at end of file
@@ -0,0 +1,221 @@
+import time
+import difflib
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import fiftyone as fo
+from fiftyone.core.labels import Detections, Segmentation
+
+from .florence2 import DEFAULT_MODEL_PATH, PROMPT_FIELD_PARAMS, _load_task
+
+logger = logging.getLogger(__name__)
+
+# IoU above which two labels with the same name are considered to match
+DEFAULT_IOU_THRESHOLD = 0.5
+
+
+def _label_boxes(labels) -> List[tuple]:
+    """Get ``(label, [x, y, w, h])`` pairs in relative coordinates for each label."""
+    # Operations return None when they find nothing, e.g. segmentation
+    if labels is None:
+        return []
+
+    if isinstance(labels, Detections):
+        return [(d.label, d.bounding_box) for d in labels.detections]
+
+    boxes = []
+    for polyline in labels.polylines:
+        points = np.array([p for shape in polyline.points for p in shape], dtype=float)
+        if points.size == 0:
+            continue
+
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        boxes.append((polyline.label, [x_min, y_min, x_max - x_min, y_max - y_min]))
+
+    return boxes
+
+
+def _box_iou(box1, box2) -> float:
+    """Compute the IoU of two ``[x, y, w, h]`` boxes."""
+    x1, y1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+    x2 = min(box1[0] + box1[2], box2[0] + box2[2])
+    y2 = min(box1[1] + box1[3], box2[1] + box2[3])
+
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = box1[2] * box1[3] + box2[2] * box2[3] - intersection
+
+    return intersection / union if union > 0 else 0.0
+
+
+def _mask_iou(reference, output) -> float:
+    """Compute the IoU of the foregrounds of two optional Segmentation labels."""
+    masks = [
+        label.get_mask() > 0 if label is not None else None
+        for label in (reference, output)
+    ]
+    if masks[0] is None or masks[1] is None:
+        return 1.0 if masks[0] is masks[1] else 0.0
+
+    if masks[0].shape != masks[1].shape:
+        return 0.0
+
+    union = np.logical_or(*masks).sum()
+    return float(np.logical_and(*masks).sum() / union) if union > 0 else 1.0
+
+
+def compare_outputs(reference, output, iou_threshold: float = DEFAULT_IOU_THRESHOLD) -> float:
+    """Score the agreement between two outputs of the same Florence-2 operation.
+
+    Text outputs are compared with :class:`difflib.SequenceMatcher`. Detections and
+    polylines are greedily matched by label and box IoU, and scored by the F1 of
+    the matches. Segmentation masks are scored by the IoU of their foregrounds.
+
+    Args:
+        reference: The reference output
+        output: The output to compare against the reference
+        iou_threshold: Minimum IoU for two labels to match
+
+    Returns:
+        float: A score between 0 (no agreement) and 1 (identical)
+    """
+    if isinstance(reference, str) or isinstance(output, str):
+        return difflib.SequenceMatcher(None, reference or "", output or "").ratio()
+
+    if isinstance(reference, Segmentation) or isinstance(output, Segmentation):
+        return _mask_iou(reference, output)
+
+    reference_boxes = _label_boxes(reference)
+    output_boxes = _label_boxes(output)
+    if not reference_boxes and not output_boxes:
+        return 1.0
+
+    unmatched = list(range(len(reference_boxes)))
+    num_matches = 0
+    for label, box in output_boxes:
+        best_idx, best_iou = None, iou_threshold
+        for idx in unmatched:
+            reference_label, reference_box = reference_boxes[idx]
+            iou = _box_iou(box, reference_box)
+            if reference_label == label and iou >= best_iou:
+                best_idx, best_iou = idx, iou
+
+        if best_idx is not None:
+            unmatched.remove(best_idx)
+            num_matches += 1
+
+    return 2.0 * num_matches / (len(reference_boxes) + len(output_boxes))
+
+
+def _run_precision(filepaths, prompts, operation, model_path, precision, batch_size, **kwargs):
+    """Predict a list of images with a given precision, returning outputs and runtime."""
+    model, _ = _load_task(operation, model_path=model_path, precision=precision, **kwargs)
+
+    # Closes the model's connection to the daemon, if any
+    with model:
+        # Warm up on the first batch, so that one-time costs such as CUDA context
+        # creation and kernel selection aren't counted as latency
+        if filepaths:
+            model.predict_all(
+                filepaths[:batch_size],
+                prompts=prompts[:batch_size] if prompts is not None else None,
+            )
+
+        outputs = []
+        start = time.perf_counter()
+        for start_idx in range(0, len(filepaths), batch_size):
+            end_idx = start_idx + batch_size
+            outputs.extend(
+                model.predict_all(
+                    filepaths[start_idx:end_idx],
+                    prompts=prompts[start_idx:end_idx] if prompts is not None else None,
+                )
+            )
+        runtime = time.perf_counter() - start
+
+    return outputs, runtime
+
+
+def check_precision_parity(
+    samples: fo.core.collections.SampleCollection,
+    operation: str,
+    precision: str,
+    reference_precision: Optional[str] = "fp32",
+    model_path: str = DEFAULT_MODEL_PATH,
+    num_samples: int = 16,
+    batch_size: int = 4,
+    seed: int = 51,
+    **kwargs
+) -> Dict[str, Any]:
+    """Measure the accuracy and speed cost of a precision mode against a reference.
+
+    A random subset of ``samples`` is predicted with both precisions, and the
+    outputs are compared with :func:`compare_outputs`. Nothing is written to the
+    dataset.
+
+    Args:
+        samples: FiftyOne collection to draw images from
+        operation: Type of operation to run, see :func:`florence2.run_florence2_model`
+        precision: The precision mode to evaluate, one of
+            :data:`florence2.PRECISIONS`
+        reference_precision: The precision mode to compare against. None uses the
+            default precision of the device
+        model_path: HuggingFace model identifier or local path to model weights
+        num_samples: Maximum number of samples to evaluate
+        batch_size: Number of images per generate call
+        seed: Random seed used to pick the samples
+        **kwargs: Additional operation-specific parameters
+
+    Returns:
+        dict: The ``exact_match`` rate, ``mean_similarity`` and ``min_similarity`` of
+        the outputs, the ``seconds_per_image`` of each precision, the ``speedup`` of
+        ``precision`` over the reference and the per-sample ``similarities``
+
+    Example::
+
+        report = check_precision_parity(
+            dataset, "caption", "int8-dynamic", detail_level="detailed"
+        )
+        print(report["mean_similarity"], report["speedup"])
+    """
+    if len(samples) > num_samples:
+        samples = samples.take(num_samples, seed=seed)
+
+    prompt_field = kwargs.get(PROMPT_FIELD_PARAMS.get(operation))
+
+    filepaths = samples.values("filepath")
+    prompts = samples.values(prompt_field) if prompt_field is not None else None
+
+    results = {}
+    for p in (reference_precision, precision):
+        logger.info("Running %s with precision %s", operation, p or "default")
+        results[p] = _run_precision(
+            filepaths, prompts, operation, model_path, p, batch_size, **kwargs
+        )
+
+    reference_outputs, reference_time = results[reference_precision]
+    outputs, runtime = results[precision]
+
+    similarities = [
+        compare_outputs(reference, output)
+        for reference, output in zip(reference_outputs, outputs)
+    ]
+
+    num_images = max(1, len(filepaths))
+    return {
+        "operation": operation,
+        "precision": precision,
+        "reference_precision": reference_precision,
+        "num_samples": len(filepaths),
+        "exact_match": float(np.mean([s == 1.0 for s in similarities])) if similarities else None,
+        "mean_similarity": float(np.mean(similarities)) if similarities else None,
+        "min_similarity": float(np.min(similarities)) if similarities else None,
+        "seconds_per_image": {
+            str(reference_precision): reference_time / num_images,
+            precision: runtime / num_images,
+        },
+        "speedup": reference_time / runtime if runtime > 0 else None,
+        "similarities": similarities,
+    }
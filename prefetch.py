@@ -0,0 +1,77 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+
+# Defaults for background image loading
+DEFAULT_PREFETCH_WORKERS = 4
+DEFAULT_PREFETCH_DEPTH = 2
+
+
+def prefetch_batches(
+    batches: Iterable[Sequence[Any]],
+    load_fn: Callable[[Any], Any],
+    num_workers: int = DEFAULT_PREFETCH_WORKERS,
+    queue_depth: int = DEFAULT_PREFETCH_DEPTH,
+    return_exceptions: bool = False,
+) -> Iterator[Tuple[Sequence[Any], List[Any]]]:
+    """Load upcoming batches in a thread pool while the caller processes the current one.
+
+    Items are loaded by ``load_fn`` in background threads, so disk reads and image
+    decoding overlap with model inference on the calling thread. At most
+    ``queue_depth`` batches are loaded ahead of the batch being processed, which
+    bounds the memory used by prefetched data.
+
+    The ``batches`` iterable itself is only consumed from the calling thread, so it
+    can safely be a database cursor.
+
+    Args:
+        batches: Iterable of batches (sequences) of items to load
+        load_fn: Function that loads a single item, e.g. decodes an image from a sample
+        num_workers: Number of background threads used to load items
+        queue_depth: Number of batches to load ahead of the current one
+        return_exceptions: Whether to yield the exception raised by ``load_fn`` in
+            place of an item's result, so that the caller can handle failures per
+            item, rather than raising it
+
+    Yields:
+        tuple: ``(batch, loaded)`` pairs, where ``loaded`` contains ``load_fn(item)``
+        for each item in ``batch``, in order
+
+    Raises:
+        Exception: Unless ``return_exceptions`` is True, any exception raised by
+            ``load_fn`` is re-raised when the batch containing the failing item is
+            reached
+    """
+    batches = iter(batches)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, num_workers))
+
+    def _submit_next():
+        batch = next(batches, None)
+        if batch is None:
+            return False
+
+        pending.append((batch, [executor.submit(load_fn, item) for item in batch]))
+        return True
+
+    try:
+        while True:
+            # Keep the current batch plus `queue_depth` lookahead batches in flight
+            while len(pending) <= max(0, queue_depth) and _submit_next():
+                pass
+
+            if not pending:
+                break
+
+            batch, futures = pending.popleft()
+
+            if return_exceptions:
+                loaded = [
+                    future.exception() or future.result() for future in futures
+                ]
+            else:
+                loaded = [future.result() for future in futures]
+
+            yield batch, loaded
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,238 @@
+import time
+import threading
+import contextlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Key of the dataset's info under which run profiles are stored
+PROFILES_INFO_KEY = "florence2_profiles"
+
+
+class StageProfiler(object):
+    """Records where the time of Florence-2 runs goes.
+
+    Code wraps each stage of its work in :meth:`stage`, which accumulates the
+    wall-clock duration and number of calls per stage name. The number of tokens
+    generated for each sample is recorded with :meth:`add_generated_tokens`, along
+    with the duration of the ``generate`` call that produced them.
+
+    Stages can be recorded from several threads, e.g. by the image prefetching
+    threads, so their durations may add up to more than the wall-clock time of a
+    run.
+
+    Profilers of different processes can be combined by serializing them with
+    :meth:`to_dict` and merging them with :meth:`merge`.
+
+    Args:
+        synchronize (callable, optional): Function called before each stage ends,
+            e.g. ``torch.cuda.synchronize``, so that asynchronous device work is
+            attributed to the stage that launched it
+
+    Example::
+
+        profiler = StageProfiler()
+        model.profiler = profiler
+        model.predict_all(images)
+        print(profiler.summary())
+    """
+
+    def __init__(self, synchronize: Optional[Callable[[], None]] = None):
+        self.synchronize = synchronize
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.tokens_per_sample = []
+        self.tokens_per_second = []
+        self.num_samples = 0
+        self.wall_time = 0.0
+        self._last = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as part of a stage.
+
+        Args:
+            name: Name of the stage, e.g. "generate"
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.synchronize is not None:
+                self.synchronize()
+
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.totals[name] += duration
+                self.calls[name] += 1
+                self._last[name] = duration
+
+    def last_duration(self, name: str) -> Optional[float]:
+        """Get the duration of the most recent block of a stage, if any."""
+        return self._last.get(name)
+
+    def add_generated_tokens(self, token_counts: List[int], seconds: Optional[float]) -> None:
+        """Record the number of tokens generated for each sample of a batch.
+
+        Args:
+            token_counts: Number of generated tokens of each sample
+            seconds: Duration of the ``generate`` call. Samples of a batch are decoded
+                together, so each sample's tokens/sec is its count over this duration
+        """
+        with self._lock:
+            self.tokens_per_sample.extend(int(count) for count in token_counts)
+            if seconds:
+                self.tokens_per_second.extend(count / seconds for count in token_counts)
+
+    def add_samples(self, num_samples: int) -> None:
+        """Record that a number of samples were processed."""
+        with self._lock:
+            self.num_samples += num_samples
+
+    @contextlib.contextmanager
+    def run(self):
+        """Time the enclosed block as the wall-clock time of the run."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_time += time.perf_counter() - start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the raw measurements, e.g. to send them to another process."""
+        return {
+            "totals": dict(self.totals),
+            "calls": dict(self.calls),
+            "tokens_per_sample": list(self.tokens_per_sample),
+            "tokens_per_second": list(self.tokens_per_second),
+            "num_samples": self.num_samples,
+            "wall_time": self.wall_time,
+        }
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """Add the measurements of another profiler, serialized with :meth:`to_dict`.
+
+        The profilers are assumed to have run concurrently, e.g. in different worker
+        processes, so the wall-clock time is the longest of the two.
+
+        Args:
+            other: The serialized measurements
+        """
+        with self._lock:
+            for name, total in other["totals"].items():
+                self.totals[name] += total
+            for name, calls in other["calls"].items():
+                self.calls[name] += calls
+
+            self.tokens_per_sample.extend(other["tokens_per_sample"])
+            self.tokens_per_second.extend(other["tokens_per_second"])
+            self.num_samples += other["num_samples"]
+            self.wall_time = max(self.wall_time, other["wall_time"])
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregate the measurements.
+
+        Returns:
+            dict: The ``num_samples``, ``wall_time`` and ``samples_per_second`` of the
+            run, the ``total``, ``calls``, ``mean`` and ``share`` of the summed stage
+            time of each stage in ``stages``, and the ``generated_tokens``,
+            ``tokens_per_sample`` and ``tokens_per_second`` of the generated outputs.
+            Token statistics are dicts with the ``mean``, ``p50`` and ``p95`` over
+            samples, and the overall ``tokens_per_second`` also has the ``total``
+            rate of the run's ``generate`` calls
+        """
+        stage_time = sum(self.totals.values())
+        stages = {
+            name: {
+                "total": total,
+                "calls": self.calls[name],
+                "mean": total / self.calls[name] if self.calls[name] else 0.0,
+                "share": total / stage_time if stage_time > 0 else 0.0,
+            }
+            for name, total in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+        generated_tokens = int(sum(self.tokens_per_sample))
+        generate_time = self.totals.get("generate", 0.0)
+
+        tokens_per_second = _distribution(self.tokens_per_second)
+        if tokens_per_second is not None:
+            tokens_per_second["total"] = (
+                generated_tokens / generate_time if generate_time > 0 else None
+            )
+
+        return {
+            "num_samples": self.num_samples,
+            "wall_time": self.wall_time,
+            "samples_per_second": (
+                self.num_samples / self.wall_time if self.wall_time > 0 else None
+            ),
+            "stages": stages,
+            "generated_tokens": generated_tokens,
+            "tokens_per_sample": _distribution(self.tokens_per_sample),
+            "tokens_per_second": tokens_per_second,
+        }
+
+
+def _distribution(values: List[float]) -> Optional[Dict[str, float]]:
+    """Get the mean, median and 95th percentile of some values, if any."""
+    if not values:
+        return None
+
+    return {
+        "mean": float(np.mean(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Format a :meth:`StageProfiler.summary` as a human-readable table.
+
+    Args:
+        summary: The summary to format
+
+    Returns:
+        str: The formatted summary
+    """
+    lines = [
+        f"{summary['num_samples']} samples in {summary['wall_time']:.2f}s "
+        f"({summary['samples_per_second'] or 0:.2f} samples/s)",
+        f"{'stage':<16}{'total s':>10}{'calls':>8}{'mean ms':>10}{'share':>8}",
+    ]
+    for name, stats in summary["stages"].items():
+        lines.append(
+            f"{name:<16}{stats['total']:>10.3f}{stats['calls']:>8}"
+            f"{1000 * stats['mean']:>10.2f}{100 * stats['share']:>7.1f}%"
+        )
+
+    if summary["tokens_per_sample"] is not None:
+        tokens = summary["tokens_per_sample"]
+        rate = summary["tokens_per_second"]
+        lines.append(
+            f"{summary['generated_tokens']} tokens generated, "
+            f"{tokens['mean']:.1f} per sample (p95 {tokens['p95']:.0f}), "
+            f"{rate['p50']:.1f} tokens/s per sample, {rate['total'] or 0:.1f} tokens/s overall"
+        )
+
+    return "\n".join(lines)
+
+
+def store_summary(dataset, key: str, summary: Dict[str, Any]) -> None:
+    """Store a run's profile in the dataset's info.
+
+    Profiles are stored in ``dataset.info["florence2_profiles"][key]``, with the
+    time at which they were stored.
+
+    Args:
+        dataset: The FiftyOne dataset the run processed
+        key: Key under which to store the profile, e.g. the output field
+        summary: The :meth:`StageProfiler.summary` of the run
+    """
+    profiles = dict(dataset.info.get(PROFILES_INFO_KEY) or {})
+    profiles[key] = dict(summary, stored_at=time.time())
+
+    dataset.info[PROFILES_INFO_KEY] = profiles
+    dataset.save()
@@ -0,0 +1,277 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Registry limits, overridable via environment variables or configure_registry()
+DEFAULT_MAX_MODELS = int(os.environ.get("FLORENCE2_REGISTRY_MAX_MODELS", 2))
+DEFAULT_MAX_MEMORY_GB = os.environ.get("FLORENCE2_REGISTRY_MAX_MEMORY_GB")
+
+# Precision modes that change the loaded weights, rather than only how they run
+QUANTIZED_PRECISIONS = ("int8-dynamic",)
+
+
+def _model_memory_bytes(model) -> int:
+    """Estimate the memory held by a model's parameters and buffers.
+
+    Args:
+        model: A PyTorch module
+
+    Returns:
+        int: The number of bytes used by the model's tensors
+    """
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _quantize_language_model(model):
+    """Apply dynamic int8 quantization to the Linear layers of the language model.
+
+    Weights are stored as int8 and activations are quantized on the fly, which
+    shrinks the text encoder/decoder and speeds up decoding on CPU. The vision
+    tower is left in full precision.
+
+    Args:
+        model: A Florence-2 model on the CPU
+    """
+    model.language_model = torch.quantization.quantize_dynamic(
+        model.language_model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _load_model_and_processor(model_path, device, torch_dtype, precision=None):
+    """Load a Florence-2 checkpoint and its processor from disk or the Hub.
+
+    Args:
+        model_path: Model path or HuggingFace repo name
+        device: Device to load the model onto
+        torch_dtype: Optional dtype for the model weights
+        precision: Optional precision mode. ``"int8-dynamic"`` quantizes the
+            language model after loading
+
+    Returns:
+        tuple: The (model, processor) pair
+
+    Raises:
+        ValueError: If a quantized precision is requested on a non-CPU device
+    """
+    if precision in QUANTIZED_PRECISIONS and str(device) != "cpu":
+        raise ValueError(
+            f"Precision '{precision}' is only supported on CPU, not '{device}'"
+        )
+
+    # transformers takes seconds to import, so only import it once a model is loaded
+    from transformers import AutoModelForCausalLM, AutoProcessor
+
+    model_kwargs = {"trust_remote_code": True, "device_map": device}
+    if torch_dtype:
+        model_kwargs["torch_dtype"] = torch_dtype
+
+    model = AutoModelForCausalLM.from_pretrained(model_path, **model_kwargs)
+
+    if precision == "int8-dynamic":
+        _quantize_language_model(model)
+
+    processor = AutoProcessor.from_pretrained(
+        model_path,
+        trust_remote_code=True
+    )
+
+    return model, processor
+
+
+class ModelRegistry(object):
+    """A process-wide cache of loaded Florence-2 (model, processor) pairs.
+
+    Entries are keyed by ``(model_path, dtype, device, precision)`` and evicted in least
+    recently used order whenever the registry holds more than ``max_models``
+    checkpoints or more than ``max_memory_bytes`` of weights. The most
+    recently requested checkpoint is never evicted, even if it alone exceeds
+    the memory cap.
+
+    Args:
+        max_models (int, optional): Maximum number of checkpoints to keep loaded
+        max_memory_bytes (int, optional): Maximum total size of the loaded weights.
+            If None, only ``max_models`` is enforced
+    """
+
+    def __init__(
+        self,
+        max_models: Optional[int] = DEFAULT_MAX_MODELS,
+        max_memory_bytes: Optional[int] = None,
+    ):
+        self.max_models = max_models
+        self.max_memory_bytes = max_memory_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _make_key(model_path, device, torch_dtype, precision) -> Tuple[str, str, str, str]:
+        # Only precisions that change the weights need their own entry
+        if precision not in QUANTIZED_PRECISIONS:
+            precision = None
+
+        return (model_path, str(torch_dtype), str(device), str(precision))
+
+    def get(
+        self,
+        model_path: str,
+        device: str,
+        torch_dtype=None,
+        precision: Optional[str] = None,
+    ) -> Tuple[Any, Any]:
+        """Get the (model, processor) pair for a checkpoint, loading it if needed.
+
+        Args:
+            model_path: Model path or HuggingFace repo name
+            device: Device the model should live on
+            torch_dtype: Optional dtype for the model weights
+            precision: Optional precision mode, e.g. ``"int8-dynamic"``
+
+        Returns:
+            tuple: The (model, processor) pair
+        """
+        key = self._make_key(model_path, device, torch_dtype, precision)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Mark as most recently used
+                self._entries.move_to_end(key)
+                return entry["model"], entry["processor"]
+
+            model, processor = _load_model_and_processor(
+                model_path, device, torch_dtype, precision=precision
+            )
+            self._entries[key] = {
+                "model": model,
+                "processor": processor,
+                "memory_bytes": _model_memory_bytes(model),
+            }
+            self._enforce_limits()
+
+            return model, processor
+
+    def _enforce_limits(self):
+        # Evict least recently used entries, always keeping the newest one
+        while len(self._entries) > 1 and self._over_limits():
+            key, _ = self._entries.popitem(last=False)
+            logger.info("Evicting Florence-2 checkpoint %s from registry", key)
+
+        if self._over_limits():
+            logger.warning(
+                "Florence-2 checkpoint exceeds the registry memory cap of "
+                "%d bytes; keeping it loaded anyway",
+                self.max_memory_bytes,
+            )
+
+        self._release_memory()
+
+    def _over_limits(self) -> bool:
+        if self.max_models is not None and len(self._entries) > self.max_models:
+            return True
+
+        if self.max_memory_bytes is not None:
+            return self.memory_bytes > self.max_memory_bytes
+
+        return False
+
+    @staticmethod
+    def _release_memory():
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @property
+    def memory_bytes(self) -> int:
+        """The total size of the weights currently held by the registry."""
+        return sum(e["memory_bytes"] for e in self._entries.values())
+
+    def evict(self, model_path: Optional[str] = None) -> int:
+        """Evict loaded checkpoints from the registry.
+
+        Args:
+            model_path: Only evict entries for this checkpoint. If None, all
+                entries are evicted
+
+        Returns:
+            int: The number of entries that were evicted
+        """
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if model_path is None or key[0] == model_path
+            ]
+            for key in keys:
+                del self._entries[key]
+
+            self._release_memory()
+
+            return len(keys)
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Describe the loaded checkpoints, least recently used first.
+
+        Returns:
+            list: A dict with the ``model_path``, ``dtype``, ``device``,
+            ``precision`` and ``memory_bytes`` of each loaded checkpoint
+        """
+        with self._lock:
+            return [
+                {
+                    "model_path": key[0],
+                    "dtype": key[1],
+                    "device": key[2],
+                    "precision": key[3],
+                    "memory_bytes": entry["memory_bytes"],
+                }
+                for key, entry in self._entries.items()
+            ]
+
+
+_REGISTRY = ModelRegistry(
+    max_models=DEFAULT_MAX_MODELS,
+    max_memory_bytes=(
+        int(float(DEFAULT_MAX_MEMORY_GB) * 1024 ** 3)
+        if DEFAULT_MAX_MEMORY_GB
+        else None
+    ),
+)
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide Florence-2 model registry."""
+    return _REGISTRY
+
+
+def configure_registry(
+    max_models: Optional[int] = None,
+    max_memory_gb: Optional[float] = None,
+) -> None:
+    """Update the limits of the process-wide model registry.
+
+    Args:
+        max_models: Maximum number of checkpoints to keep loaded
+        max_memory_gb: Maximum total size of the loaded weights, in GB
+    """
+    with _REGISTRY._lock:
+        if max_models is not None:
+            _REGISTRY.max_models = max_models
+
+        if max_memory_gb is not None:
+            _REGISTRY.max_memory_bytes = int(max_memory_gb * 1024 ** 3)
+
+        _REGISTRY._enforce_limits()
+
+
+def clear_registry() -> int:
+    """Unload every checkpoint held by the process-wide model registry.
+
+    Returns:
+        int: The number of entries that were evicted
+    """
+    return _REGISTRY.evict()
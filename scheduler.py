@@ -0,0 +1,232 @@
+import time
+import logging
+import threading
+import contextlib
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority classes of inference jobs, highest first
+PRIORITIES = ("interactive", "bulk")
+
+# Runs of at most this many samples default to the interactive class, e.g. running
+# an operator on a few samples selected in the App
+INTERACTIVE_MAX_SAMPLES = 32
+
+# Seconds an interactive batch should wait at most for its turn. Longer waits are
+# logged, since they mean bulk batches are too long to be preempted in time
+DEFAULT_LATENCY_TARGET = 2.0
+
+
+def resolve_priority(priority: Optional[str], num_samples: int) -> str:
+    """Get the priority class of a job.
+
+    Args:
+        priority: The requested priority, one of :data:`PRIORITIES`, or None or
+            "auto" to choose based on the size of the job
+        num_samples: Number of samples the job processes
+
+    Returns:
+        str: The priority class
+
+    Raises:
+        ValueError: If the priority is invalid
+    """
+    if priority in (None, "auto"):
+        return "interactive" if num_samples <= INTERACTIVE_MAX_SAMPLES else "bulk"
+
+    if priority not in PRIORITIES:
+        raise ValueError(f"Invalid priority: {priority}. Must be one of {list(PRIORITIES)} or 'auto'")
+
+    return priority
+
+
+class _Job(object):
+    """A job registered with an :class:`InferenceScheduler`."""
+
+    def __init__(self, scheduler, priority, name, service_time):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.name = name
+        self.service_time = service_time
+        self.started = False
+        self.num_turns = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self._warned = False
+
+    @contextlib.contextmanager
+    def turn(self):
+        """Wait for the job's turn, and hold it for the enclosed batch."""
+        waited = self.scheduler._acquire(self)
+        self.num_turns += 1
+        self.wait_time += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        if (
+            self.priority == "interactive"
+            and waited > self.scheduler.latency_target
+            and not self._warned
+        ):
+            self._warned = True
+            logger.warning(
+                "Interactive Florence-2 job %s waited %.1fs for a bulk batch to finish. "
+                "Use smaller batch sizes for bulk jobs to meet the %.1fs latency target",
+                self.name,
+                waited,
+                self.scheduler.latency_target,
+            )
+
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.scheduler._release(self, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the job's number of turns, service time and wait times."""
+        return {
+            "name": self.name,
+            "priority": self.priority,
+            "num_turns": self.num_turns,
+            "service_time": self.service_time,
+            "mean_wait": self.wait_time / self.num_turns if self.num_turns else None,
+            "max_wait": self.max_wait,
+        }
+
+
+class InferenceScheduler(object):
+    """Decides which of the concurrent inference jobs of this process runs next.
+
+    Each job, e.g. an operator run, registers with :meth:`job` and wraps each batch
+    of inference in :meth:`_Job.turn`. Only ``concurrency`` batches run at a time,
+    and when a turn is released the next one is granted as follows:
+
+    -   Interactive jobs go first, in the order they asked for their turn. Once an
+        interactive job has run its first batch, bulk jobs wait until it finishes,
+        so that its next batches don't queue behind bulk batches
+    -   Bulk jobs share the remaining time fairly: the bulk job that has used the
+        least inference time so far goes next. Jobs that start later are credited
+        with the least time of the running jobs, so they don't starve the others
+
+    Bulk jobs are therefore preempted at batch boundaries, and an interactive batch
+    waits at most for the bulk batch in flight.
+
+    Jobs running in other processes are not scheduled against each other. This
+    includes a delegated operation run by a separate executor and an App request
+    served by the FiftyOne server, as well as sharded workers. Priorities only
+    apply across processes when the runs use the inference daemon (see
+    :mod:`daemon`), which schedules the requests of all processes by priority
+    class, or to the CPU priority of the worker processes of sharded bulk runs.
+
+    Args:
+        concurrency: Number of batches that may run at the same time
+        latency_target: Seconds an interactive batch should wait at most for its
+            turn. Longer waits are logged
+
+    Example::
+
+        scheduler = get_scheduler()
+        with scheduler.job("interactive", name="detect selection") as job:
+            for batch in batches:
+                with job.turn():
+                    model.predict_all(batch)
+    """
+
+    def __init__(self, concurrency: int = 1, latency_target: float = DEFAULT_LATENCY_TARGET):
+        self.concurrency = max(1, concurrency)
+        self.latency_target = latency_target
+        self._jobs = []
+        self._waiting = []
+        self._running = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def job(self, priority: str, name: Optional[str] = None):
+        """Register a job for the duration of the enclosed block.
+
+        Args:
+            priority: The job's priority class, one of :data:`PRIORITIES`
+            name: Optional name of the job, used in logs
+
+        Yields:
+            the job, whose :meth:`_Job.turn` wraps each batch
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Invalid priority: {priority}. Must be one of {list(PRIORITIES)}")
+
+        with self._cond:
+            # Credit new jobs with the least service time of their class
+            peers = [job.service_time for job in self._jobs if job.priority == priority]
+            job = _Job(self, priority, name or f"{priority} job", min(peers, default=0.0))
+            self._jobs.append(job)
+
+        try:
+            yield job
+        finally:
+            with self._cond:
+                self._jobs.remove(job)
+                self._cond.notify_all()
+
+            logger.debug("Florence-2 job finished: %s", job.stats())
+
+    def current_priority(self) -> Optional[str]:
+        """Get the priority class of the turn held by the calling thread, if any."""
+        job = getattr(self._local, "job", None)
+        return job.priority if job is not None else None
+
+    def stats(self):
+        """Get the :meth:`_Job.stats` of the registered jobs."""
+        with self._cond:
+            return [job.stats() for job in self._jobs]
+
+    def _next(self):
+        # Interactive jobs first, in arrival order
+        for job, _ in self._waiting:
+            if job.priority == "interactive":
+                return job
+
+        # Bulk jobs wait for the interactive jobs that are running
+        if any(job.priority == "interactive" and job.started for job in self._jobs):
+            return None
+
+        if not self._waiting:
+            return None
+
+        return min(self._waiting, key=lambda item: (item[0].service_time, item[1]))[0]
+
+    def _acquire(self, job):
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting.append((job, start))
+            while self._running >= self.concurrency or self._next() is not job:
+                self._cond.wait()
+
+            self._waiting = [item for item in self._waiting if item[0] is not job]
+            self._running += 1
+            job.started = True
+
+        self._local.job = job
+        return time.perf_counter() - start
+
+    def _release(self, job, duration):
+        self._local.job = None
+        with self._cond:
+            self._running -= 1
+            job.service_time += duration
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    """Get the scheduler shared by all inference jobs of this process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+
+    return _scheduler
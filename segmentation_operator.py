@@ -5,9 +5,46 @@ import fiftyone as fo
 import fiftyone.operators as foo
 from fiftyone.operators import types
 
-from .florence2 import run_florence2_model
+from .utils import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _inference_inputs,
+    _inference_params,
+    _execution_mode,
+    _handle_calling,
+    _string_field_choices,
+    _invalidate_resolve_cache,
+)
 
-from .utils import  _model_choice_inputs, _execution_mode, _handle_calling
+def _output_type_inputs(ctx, inputs):
+    output_type_group = types.RadioGroup()
+    output_type_group.add_choice("polylines", label="Polygons (Polylines)")
+    output_type_group.add_choice("detections", label="Instance masks (Detections)")
+    output_type_group.add_choice("segmentation", label="Semantic mask (Segmentation)")
+
+    inputs.enum(
+        "output_type",
+        values=output_type_group.values(),
+        default="polylines",
+        view=output_type_group,
+        label="Output type",
+        description=(
+            "Store the polygons, or rasterize them once at inference time into masks "
+            "cropped to each object's bounding box or into a single mask per image"
+        ),
+    )
+
+    if ctx.params.get("output_type", "polylines") == "segmentation":
+        inputs.str(
+            "mask_dir",
+            required=False,
+            label="Mask directory",
+            description=(
+                "Optional directory in which to write the masks as PNGs. If empty, "
+                "the masks are stored in the database"
+            ),
+        )
 
 def _referring_expression_inputs(ctx, inputs):
     input_choices = ["from_field", "direct"]
@@ -26,10 +63,8 @@ def _referring_expression_inputs(ctx, inputs):
 
     input_type = ctx.params.get("expression_input", None)
     if input_type == "from_field":
-        candidate_fields = list(
-            ctx.dataset.get_field_schema(ftype=fo.StringField).keys()
-        )
-        candidate_fields.remove("filepath")
+        # Cached per dataset, since wide schemas are slow to list on every form change
+        candidate_fields = _string_field_choices(ctx)
 
         field_radio_group = types.RadioGroup()
 
@@ -77,6 +112,23 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
             label="Output Field",
             description="Name of the field to store the segmentation results"
         )
+
+        inputs.float(
+            "simplify_tolerance",
+            required=False,
+            label="Simplification tolerance",
+            description=(
+                "Optionally simplify the polygons, dropping vertices that are closer "
+                "than this distance, relative to the image size, to the simplified "
+                "outline, e.g. 0.002. Leave empty to keep every vertex"
+            ),
+        )
+
+        # How the segmentation results are stored
+        _output_type_inputs(ctx, inputs)
+        
+        # Inference options (batch size, feature cache, resuming, decoding, precision, backend, worker processes, profiling, priority)
+        _inference_inputs(ctx, inputs)
         
         # Execution mode (delegation option)
         _execution_mode(ctx, inputs)
@@ -89,6 +141,9 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
         return ctx.params.get("delegate", False)
     
     def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import run_florence2_model
+
         view = ctx.target_view()
         # Parameters
         model_path = ctx.params.get("model_path", "microsoft/Florence-2-base-ft")
@@ -102,6 +157,11 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
             kwargs["expression_field"] = ctx.params.get("expression_field")
         else:
             raise ValueError("Either 'expression' or 'expression_field' must be provided")
+
+        # Output settings are only passed when set, so the defaults apply otherwise
+        for param in ("simplify_tolerance", "output_type", "mask_dir"):
+            if ctx.params.get(param) is not None:
+                kwargs[param] = ctx.params.get(param)
         
         # Execute model
         run_florence2_model(
@@ -109,9 +169,12 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
             operation="segmentation",
             output_field=output_field,
             model_path=model_path,
+            **_inference_params(ctx),
             **kwargs
         )
         
+        # The run added fields and may have downloaded the checkpoint
+        _invalidate_resolve_cache(ctx)
         ctx.ops.reload_dataset()
             
     def __call__(
@@ -121,6 +184,19 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
         expression=None,
         expression_field=None,
         output_field="florence2_segmentation",
+        simplify_tolerance=None,
+        output_type="polylines",
+        mask_dir=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_feature_cache=False,
+        skip_existing=False,
+        skip_failures=True,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        num_workers=1,
+        profile_key=None,
+        priority=None,
         delegate=False
     ):
         kwargs = {}
@@ -130,13 +206,30 @@ class ReferringExpressionSegmentationWithFlorence2(foo.Operator):
             kwargs["expression_field"] = expression_field
         else:
             raise ValueError("Either 'expression' or 'expression_field' must be provided")
+
+        if simplify_tolerance is not None:
+            kwargs["simplify_tolerance"] = simplify_tolerance
+        if mask_dir is not None:
+            kwargs["mask_dir"] = mask_dir
             
         return _handle_calling(
             self.uri,
             sample_collection,
             operation="segmentation",
             output_field=output_field,
+            output_type=output_type,
             delegate=delegate,
             model_path=model_path,
+            batch_size=batch_size,
+            use_feature_cache=use_feature_cache,
+            skip_existing=skip_existing,
+            skip_failures=skip_failures,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            num_workers=num_workers,
+            profile=profile_key is not None,
+            profile_key=profile_key,
+            priority=priority,
             **kwargs
         )
\ No newline at end of file
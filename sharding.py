@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import queue
+import types
+import logging
+import importlib
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the progress lines that shard workers print to stdout
+_PROGRESS_PREFIX = "FLORENCE2_SHARD_PROGRESS "
+
+# Prefix of the line with the serialized profiler of a shard worker
+_PROFILE_PREFIX = "FLORENCE2_SHARD_PROFILE "
+
+# Name under which shard workers import this plugin's modules
+_WORKER_PACKAGE = "_florence2_shard_plugin"
+
+# Niceness added to the workers of bulk runs, so the OS favors interactive runs
+BULK_NICENESS = 10
+
+
+def split_into_shards(sample_ids: List[str], num_shards: int) -> List[List[str]]:
+    """Split sample IDs into contiguous shards of near-equal size.
+
+    Args:
+        sample_ids: IDs of the samples to process
+        num_shards: Number of shards to create
+
+    Returns:
+        list: The non-empty shards, each a list of sample IDs
+    """
+    num_shards = max(1, min(num_shards, len(sample_ids)))
+    shard_size, remainder = divmod(len(sample_ids), num_shards)
+
+    shards = []
+    start = 0
+    for idx in range(num_shards):
+        end = start + shard_size + (1 if idx < remainder else 0)
+        shards.append(sample_ids[start:end])
+        start = end
+
+    return [shard for shard in shards if shard]
+
+
+def _threads_per_worker(num_workers: int) -> int:
+    """Split the machine's cores evenly between workers."""
+    return max(1, (os.cpu_count() or 1) // num_workers)
+
+
+def _read_progress(
+    shard_idx: int,
+    process: subprocess.Popen,
+    events: queue.Queue,
+    profiles: List[Dict[str, Any]],
+):
+    # Forward progress lines to the main thread, collect profiles and echo anything else
+    for line in process.stdout:
+        if line.startswith(_PROGRESS_PREFIX):
+            completed, total = json.loads(line[len(_PROGRESS_PREFIX):])
+            events.put((shard_idx, completed, total))
+        elif line.startswith(_PROFILE_PREFIX):
+            profiles.append(json.loads(line[len(_PROFILE_PREFIX):]))
+        else:
+            sys.stdout.write(line)
+
+    events.put((shard_idx, None, None))
+
+
+def run_sharded(
+    samples,
+    tasks: Dict[str, Dict[str, Any]],
+    num_workers: int,
+    progress: Optional[Callable[[List[int], List[int]], None]] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """Run Florence-2 tasks on a collection in several worker processes.
+
+    The collection is split into ``num_workers`` shards by sample ID, and each
+    shard is processed by :func:`florence2.run_florence2_tasks` in its own Python
+    process. Each process loads its own copy of the model and is pinned to an equal
+    share of the CPU cores, so autoregressive decoding, which only uses part of the
+    cores of a single process, runs on all of them. The workers write their results
+    directly to the dataset.
+
+    Workers are started as fresh interpreters running this module, so they do not
+    depend on how FiftyOne imported the plugin. The output fields must already be
+    declared on the dataset, since several processes expanding its schema at the
+    same time would conflict.
+
+    Args:
+        samples: FiftyOne collection containing the images to process
+        tasks: Dict mapping output field names to task specs, as accepted by
+            :func:`florence2.run_florence2_tasks`
+        num_workers: Number of worker processes
+        progress: Optional function called with the lists of processed and total
+            sample counts of each shard whenever a shard makes progress
+        **kwargs: Additional keyword arguments for
+            :func:`florence2.run_florence2_tasks`, which must be JSON serializable.
+            With ``profile=True``, each worker profiles its shard, and with
+            ``priority="bulk"``, the workers run at a lower CPU priority
+
+    Returns:
+        list: The serialized :class:`profiling.StageProfiler` of each worker, see
+        :meth:`profiling.StageProfiler.to_dict`. Empty unless ``profile=True``
+
+    Raises:
+        RuntimeError: If any worker process fails
+    """
+    shards = split_into_shards(samples.values("id"), num_workers)
+    if not shards:
+        return []
+
+    num_threads = _threads_per_worker(len(shards))
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Thread counts must be set before torch is imported in the workers
+    env = dict(os.environ)
+    env["OMP_NUM_THREADS"] = str(num_threads)
+    env["MKL_NUM_THREADS"] = str(num_threads)
+
+    logger.info(
+        "Running Florence-2 on %d samples in %d processes with %d threads each",
+        sum(len(shard) for shard in shards),
+        len(shards),
+        num_threads,
+    )
+
+    completed = [0] * len(shards)
+    totals = [len(shard) for shard in shards]
+    events = queue.Queue()
+    processes = []
+    profiles = []
+
+    try:
+        for shard_idx, sample_ids in enumerate(shards):
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+                text=True,
+            )
+            processes.append(process)
+
+            config = {
+                "plugin_dir": plugin_dir,
+                "dataset": samples._dataset.name,
+                "sample_ids": sample_ids,
+                "tasks": tasks,
+                "num_threads": num_threads,
+                "kwargs": kwargs,
+            }
+            process.stdin.write(json.dumps(config))
+            process.stdin.close()
+
+            threading.Thread(
+                target=_read_progress,
+                args=(shard_idx, process, events, profiles),
+                daemon=True,
+            ).start()
+
+        num_running = len(processes)
+        while num_running > 0:
+            shard_idx, shard_completed, shard_total = events.get()
+            if shard_completed is None:
+                num_running -= 1
+                continue
+
+            completed[shard_idx] = shard_completed
+            totals[shard_idx] = shard_total
+            if progress is not None:
+                progress(list(completed), list(totals))
+
+        failed = [
+            shard_idx
+            for shard_idx, process in enumerate(processes)
+            if process.wait() != 0
+        ]
+    finally:
+        # Don't leave workers behind if the run is interrupted
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    if failed:
+        raise RuntimeError(
+            f"Florence-2 shard(s) {', '.join(str(idx) for idx in failed)} failed; "
+            "see the worker logs above for details"
+        )
+
+    return profiles
+
+
+def _import_florence2(plugin_dir: str):
+    """Import this plugin's florence2 module in a worker process."""
+    # Register the plugin directory as a package so relative imports work
+    package = types.ModuleType(_WORKER_PACKAGE)
+    package.__path__ = [plugin_dir]
+    sys.modules[_WORKER_PACKAGE] = package
+
+    return importlib.import_module(_WORKER_PACKAGE + ".florence2")
+
+
+def _run_worker(config: Dict[str, Any]) -> None:
+    """Process one shard in a worker process."""
+    import torch
+    import fiftyone as fo
+
+    torch.set_num_threads(config["num_threads"])
+
+    # Progress is reported to the parent process instead
+    fo.config.show_progress_bars = False
+
+    florence2 = _import_florence2(config["plugin_dir"])
+
+    def _report_progress(completed, total):
+        print(_PROGRESS_PREFIX + json.dumps([completed, total]), flush=True)
+
+    view = fo.load_dataset(config["dataset"]).select(config["sample_ids"])
+
+    # Bulk workers yield the CPU cores to interactive runs in other processes
+    if config["kwargs"].get("priority") == "bulk" and hasattr(os, "nice"):
+        os.nice(BULK_NICENESS)
+
+    # The parent process combines the profiles of all workers
+    kwargs = dict(config["kwargs"])
+    profiler = florence2.StageProfiler() if kwargs.pop("profile", False) else None
+
+    florence2.run_florence2_tasks(
+        view,
+        config["tasks"],
+        num_workers=1,
+        progress=lambda completed, totals: _report_progress(completed[0], totals[0]),
+        profile=profiler or False,
+        **kwargs
+    )
+
+    if profiler is not None:
+        print(_PROFILE_PREFIX + json.dumps(profiler.to_dict()), flush=True)
+
+
+if __name__ == "__main__":
+    # Keep the plugin's modules from shadowing top-level packages
+    _plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path = [p for p in sys.path if os.path.abspath(p or ".") != _plugin_dir]
+
+    logging.basicConfig(level=logging.INFO)
+    _run_worker(json.load(sys.stdin))
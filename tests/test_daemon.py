@@ -0,0 +1,141 @@
+import os
+import sys
+import types
+import shutil
+import secrets
+import tempfile
+import importlib
+import threading
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Name under which the tests import this plugin's modules
+PLUGIN_PACKAGE = "fiftyone_florence2_plugin"
+
+
+def _import_daemon():
+    # The daemon only needs the standard library, so it is imported on its own
+    # as part of the plugin package, without importing fiftyone or torch
+    if PLUGIN_PACKAGE not in sys.modules:
+        package = types.ModuleType(PLUGIN_PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PLUGIN_PACKAGE] = package
+
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.daemon")
+
+
+daemon = _import_daemon()
+
+
+class _StubModel(object):
+    """Echoes its inputs, and fails to load paths starting with ``"missing"``."""
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def load_image(self, filepath):
+        if os.path.basename(filepath).startswith("missing"):
+            raise FileNotFoundError(filepath)
+
+        return filepath
+
+    def predict_all(self, images, prompts=None):
+        if prompts is None:
+            prompts = [None] * len(images)
+
+        return [f"{self.operation}:{image}:{prompt}" for image, prompt in zip(images, prompts)]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # A throwaway key and socket, so a running daemon is left alone. Unix socket
+    # paths are short, so the socket isn't put in pytest's tmp_path
+    monkeypatch.setenv("FLORENCE2_DAEMON_AUTHKEY", secrets.token_hex(16))
+    work_dir = tempfile.mkdtemp(prefix="florence2_daemon_")
+
+    server = daemon.Florence2Daemon(
+        address=os.path.join(work_dir, "daemon.sock"),
+        max_batch_size=4,
+        max_wait_ms=1000,
+        model_factory=lambda model_path, operation, params: _StubModel(operation),
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    assert server.ready.wait(timeout=10)
+
+    yield server
+
+    server.shutdown()
+    thread.join(timeout=10)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _predict_concurrently(server, requests):
+    results = [None] * len(requests)
+
+    def _predict(idx, operation, images):
+        client = daemon.DaemonClient(server.address)
+        try:
+            results[idx] = client.predict("stub", operation, {}, images)
+        except Exception as e:
+            results[idx] = e
+        finally:
+            client.close()
+
+    threads = [
+        threading.Thread(target=_predict, args=(idx, operation, images))
+        for idx, (operation, images) in enumerate(requests)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    return results
+
+
+def test_batches_requests_across_clients(server):
+    results = _predict_concurrently(
+        server, [("caption", ["a.jpg", "b.jpg"]), ("caption", ["c.jpg", "d.jpg"])]
+    )
+
+    assert results == [
+        ["caption:a.jpg:None", "caption:b.jpg:None"],
+        ["caption:c.jpg:None", "caption:d.jpg:None"],
+    ]
+    assert server.info()["num_batches"] == 1
+
+
+def test_unreadable_image_only_fails_its_request(server):
+    results = _predict_concurrently(
+        server, [("caption", ["a.jpg", "missing.jpg"]), ("caption", ["c.jpg", "d.jpg"])]
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert "missing.jpg" in str(results[0])
+    assert results[1] == ["caption:c.jpg:None", "caption:d.jpg:None"]
+
+
+def test_unreadable_image_only_fails_itself(server):
+    client = daemon.DaemonClient(server.address)
+    try:
+        results = client.predict(
+            "stub", "caption", {}, ["a.jpg", "missing.jpg", "c.jpg"], return_exceptions=True
+        )
+
+        with pytest.raises(RuntimeError, match="missing.jpg"):
+            client.predict("stub", "caption", {}, ["a.jpg", "missing.jpg"])
+    finally:
+        client.close()
+
+    assert results[0] == "caption:a.jpg:None"
+    assert isinstance(results[1], RuntimeError)
+    assert "missing.jpg" in str(results[1])
+    assert results[2] == "caption:c.jpg:None"
+
+
+def test_rejects_remote_hosts():
+    with pytest.raises(ValueError):
+        daemon.parse_address("0.0.0.0:8000")
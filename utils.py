@@ -1,10 +1,124 @@
 import os
+import time
+import threading
+from collections import OrderedDict, deque
 os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
 
 import fiftyone as fo
 import fiftyone.operators as foo
 from fiftyone.operators import types
 
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_GENERATION_PROFILE = "quality"
+
+# Minimum number of seconds between two progress updates of an operator
+PROGRESS_UPDATE_INTERVAL = 2.0
+
+# Number of seconds over which the current throughput of a run is measured
+THROUGHPUT_WINDOW = 60.0
+
+# Number of seconds for which the filesystem and schema lookups of resolve_input
+# are reused. resolve_input runs on every form change in the App
+RESOLVE_CACHE_TTL = 30.0
+
+class _TTLCache(object):
+    """A small thread-safe cache whose entries expire after ``ttl`` seconds.
+
+    Args:
+        ttl (float): Number of seconds for which an entry is reused
+        max_size (int): Maximum number of entries. The least recently used ones
+            are dropped beyond it
+    """
+
+    def __init__(self, ttl=RESOLVE_CACHE_TTL, max_size=128):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Get the value of a key, computing it if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def invalidate(self, predicate=None):
+        """Drop the entries whose key matches ``predicate``, or all entries."""
+        with self._lock:
+            for key in list(self._entries):
+                if predicate is None or predicate(key):
+                    del self._entries[key]
+
+# Whether each checkpoint is in the HuggingFace cache, keyed by (cache dir, model)
+_model_cache_checks = _TTLCache()
+
+# String fields of each dataset, keyed by (dataset name, last modification time)
+_string_field_lists = _TTLCache()
+
+def _hf_hub_cache_dir():
+    """Get the HuggingFace Hub cache directory, honoring the same environment
+    variables as ``huggingface_hub``."""
+    hub_cache = os.environ.get("HF_HUB_CACHE") or os.environ.get("HUGGINGFACE_HUB_CACHE")
+    if hub_cache:
+        return os.path.expanduser(hub_cache)
+
+    hf_home = os.environ.get("HF_HOME")
+    if not hf_home:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+        hf_home = os.path.join(xdg_cache, "huggingface")
+
+    return os.path.join(os.path.expanduser(hf_home), "hub")
+
+def _is_model_downloaded(model_path):
+    """Check whether a checkpoint is available locally, caching the result."""
+    hub_cache = _hf_hub_cache_dir()
+
+    def _check():
+        # Local checkpoints don't need to be downloaded
+        if os.path.isdir(os.path.expanduser(model_path)):
+            return True
+
+        model_dir = os.path.join(hub_cache, "models--" + model_path.replace("/", "--"))
+        return os.path.exists(model_dir)
+
+    return _model_cache_checks.get_or_compute((hub_cache, model_path), _check)
+
+def _string_field_choices(ctx):
+    """Get the names of the dataset's string fields that can hold prompts,
+    caching them per dataset."""
+    dataset = ctx.dataset
+
+    # Schema changes update the dataset's modification time, when available
+    key = (dataset.name, getattr(dataset, "last_modified_at", None))
+
+    def _compute():
+        fields = list(dataset.get_field_schema(ftype=fo.StringField).keys())
+        return [field for field in fields if field != "filepath"]
+
+    return list(_string_field_lists.get_or_compute(key, _compute))
+
+def _invalidate_resolve_cache(ctx):
+    """Drop the cached lookups of a dataset and checkpoint, e.g. after a run has
+    added fields to the dataset and downloaded the checkpoint."""
+    dataset_name = ctx.dataset.name
+    _string_field_lists.invalidate(lambda key: key[0] == dataset_name)
+
+    model_path = ctx.params.get("model_path", None)
+    _model_cache_checks.invalidate(lambda key: key[1] == model_path)
+
 # Common UI utilities
 def _model_choice_inputs(ctx, inputs):
     model_paths = [
@@ -34,11 +148,7 @@ def _model_download_check_inputs(ctx, inputs):
     if model_choice is None:
         return
 
-    base_path = "~/.cache/huggingface/hub/models--"
-    model_path_formatted = base_path + model_choice.replace("/", "--")
-    model_dir = os.path.expanduser(model_path_formatted)
-
-    if not os.path.exists(model_dir):
+    if not _is_model_downloaded(model_choice):
         description = (
             f"Model {model_choice} has not been downloaded. The model will be "
             "downloaded automatically the first time you run this operation."
@@ -51,6 +161,360 @@ def _model_download_check_inputs(ctx, inputs):
             ),
         )
 
+def _batch_size_inputs(ctx, inputs):
+    inputs.int(
+        "batch_size",
+        default=DEFAULT_BATCH_SIZE,
+        required=False,
+        label="Batch size",
+        description=(
+            "The number of images to process per model call. Larger batches "
+            "are faster but use more memory"
+        ),
+    )
+
+def _feature_cache_inputs(ctx, inputs):
+    inputs.bool(
+        "use_feature_cache",
+        default=False,
+        required=False,
+        label="Cache image features?",
+        description=(
+            "Cache the vision encoder outputs on disk so that later runs on the "
+            "same images, e.g. with new prompts, can skip encoding them"
+        ),
+        view=types.CheckboxView(),
+    )
+
+def _skip_existing_inputs(ctx, inputs):
+    inputs.bool(
+        "skip_existing",
+        default=False,
+        required=False,
+        label="Skip samples with existing results?",
+        description=(
+            "Only process samples whose output field is missing or was produced "
+            "with a different checkpoint, task or prompt. Use this to resume an "
+            "interrupted run"
+        ),
+        view=types.CheckboxView(),
+    )
+
+def _skip_failures_inputs(ctx, inputs):
+    inputs.bool(
+        "skip_failures",
+        default=True,
+        required=False,
+        label="Skip samples that fail?",
+        description=(
+            "Log and skip samples whose image can't be loaded or whose batch "
+            "fails, instead of stopping the run"
+        ),
+        view=types.CheckboxView(),
+    )
+
+def _generation_profile_inputs(ctx, inputs):
+    radio_group = types.RadioGroup()
+    radio_group.add_choice(
+        "quality",
+        label="Quality",
+        description="Beam search with 3 beams and up to 1024 tokens for every task",
+    )
+    radio_group.add_choice(
+        "fast",
+        label="Fast",
+        description="Greedy decoding with token limits sized to each task",
+    )
+
+    inputs.enum(
+        "generation_profile",
+        radio_group.values(),
+        default=DEFAULT_GENERATION_PROFILE,
+        required=False,
+        label="Generation profile",
+        description=(
+            "How text is decoded. Fast is several times cheaper on CPU, at a "
+            "small cost in quality"
+        ),
+        view=radio_group,
+    )
+
+def _precision_inputs(ctx, inputs):
+    precision_choices = [
+        ("default", "Default (float16 on GPU, float32 on CPU)"),
+        ("fp32", "float32"),
+        ("bf16", "bfloat16, where supported"),
+        ("int8-dynamic", "int8 language model (CPU only)"),
+    ]
+
+    radio_group = types.RadioGroup()
+    for choice, label in precision_choices:
+        radio_group.add_choice(choice, label=label)
+
+    inputs.enum(
+        "precision",
+        radio_group.values(),
+        default="default",
+        required=False,
+        label="Precision",
+        description=(
+            "The numeric precision used for inference. Lower precisions are "
+            "faster and use less memory, at a small cost in accuracy"
+        ),
+        view=types.DropdownView(),
+    )
+
+def _backend_inputs(ctx, inputs, daemon=True):
+    radio_group = types.RadioGroup()
+    radio_group.add_choice(
+        "torch",
+        label="PyTorch",
+        description="Run the model eagerly in PyTorch",
+    )
+    radio_group.add_choice(
+        "onnx",
+        label="ONNX Runtime",
+        description=(
+            "Run exported ONNX graphs on the CPU with greedy decoding. The "
+            "checkpoint is exported the first time it is used"
+        ),
+    )
+    if daemon:
+        radio_group.add_choice(
+            "daemon",
+            label="Local daemon",
+            description=(
+                "Send the images to the local inference daemon, which batches "
+                "them with those of other runs. Start it with `python daemon.py` "
+                "from the plugin directory"
+            ),
+        )
+
+    inputs.enum(
+        "backend",
+        radio_group.values(),
+        default="torch",
+        required=False,
+        label="Backend",
+        description="The engine used to run the model",
+        view=radio_group,
+    )
+
+def _num_workers_inputs(ctx, inputs):
+    inputs.int(
+        "num_workers",
+        default=1,
+        required=False,
+        label="Number of worker processes",
+        description=(
+            "Split the samples between this many processes, each with its own "
+            "copy of the model and an equal share of the CPU cores. Speeds up "
+            "CPU-only machines at the cost of memory"
+        ),
+    )
+
+def _profile_inputs(ctx, inputs):
+    inputs.bool(
+        "profile",
+        default=False,
+        required=False,
+        label="Profile the run?",
+        description=(
+            "Record the time spent in each stage of inference and the number of "
+            "generated tokens, and store a summary in the dataset's info"
+        ),
+        view=types.CheckboxView(),
+    )
+
+    if ctx.params.get("profile", False):
+        inputs.str(
+            "profile_key",
+            default="latest",
+            required=True,
+            label="Profile key",
+            description=(
+                "The summary is stored in "
+                "dataset.info['florence2_profiles'][<profile key>]"
+            ),
+        )
+
+def _priority_inputs(ctx, inputs):
+    radio_group = types.RadioGroup()
+    radio_group.add_choice(
+        "auto",
+        label="Automatic",
+        description="Interactive for up to 32 samples, bulk otherwise",
+    )
+    radio_group.add_choice(
+        "interactive",
+        label="Interactive",
+        description="Run ahead of bulk runs, which pause between their batches",
+    )
+    radio_group.add_choice(
+        "bulk",
+        label="Bulk",
+        description="Share the model fairly with other bulk runs",
+    )
+
+    inputs.enum(
+        "priority",
+        radio_group.values(),
+        default="auto",
+        required=False,
+        label="Priority",
+        description=(
+            "How this run is scheduled against other Florence-2 runs in the "
+            "same process or inference daemon. Delegated runs execute in another "
+            "process, so they only yield to runs in the App when both use the "
+            "inference daemon backend, or when bulk runs use several worker "
+            "processes, which run at a lower CPU priority"
+        ),
+        view=radio_group,
+    )
+
+def _inference_inputs(ctx, inputs):
+    """Add the inference options shared by all operators."""
+    _batch_size_inputs(ctx, inputs)
+    _feature_cache_inputs(ctx, inputs)
+    _skip_existing_inputs(ctx, inputs)
+    _skip_failures_inputs(ctx, inputs)
+    _generation_profile_inputs(ctx, inputs)
+    _precision_inputs(ctx, inputs)
+    _backend_inputs(ctx, inputs)
+    _num_workers_inputs(ctx, inputs)
+    _profile_inputs(ctx, inputs)
+    _priority_inputs(ctx, inputs)
+
+def _inference_params(ctx):
+    """Get the inference options shared by all operators from the context."""
+    return dict(
+        batch_size=ctx.params.get("batch_size", DEFAULT_BATCH_SIZE),
+        use_feature_cache=ctx.params.get("use_feature_cache", False),
+        skip_existing=ctx.params.get("skip_existing", False),
+        skip_failures=ctx.params.get("skip_failures", True),
+        generation_profile=ctx.params.get(
+            "generation_profile", DEFAULT_GENERATION_PROFILE
+        ),
+        precision=_precision_param(ctx),
+        backend=ctx.params.get("backend", None),
+        num_workers=ctx.params.get("num_workers", 1) or 1,
+        progress=_progress_callback(ctx),
+        profile_key=_profile_key_param(ctx),
+        priority=_priority_param(ctx),
+    )
+
+def _priority_param(ctx):
+    """Get the run's priority class from the context, where None means automatic."""
+    priority = ctx.params.get("priority", None)
+    if priority == "auto":
+        return None
+
+    return priority
+
+def _profile_key_param(ctx):
+    """Get the key under which to store the run's profile, or None if not profiling."""
+    if not ctx.params.get("profile", False):
+        return None
+
+    return ctx.params.get("profile_key", None) or "latest"
+
+def _precision_param(ctx):
+    """Get the precision mode from the context, where None means the default."""
+    precision = ctx.params.get("precision", None)
+    if precision == "default":
+        return None
+
+    return precision
+
+def _format_duration(seconds):
+    """Format a number of seconds as e.g. "1h 02m", "4m 18s" or "12s"."""
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+class _ProgressReporter(object):
+    """Reports the progress, throughput and ETA of a run to an operator's context.
+
+    Instances are called with the lists of processed and total sample counts of
+    each worker process. Updates are throttled to one every ``interval`` seconds,
+    plus the final one, so that reporting doesn't slow the inference loop. The
+    throughput is measured over the last ``window`` seconds, so that it follows
+    changes in speed, e.g. once the model has been loaded.
+
+    Args:
+        ctx: The operator's execution context
+        interval (float): Minimum number of seconds between two updates
+        window (float): Number of seconds over which the throughput is measured
+    """
+
+    def __init__(self, ctx, interval=PROGRESS_UPDATE_INTERVAL, window=THROUGHPUT_WINDOW):
+        self.ctx = ctx
+        self.interval = interval
+        self.window = window
+        self._last_update = None
+
+        # (time, processed samples) pairs, starting when the run starts
+        self._history = deque([(time.monotonic(), 0)])
+
+    def __call__(self, completed, totals):
+        now = time.monotonic()
+        num_done, num_total = sum(completed), sum(totals)
+
+        self._history.append((now, num_done))
+        while len(self._history) > 2 and now - self._history[1][0] >= self.window:
+            self._history.popleft()
+
+        is_final = num_done >= num_total
+        if (
+            not is_final
+            and self._last_update is not None
+            and now - self._last_update < self.interval
+        ):
+            return
+
+        self._last_update = now
+        self.ctx.set_progress(
+            progress=num_done / max(1, num_total),
+            label=self._label(completed, totals),
+        )
+
+    def throughput(self):
+        """The number of samples processed per second over the recent window."""
+        (start, start_done), (end, end_done) = self._history[0], self._history[-1]
+        if end <= start:
+            return None
+
+        return (end_done - start_done) / (end - start)
+
+    def _label(self, completed, totals):
+        num_done, num_total = sum(completed), sum(totals)
+        label = f"{num_done}/{num_total} samples"
+
+        rate = self.throughput()
+        if rate:
+            label += f", {rate:.2f} images/s"
+            if num_done < num_total:
+                label += f", ETA {_format_duration((num_total - num_done) / rate)}"
+
+        if len(totals) > 1:
+            shards = ", ".join(
+                f"{shard_done}/{shard_total}"
+                for shard_done, shard_total in zip(completed, totals)
+            )
+            label += f" (workers: {shards})"
+
+        return label
+
+def _progress_callback(ctx):
+    """Build a function reporting per-worker progress, throughput and ETA to the
+    operator's context."""
+    return _ProgressReporter(ctx)
+
 def _execution_mode(ctx, inputs):
     delegate = ctx.params.get("delegate", False)
 
@@ -0,0 +1,157 @@
+import os
+os.environ['FIFTYONE_ALLOW_LEGACY_ORCHESTRATORS'] = 'true'
+import fiftyone as fo
+import fiftyone.operators as foo
+from fiftyone.operators import types
+
+from .utils import (
+    DEFAULT_GENERATION_PROFILE,
+    _model_choice_inputs,
+    _generation_profile_inputs,
+    _precision_inputs,
+    _precision_param,
+    _backend_inputs,
+    _execution_mode,
+)
+
+OPERATION_CHOICES = [
+    ("caption", "Caption"),
+    ("ocr", "OCR"),
+    ("detection", "Detection"),
+    ("phrase_grounding", "Phrase grounding"),
+    ("segmentation", "Segmentation"),
+]
+
+def _operation_inputs(ctx, inputs):
+    for operation, label in OPERATION_CHOICES:
+        inputs.bool(
+            f"warm_{operation}",
+            default=True,
+            required=False,
+            label=label,
+            description=f"Run a dummy {label.lower()} task",
+            view=types.CheckboxView(),
+        )
+
+def _get_operations(ctx):
+    # Operations are passed directly when called via the SDK
+    operations = ctx.params.get("operations", None)
+    if operations:
+        return operations
+
+    return [
+        operation
+        for operation, _ in OPERATION_CHOICES
+        if ctx.params.get(f"warm_{operation}", True)
+    ]
+
+class WarmFlorence2(foo.Operator):
+    @property
+    def config(self):
+        return foo.OperatorConfig(
+            name="warm_florence2",
+            label="Warm up Florence-2",
+            description=(
+                "Load a Florence-2 checkpoint and run each task once, so that later "
+                "runs in the same process start immediately"
+            ),
+            icon="/assets/santa-maria-del-fiore-svgrepo-com.svg",
+            dynamic=True,
+        )
+
+    def resolve_input(self, ctx):
+        inputs = types.Object()
+
+        # Model choice inputs
+        _model_choice_inputs(ctx, inputs)
+
+        # Tasks to warm up
+        _operation_inputs(ctx, inputs)
+
+        # Settings that later runs must share to reuse the warmed model
+        _generation_profile_inputs(ctx, inputs)
+        _precision_inputs(ctx, inputs)
+        _backend_inputs(ctx, inputs, daemon=False)
+
+        inputs.view(
+            "delegation_notice",
+            types.Notice(
+                label=(
+                    "The model is warmed in the process that runs this operation. "
+                    "Delegate it to warm up a delegated operation worker"
+                )
+            ),
+        )
+
+        # Execution mode (delegation option)
+        _execution_mode(ctx, inputs)
+
+        return types.Property(inputs)
+
+    def resolve_delegation(self, ctx):
+        return ctx.params.get("delegate", False)
+
+    def execute(self, ctx):
+        # Imported on first use, so that registering the plugin doesn't import torch
+        from .florence2 import warm_florence2
+
+        report = warm_florence2(
+            model_path=ctx.params.get("model_path", "microsoft/Florence-2-base-ft"),
+            operations=_get_operations(ctx),
+            generation_profile=ctx.params.get(
+                "generation_profile", DEFAULT_GENERATION_PROFILE
+            ),
+            precision=_precision_param(ctx),
+            backend=ctx.params.get("backend", None),
+        )
+
+        return {
+            "device": report["device"],
+            "load_seconds": round(report["load_seconds"], 2),
+            "first_token_seconds": {
+                operation: round(result["first_token_seconds"], 3)
+                for operation, result in report["operations"].items()
+            },
+            "warmup_seconds": {
+                operation: round(result["warmup_seconds"], 2)
+                for operation, result in report["operations"].items()
+            },
+        }
+
+    def resolve_output(self, ctx):
+        outputs = types.Object()
+        outputs.str("device", label="Device")
+        outputs.float("load_seconds", label="Checkpoint load time (s)")
+        outputs.obj(
+            "first_token_seconds",
+            label="First token latency per task (s)",
+            view=types.JSONView(),
+        )
+        outputs.obj(
+            "warmup_seconds",
+            label="Warm-up time per task (s)",
+            view=types.JSONView(),
+        )
+
+        return types.Property(outputs)
+
+    def __call__(
+        self,
+        model_path="microsoft/Florence-2-base-ft",
+        operations=None,
+        generation_profile=DEFAULT_GENERATION_PROFILE,
+        precision=None,
+        backend=None,
+        delegate=False
+    ):
+        ctx = dict()
+        params = dict(
+            model_path=model_path,
+            operations=operations,
+            generation_profile=generation_profile,
+            precision=precision,
+            backend=backend,
+            delegate=delegate,
+        )
+
+        return foo.execute_operator(self.uri, ctx, params=params)